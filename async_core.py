@@ -0,0 +1,151 @@
+import sys
+import signal
+import asyncio
+import threading
+import subprocess
+
+
+def new_event_loop():
+    """Event loop nou; pe Windows cu Python 3.7 subprocess-urile cer ProactorEventLoop"""
+    if sys.platform == "win32" and sys.version_info < (3, 8):
+        return asyncio.ProactorEventLoop()
+    return asyncio.new_event_loop()
+
+
+def run_async(coro):
+    """Ruleaza o corutina pana la capat; Ctrl+C anuleaza doar aceasta corutina.
+
+    Ridica asyncio.CancelledError daca operatia a fost anulata, ca apelantul
+    sa poata reveni la prompt in loc sa inchida aplicatia.
+    """
+    loop = new_event_loop()
+    task = loop.create_task(coro)
+    handler_installed = False
+    if threading.current_thread() is threading.main_thread():
+        try:
+            loop.add_signal_handler(signal.SIGINT, task.cancel)
+            handler_installed = True
+        except (NotImplementedError, RuntimeError):
+            pass
+
+    try:
+        while True:
+            try:
+                return loop.run_until_complete(task)
+            except KeyboardInterrupt:
+                # Fara signal handler (Windows) Ctrl+C ajunge aici: anuleaza task-ul si asteapta-l
+                task.cancel()
+    finally:
+        if handler_installed:
+            loop.remove_signal_handler(signal.SIGINT)
+        loop.run_until_complete(loop.shutdown_asyncgens())
+        loop.close()
+
+
+def iterate_async(agen):
+    """Parcurge sincron un async generator (pentru wrapper-ele sincrone)"""
+    loop = new_event_loop()
+    try:
+        while True:
+            step = loop.create_task(agen.__anext__())
+            try:
+                yield loop.run_until_complete(step)
+            except StopAsyncIteration:
+                break
+            except KeyboardInterrupt:
+                # Anuleaza pasul curent (generatorul isi face curatenia), apoi propaga
+                step.cancel()
+                try:
+                    loop.run_until_complete(step)
+                except (asyncio.CancelledError, StopAsyncIteration):
+                    pass
+                raise
+    finally:
+        try:
+            loop.run_until_complete(agen.aclose())
+        except RuntimeError:
+            pass
+        loop.run_until_complete(loop.shutdown_asyncgens())
+        loop.close()
+
+
+async def astream_events(client, payload, on_retry=None):
+    """Async generator peste ChatClient: stream-ul blocant ruleaza intr-un thread.
+
+    La anulare raspunsul HTTP este inchis, ceea ce intrerupe citirea din
+    thread, iar evenimentul `cancelled` opreste reincercarile: backoff-ul se
+    intrerupe, nu mai pleaca alte cereri si on_retry nu mai este apelat.
+    """
+    loop = asyncio.get_event_loop()
+    queue = asyncio.Queue()
+    cancelled = threading.Event()
+    state = {"response": None}
+
+    def put(kind, value):
+        try:
+            loop.call_soon_threadsafe(queue.put_nowait, (kind, value))
+        except RuntimeError:
+            pass  # loop-ul a fost deja inchis
+
+    def retry(*args):
+        if on_retry is not None and not cancelled.is_set():
+            on_retry(*args)
+
+    def worker():
+        try:
+            response, deadline = client.open_stream(payload, retry, cancelled)
+            state["response"] = response
+            if cancelled.is_set():
+                response.close()
+                return
+            for event in client.iter_events(response, deadline):
+                if cancelled.is_set():
+                    break
+                put("event", event)
+            put("done", None)
+        except BaseException as e:
+            if not cancelled.is_set():
+                put("error", e)
+        finally:
+            if state["response"] is not None:
+                state["response"].close()
+
+    threading.Thread(target=worker, name="codemate-stream", daemon=True).start()
+    try:
+        while True:
+            kind, value = await queue.get()
+            if kind == "event":
+                yield value
+            elif kind == "error":
+                raise value
+            else:
+                break
+    finally:
+        cancelled.set()
+        if state["response"] is not None:
+            state["response"].close()
+
+
+async def arun_process(args, shell=False, cwd='.', timeout=None, env=None):
+    """Ruleaza un proces asincron; intoarce subprocess.CompletedProcess cu text.
+
+    La anulare (sau timeout) procesul este omorat inainte de a propaga eroarea.
+    """
+    if shell:
+        process = await asyncio.create_subprocess_shell(
+            args, cwd=cwd, env=env, stdout=asyncio.subprocess.PIPE, stderr=asyncio.subprocess.PIPE)
+    else:
+        process = await asyncio.create_subprocess_exec(
+            *args, cwd=cwd, env=env, stdout=asyncio.subprocess.PIPE, stderr=asyncio.subprocess.PIPE)
+
+    try:
+        stdout, stderr = await asyncio.wait_for(process.communicate(), timeout)
+    except BaseException:
+        if process.returncode is None:
+            process.kill()
+            await process.wait()
+        raise
+
+    return subprocess.CompletedProcess(args, process.returncode,
+                                       stdout.decode('utf-8', errors='replace'),
+                                       stderr.decode('utf-8', errors='replace'))
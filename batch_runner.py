@@ -0,0 +1,197 @@
+import re
+import json
+import time
+import asyncio
+import contextlib
+from datetime import datetime
+
+from conversation import estimate_tokens
+
+_ANSI = re.compile(r'\x1b\[[0-9;?]*[A-Za-z]')
+
+
+class RateLimiter:
+    """Token bucket asincron: cel mult `rate` cereri pe secunda, rafale de `burst`.
+
+    Se creeaza in interiorul event loop-ului care il foloseste (asyncio.Lock
+    se leaga de loop pe Python 3.7).
+    """
+
+    def __init__(self, rate, burst=1):
+        self.rate = rate
+        self.capacity = max(1, burst)
+        self.tokens = float(self.capacity)
+        self.updated = time.monotonic()
+        self._lock = asyncio.Lock()
+
+    async def acquire(self):
+        async with self._lock:
+            while True:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                await asyncio.sleep((1 - self.tokens) / self.rate)
+
+
+def parse_jobs(lines):
+    """Transforma liniile JSONL in job-uri.
+
+    O linie poate fi un string JSON sau un obiect cu "prompt" / "command" /
+    "input" si optional "id". Liniile invalide devin job-uri cu "error".
+    """
+    jobs = []
+    for number, line in enumerate(lines, 1):
+        line = line.strip()
+        if not line:
+            continue
+        job = {"line": number, "id": number}
+        try:
+            data = json.loads(line)
+            if isinstance(data, str):
+                text = data
+            elif isinstance(data, dict):
+                job["id"] = data.get("id", number)
+                text = data.get("prompt") or data.get("command") or data.get("input")
+            else:
+                text = None
+            if not isinstance(text, str) or not text.strip():
+                raise ValueError("expected a string or an object with 'prompt', 'command' or 'input'")
+            job["input"] = text.strip()
+        except ValueError as e:
+            job["input"] = line
+            job["error"] = f"Invalid job: {e}"
+        jobs.append(job)
+    return jobs
+
+
+class BatchRunner:
+    """Ruleaza job-uri fara interactiune si scrie cate un rezultat JSONL per job.
+
+    Prompturile consecutive ruleaza concurent, fiecare cu conversatia ei
+    (agent.fork()), limitate de `concurrency` si de rate limiter. Comenzile
+    /... sunt bariere: asteapta prompturile anterioare si ruleaza singure,
+    pentru ca pot modifica workspace-ul. Rezultatele sunt scrise in ordinea
+    terminarii; campul "line" le leaga de intrare.
+    """
+
+    def __init__(self, agent, handle_command, output, concurrency=4, rate=0, consoles=()):
+        self.agent = agent
+        self.handle_command = handle_command
+        self.output = output
+        self.concurrency = max(1, concurrency)
+        self.rate = rate
+        self.consoles = consoles
+        self.summary = {"jobs": 0, "ok": 0, "error": 0, "prompt_tokens": 0,
+                        "completion_tokens": 0, "cached": 0, "duration_ms": 0}
+
+    async def run(self, jobs):
+        """Ruleaza toate job-urile; intoarce sumarul"""
+        started = time.monotonic()
+        self._semaphore = asyncio.Semaphore(self.concurrency)
+        self._limiter = RateLimiter(self.rate, burst=self.concurrency) if self.rate > 0 else None
+        pending = []
+        try:
+            for job in jobs:
+                if job.get("error"):
+                    self._write(self._record(job, "command" if job["input"].startswith('/') else "prompt",
+                                             time.monotonic(), time.monotonic(), error=job["error"]))
+                elif job["input"].startswith('/'):
+                    if pending:
+                        await asyncio.gather(*pending)
+                        pending = []
+                    await self._run_command(job)
+                else:
+                    pending.append(asyncio.ensure_future(self._run_prompt(job)))
+            if pending:
+                await asyncio.gather(*pending)
+        finally:
+            for task in pending:
+                task.cancel()
+            self.summary["duration_ms"] = int((time.monotonic() - started) * 1000)
+        return self.summary
+
+    async def _run_prompt(self, job):
+        queued = time.monotonic()
+        async with self._semaphore:
+            if self._limiter:
+                await self._limiter.acquire()
+            started = time.monotonic()
+            agent = self.agent.fork()
+            output, error = "", None
+            try:
+                async for chunk in agent.asend_message(job["input"]):
+                    output += chunk
+                error = agent.last_turn.get("error")
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                error = str(e)
+
+        usage = agent.last_turn.get("usage")
+        if usage:
+            usage = dict(usage, estimated=False)
+        else:
+            # Raspuns din cache sau provider fara usage: estimare locala
+            sent = agent.conversation[:-1] if agent.conversation and agent.conversation[-1]["role"] == "assistant" \
+                else agent.conversation
+            prompt_tokens, completion_tokens = agent.memory.usage(sent), estimate_tokens(output)
+            usage = {"prompt_tokens": prompt_tokens, "completion_tokens": completion_tokens,
+                     "total_tokens": prompt_tokens + completion_tokens, "estimated": True}
+
+        record = self._record(job, "prompt", queued, started, output=output, error=error,
+                              cached=agent.last_turn.get("cached", False), usage=usage)
+        self._write(record)
+
+    async def _run_command(self, job):
+        started = time.monotonic()
+        loop = asyncio.get_event_loop()
+        # Comenzile sunt sincrone (unele pornesc propriul event loop): ruleaza intr-un thread
+        handled, output, error = await loop.run_in_executor(None, self._capture_command, job["input"])
+        if not handled:
+            # Nu este o comanda cunoscuta: ca in modul interactiv, textul merge la model
+            await self._run_prompt(job)
+            return
+        self._write(self._record(job, "command", started, started, output=output, error=error))
+
+    def _capture_command(self, text):
+        error = None
+        with contextlib.ExitStack() as stack:
+            captures = [stack.enter_context(console.capture()) for console in self.consoles]
+            try:
+                handled = self.handle_command(self.agent, text)
+            except Exception as e:
+                handled, error = True, str(e)
+        output = _ANSI.sub('', "".join(capture.get() for capture in captures))
+        return handled, output.strip(), error
+
+    def _record(self, job, kind, queued, started, output="", error=None, cached=False, usage=None):
+        finished = time.monotonic()
+        record = {
+            "id": job["id"],
+            "line": job["line"],
+            "type": kind,
+            "input": job["input"],
+            "status": "error" if error else "ok",
+            "output": output,
+            "error": error,
+            "cached": cached,
+            "usage": usage,
+            "started_at": datetime.fromtimestamp(time.time() - (finished - started)).isoformat(timespec="seconds"),
+            "wait_ms": int((started - queued) * 1000),
+            "duration_ms": int((finished - started) * 1000),
+        }
+
+        self.summary["jobs"] += 1
+        self.summary[record["status"]] += 1
+        self.summary["cached"] += int(bool(cached))
+        if usage:
+            self.summary["prompt_tokens"] += usage.get("prompt_tokens") or 0
+            self.summary["completion_tokens"] += usage.get("completion_tokens") or 0
+        return record
+
+    def _write(self, record):
+        self.output.write(json.dumps(record, ensure_ascii=False) + "\n")
+        self.output.flush()
@@ -0,0 +1,99 @@
+#!/usr/bin/env python3
+"""Benchmark pentru randarea raspunsurilor in streaming (Live + Markdown).
+
+Reda un raspuns sintetic de ~3000 de tokeni, chunk cu chunk, si compara
+timpul CPU al buclei vechi (re-randare completa la fiecare chunk) cu
+StreamingMarkdown.
+
+    python bench_render.py --tokens 3000 --tokens-per-second 0
+"""
+import io
+import sys
+import time
+import random
+import argparse
+
+from rich.console import Console
+from rich.live import Live
+from rich.markdown import Markdown
+
+from stream_render import StreamingMarkdown
+
+
+def generate_response(tokens, seed=7):
+    """Construieste un raspuns Markdown cu paragrafe, liste si blocuri de cod"""
+    rng = random.Random(seed)
+    words = ["the", "function", "returns", "value", "when", "config", "is", "loaded", "from",
+             "disk", "and", "cache", "entry", "expires", "before", "request", "handler", "runs"]
+    parts, count = [], 0
+    while count < tokens:
+        kind = rng.random()
+        if kind < 0.4:
+            n = rng.randint(30, 80)
+            parts.append(" ".join(rng.choice(words) for _ in range(n)).capitalize() + ".")
+        elif kind < 0.6:
+            n = rng.randint(3, 6)
+            parts.append("\n".join(f"- **{rng.choice(words)}**: " + " ".join(rng.choice(words) for _ in range(10))
+                                   for _ in range(n)))
+        else:
+            lines = rng.randint(15, 40)
+            body = "\n".join(f"    {rng.choice(words)}_{i} = compute({rng.choice(words)}, {i})" for i in range(lines))
+            parts.append(f"```python:module_{count}.py\ndef handler_{count}(request):\n{body}\n    return request\n```")
+        count = sum(len(p) for p in parts) // 4
+    return "\n\n".join(parts)
+
+
+def chunks_of(text, tokens):
+    """Imparte textul in chunk-uri de dimensiunea unui token (~4 caractere)"""
+    size = max(1, len(text) // tokens)
+    return [text[i:i + size] for i in range(0, len(text), size)]
+
+
+def run_legacy(chunks, delay):
+    console = Console(file=io.StringIO(), force_terminal=True, width=100, height=50)
+    response_text = ""
+    with Live("", refresh_per_second=10, console=console) as live:
+        for chunk in chunks:
+            response_text += chunk
+            live.update(Markdown(response_text))
+            if delay:
+                time.sleep(delay)
+
+
+def run_incremental(chunks, delay):
+    console = Console(file=io.StringIO(), force_terminal=True, width=100, height=50)
+    with Live("", refresh_per_second=10, console=console) as live:
+        renderer = StreamingMarkdown(live, refresh_per_second=10)
+        for chunk in chunks:
+            renderer.feed(chunk)
+            if delay:
+                time.sleep(delay)
+        renderer.close()
+
+
+def measure(func, *args):
+    cpu, wall = time.process_time(), time.perf_counter()
+    func(*args)
+    return time.process_time() - cpu, time.perf_counter() - wall
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--tokens", type=int, default=3000)
+    parser.add_argument("--tokens-per-second", type=float, default=0,
+                        help="replay speed (0 = as fast as possible)")
+    args = parser.parse_args()
+
+    text = generate_response(args.tokens)
+    chunks = chunks_of(text, args.tokens)
+    delay = 1.0 / args.tokens_per_second if args.tokens_per_second else 0
+    print(f"Response: {len(text)} chars, {len(chunks)} chunks")
+
+    for name, func in (("legacy", run_legacy), ("incremental", run_incremental)):
+        cpu, wall = measure(func, chunks, delay)
+        print(f"{name:<12} cpu {cpu:7.2f}s   wall {wall:7.2f}s")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
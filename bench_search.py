@@ -0,0 +1,131 @@
+#!/usr/bin/env python3
+"""Benchmark pentru /search: implementarea veche vs GrepEngine vs indexul de trigrame.
+
+Genereaza un arbore sintetic intr-un director temporar si masoara fiecare
+varianta pe aceleasi interogari.
+
+    python bench_search.py --files 5000 --lines 200
+"""
+import os
+import sys
+import time
+import random
+import shutil
+import argparse
+import tempfile
+
+from workspace_index import WorkspaceIndex
+from search_index import TrigramIndex, FileFilter
+from grep_engine import GrepEngine, Matcher, scan_bytes
+
+WORDS = ["user", "session", "token", "handler", "config", "request", "response",
+         "cache", "parse", "render", "value", "index", "result", "error", "client"]
+
+
+def generate_tree(root, files, lines):
+    """Creeaza fisiere .py/.js/.md cu continut pseudo-aleator"""
+    rng = random.Random(42)
+    for i in range(files):
+        subdir = os.path.join(root, f"pkg{i % 50}", f"mod{i % 7}")
+        os.makedirs(subdir, exist_ok=True)
+        ext = (".py", ".js", ".md")[i % 3]
+        with open(os.path.join(subdir, f"file{i}{ext}"), "w", encoding="utf-8") as f:
+            for _ in range(lines):
+                f.write(" ".join(rng.choice(WORDS) for _ in range(8)) + "\n")
+            if i % 97 == 0:
+                f.write("def needle_function(arg):\n    return arg\n")
+
+
+def legacy_search(search_term):
+    """Implementarea initiala din CLIAgent.search_in_files"""
+    results = []
+    for root, dirs, files in os.walk("."):
+        if '__pycache__' in root or '.git' in root:
+            continue
+        for file in files:
+            if file.endswith(('.py', '.js', '.html', '.css', '.md', '.txt', '.json')):
+                filepath = os.path.join(root, file)
+                try:
+                    with open(filepath, 'r', encoding='utf-8') as f:
+                        lines = f.readlines()
+                        for i, line in enumerate(lines, 1):
+                            if search_term.lower() in line.lower():
+                                results.append((filepath, i, line.strip()))
+                except:
+                    continue
+    return results
+
+
+def check_matcher():
+    """Cazuri limita ale Matcher: regex care potriveste sirul vid, termeni non-ASCII"""
+    data = "alpha\n\nbeta x\nGAMMA\n".encode("utf-8")
+    for term in ("$", "^", "x*", r"\s*"):
+        lines = [r[1] for r in scan_bytes("f", data, Matcher(term, regex=True))]
+        assert lines == [1, 2, 3, 4], (term, lines)
+    data = "Äpfel und Birnen\nkeine\näpfel klein\nÄPFELsaft\n".encode("utf-8")
+    for matcher, expected in ((Matcher("äpfel"), [1, 3, 4]),
+                              (Matcher("ÄPFEL", whole_word=True), [1, 3]),
+                              (Matcher(r"äpf\w+", regex=True), [1, 3, 4]),
+                              (Matcher("Äpfel", case_sensitive=True), [1])):
+        lines = [r[1] for r in scan_bytes("f", data, matcher)]
+        assert lines == expected, (matcher.text, lines)
+
+
+def timed(func, repeat):
+    best, result = None, None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = func()
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best, result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--files", type=int, default=3000)
+    parser.add_argument("--lines", type=int, default=200)
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--workers", type=int, default=None)
+    args = parser.parse_args()
+
+    check_matcher()
+    root = tempfile.mkdtemp(prefix="codemate_bench_")
+    cwd = os.getcwd()
+    try:
+        generate_tree(root, args.files, args.lines)
+        os.chdir(root)
+
+        index = WorkspaceIndex()
+        build_time, _ = timed(index.refresh, 1)
+        file_filter = FileFilter()
+        paths = file_filter.apply(index.paths())
+        total_bytes = sum(index.entry(p)["size"] for p in paths)
+        print(f"Tree: {len(paths)} files, {total_bytes / 1024 / 1024:.1f} MB "
+              f"(workspace index built in {build_time:.2f}s)")
+
+        engine = GrepEngine(workers=args.workers)
+        trigram_index = TrigramIndex()
+        trigram_time, _ = timed(lambda: trigram_index.update(index, file_filter), 1)
+        print(f"Trigram index built in {trigram_time:.2f}s\n")
+
+        print(f"{'query':<20}{'legacy':>10}{'grep':>10}{'trigram':>10}{'matches':>10}")
+        for term in ("needle_function", "session token", "handler"):
+            matcher = Matcher(term)
+            legacy, legacy_results = timed(lambda: legacy_search(term), args.repeat)
+            grep, _ = timed(lambda: [r for batch in engine.search(paths, matcher, total_bytes) for r in batch],
+                            args.repeat)
+            trigram, _ = timed(lambda: trigram_index.search(term), args.repeat)
+            print(f"{term:<20}{legacy * 1000:>8.0f}ms{grep * 1000:>8.0f}ms{trigram * 1000:>8.0f}ms"
+                  f"{len(legacy_results):>10}")
+
+        engine.close()
+        trigram_index.close()
+    finally:
+        os.chdir(cwd)
+        shutil.rmtree(root, ignore_errors=True)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
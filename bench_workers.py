@@ -0,0 +1,101 @@
+#!/usr/bin/env python3
+"""Benchmark pentru WorkerPool: latenta unui job rece (python nou) vs cald (fork din zygote).
+
+Ruleaza acelasi script mic de mai multe ori in fiecare mod: o data gol si o
+data cu importurile date (preincarcate in zygote pentru modul cald).
+
+    python bench_workers.py --runs 20 --import json,email.mime.text,http.client
+"""
+import os
+import sys
+import time
+import argparse
+import asyncio
+import tempfile
+import statistics
+
+from async_core import arun_process
+from worker_pool import WorkerPool
+
+
+def percentile(values, fraction):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(round(fraction * (len(values) - 1))))]
+
+
+async def measure(run, argv, runs):
+    times = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        result = await run(argv)
+        times.append(time.perf_counter() - start)
+        if result.returncode != 0:
+            raise RuntimeError(result.stderr.strip() or f"exit code {result.returncode}")
+    return times
+
+
+async def bench(pool, scripts, runs):
+    async def cold(argv):
+        return await arun_process([pool.python] + argv)
+
+    async def warm(argv):
+        result = await pool.run(argv)
+        if not result.warm:
+            raise RuntimeError("job did not run in the warm pool")
+        return result
+
+    rows = []
+    for label, path in scripts:
+        cold_times = await measure(cold, [path], runs)
+        warm_times = await measure(warm, [path], runs)
+        rows.append((label, cold_times, warm_times))
+    return rows
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--runs", type=int, default=20)
+    parser.add_argument("--import", dest="modules", default="json,email.mime.text,http.client,decimal",
+                        help="comma-separated modules the script imports (preloaded in the pool)")
+    args = parser.parse_args()
+
+    if not WorkerPool.supported():
+        print("WorkerPool needs os.fork (Linux/macOS)")
+        return 1
+    modules = [m.strip() for m in args.modules.split(',') if m.strip()]
+
+    with tempfile.TemporaryDirectory() as directory:
+        scripts = []
+        for label, body in (("empty script", "pass\n"),
+                            (f"imports {len(modules)} modules", "".join(f"import {m}\n" for m in modules))):
+            path = os.path.join(directory, f"job{len(scripts)}.py")
+            with open(path, 'w') as f:
+                f.write(body)
+            scripts.append((label, path))
+
+        pool = WorkerPool(preload=modules)
+        start = time.perf_counter()
+        pool.start()
+        while not pool.ready:
+            if pool.process is None or pool.process.poll() is not None:
+                print("worker pool failed to start")
+                return 1
+            time.sleep(0.005)
+        print(f"Pool ready in {(time.perf_counter() - start) * 1000:.0f} ms "
+              f"(preloaded: {', '.join(pool.loaded) or '-'}; failed: {', '.join(pool.failed) or '-'})")
+        try:
+            rows = asyncio.run(bench(pool, scripts, args.runs))
+        finally:
+            pool.close()
+
+    print(f"{'job':<22}{'cold median':>13}{'warm median':>13}{'cold p95':>10}{'warm p95':>10}{'saved':>9}")
+    for label, cold_times, warm_times in rows:
+        cold_median, warm_median = statistics.median(cold_times), statistics.median(warm_times)
+        print(f"{label:<22}{cold_median * 1000:>10.1f} ms{warm_median * 1000:>10.1f} ms"
+              f"{percentile(cold_times, 0.95) * 1000:>7.1f} ms{percentile(warm_times, 0.95) * 1000:>7.1f} ms"
+              f"{(1 - warm_median / cold_median) * 100:>8.0f}%")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
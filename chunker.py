@@ -0,0 +1,252 @@
+import os
+import re
+import ast
+import hashlib
+from collections import namedtuple, OrderedDict
+
+# O bucata de cod: tip (function/class/method/module/lines), nume, linii 1-based inclusive, text
+Chunk = namedtuple("Chunk", "kind name start end text")
+
+# Clasele/functiile mai lungi de atat sunt sparte in bucati mai mici
+MAX_CHUNK_LINES = 80
+
+JS_EXTENSIONS = ('.js', '.jsx', '.ts', '.tsx', '.mjs', '.cjs')
+
+_JS_DECLARATION = re.compile(
+    r'^(?:export\s+(?:default\s+)?)?(?:'
+    r'(?:async\s+)?function\s*\*?\s*(?P<function>[\w$]+)'
+    r'|(?:abstract\s+)?class\s+(?P<class>[\w$]+)'
+    r'|(?:const|let|var)\s+(?P<variable>[\w$]+)\s*(?::[^=]+)?=\s*(?:async\s+)?(?:function\b|\([^)]*\)\s*(?::[^=]+)?=>|[\w$]+\s*=>)'
+    r'|(?:interface|type|enum)\s+(?P<type>[\w$]+)'
+    r')')
+_JS_METHOD = re.compile(
+    r'^(?:(?:public|private|protected|static|async|readonly|get|set)\s+)*(?P<name>[\w$]+)\s*(?:<[^>]*>)?\s*\([^;]*$')
+_JS_KEYWORDS = frozenset(('if', 'for', 'while', 'switch', 'catch', 'return', 'function', 'with', 'else'))
+
+
+def _slice(lines, start, end):
+    return "\n".join(lines[start - 1:end])
+
+
+def _trim(lines, start, end):
+    """Scoate liniile goale de la sfarsitul intervalului"""
+    while end > start and not lines[end - 1].strip():
+        end -= 1
+    return end
+
+
+def _split_lines(lines, start, end, kind, name, size=MAX_CHUNK_LINES):
+    """Imparte un interval prea lung in ferestre de `size` linii"""
+    chunks = []
+    for first in range(start, end + 1, size):
+        last = min(end, first + size - 1)
+        label = name if first == start else f"{name} (cont.)"
+        chunks.append(Chunk(kind, label, first, last, _slice(lines, first, last)))
+    return chunks
+
+
+def _node_ranges(body, parent_end, lines):
+    """(nod, prima linie, ultima linie) pentru instructiunile unui body.
+
+    Python 3.7 nu are end_lineno: sfarsitul este linia dinaintea urmatoarei
+    instructiuni (sau sfarsitul parintelui), fara liniile goale.
+    """
+    ranges = []
+    for i, node in enumerate(body):
+        start = min([node.lineno] + [d.lineno for d in getattr(node, 'decorator_list', [])])
+        end = getattr(node, 'end_lineno', None)
+        if end is None:
+            following = body[i + 1] if i + 1 < len(body) else None
+            if following is not None:
+                end = min([following.lineno] + [d.lineno for d in getattr(following, 'decorator_list', [])]) - 1
+            else:
+                end = parent_end
+            end = _trim(lines, start, end)
+        ranges.append((node, start, end))
+    return ranges
+
+
+def python_chunks(source, max_lines=MAX_CHUNK_LINES):
+    """Functiile, clasele si metodele unui fisier Python, prin ast.
+
+    Codul de la nivelul modulului (importuri, constante) devine bucati
+    'module'. Clasele lungi sunt impartite in antet plus cate o bucata per metoda.
+    """
+    tree = ast.parse(source)
+    lines = source.splitlines()
+    chunks, pending = [], []
+
+    def flush_module():
+        if pending:
+            start, end = pending[0][0], pending[-1][1]
+            chunks.extend(_split_lines(lines, start, end, "module", "<module>", max_lines))
+            del pending[:]
+
+    for node, start, end in _node_ranges(tree.body, len(lines), lines):
+        if isinstance(node, (ast.FunctionDef, ast.AsyncFunctionDef)):
+            flush_module()
+            if end - start + 1 > max_lines:
+                chunks.extend(_split_lines(lines, start, end, "function", node.name, max_lines))
+            else:
+                chunks.append(Chunk("function", node.name, start, end, _slice(lines, start, end)))
+        elif isinstance(node, ast.ClassDef):
+            flush_module()
+            if end - start + 1 <= max_lines:
+                chunks.append(Chunk("class", node.name, start, end, _slice(lines, start, end)))
+                continue
+            members = _node_ranges(node.body, end, lines)
+            methods = [(m, s, e) for m, s, e in members if isinstance(m, (ast.FunctionDef, ast.AsyncFunctionDef))]
+            header_end = _trim(lines, start, methods[0][1] - 1) if methods else end
+            chunks.extend(_split_lines(lines, start, header_end, "class", node.name, max_lines))
+            for method, m_start, m_end in methods:
+                name = f"{node.name}.{method.name}"
+                if m_end - m_start + 1 > max_lines:
+                    chunks.extend(_split_lines(lines, m_start, m_end, "method", name, max_lines))
+                else:
+                    chunks.append(Chunk("method", name, m_start, m_end, _slice(lines, m_start, m_end)))
+        else:
+            pending.append((start, end))
+    flush_module()
+    return chunks
+
+
+def _block_end(lines, start):
+    """Linia (1-based) unde se inchide blocul { } inceput pe linia `start`.
+
+    Numara acoladele ignorand string-urile si comentariile; daca blocul nu
+    se deschide in primele linii, declaratia se termina pe linia curenta.
+    """
+    depth, opened = 0, False
+    in_block_comment, quote = False, None
+    for number in range(start, len(lines) + 1):
+        line = lines[number - 1]
+        i = 0
+        while i < len(line):
+            ch = line[i]
+            if in_block_comment:
+                if line.startswith('*/', i):
+                    in_block_comment = False
+                    i += 1
+            elif quote:
+                if ch == '\\':
+                    i += 1
+                elif ch == quote:
+                    quote = None
+            elif line.startswith('//', i):
+                break
+            elif line.startswith('/*', i):
+                in_block_comment = True
+                i += 1
+            elif ch in '"\'`':
+                quote = ch
+            elif ch == '{':
+                depth += 1
+                opened = True
+            elif ch == '}':
+                depth -= 1
+                if opened and depth <= 0:
+                    return number
+            i += 1
+        if quote in ('"', "'"):
+            quote = None  # string-urile simple nu trec pe linia urmatoare
+        if not opened and number - start >= 2:
+            return start
+    return len(lines)
+
+
+def js_chunks(source, max_lines=MAX_CHUNK_LINES):
+    """Impartire euristica JS/TS: functii, clase, arrow functions si metode"""
+    lines = source.splitlines()
+    chunks, pending_start = [], None
+    number = 1
+
+    def flush_module(end):
+        if pending_start is not None and end >= pending_start:
+            last = _trim(lines, pending_start, end)
+            if any(l.strip() for l in lines[pending_start - 1:last]):
+                chunks.extend(_split_lines(lines, pending_start, last, "module", "<module>", max_lines))
+
+    while number <= len(lines):
+        match = _JS_DECLARATION.match(lines[number - 1])
+        if not match:
+            if pending_start is None:
+                pending_start = number
+            number += 1
+            continue
+
+        flush_module(number - 1)
+        pending_start = None
+        end = _block_end(lines, number)
+        name = next(v for v in match.groupdict().values() if v)
+        kind = "class" if match.group('class') else "function"
+        if kind == "class" and end - number + 1 > max_lines:
+            chunks.extend(_js_class_chunks(lines, number, end, name, max_lines))
+        elif end - number + 1 > max_lines:
+            chunks.extend(_split_lines(lines, number, end, kind, name, max_lines))
+        else:
+            chunks.append(Chunk(kind, name, number, end, _slice(lines, number, end)))
+        number = end + 1
+    flush_module(len(lines))
+    return chunks
+
+
+def _js_class_chunks(lines, start, end, name, max_lines):
+    """Clasa lunga: antetul plus cate o bucata per metoda"""
+    chunks, header_end = [], None
+    number = start + 1
+    while number < end:
+        line = lines[number - 1].strip()
+        match = _JS_METHOD.match(line)
+        if match and match.group('name') not in _JS_KEYWORDS:
+            method_end = min(_block_end(lines, number), end - 1)
+            if header_end is None:
+                header_end = number - 1
+            method = f"{name}.{match.group('name')}"
+            if method_end - number + 1 > max_lines:
+                chunks.extend(_split_lines(lines, number, method_end, "method", method, max_lines))
+            else:
+                chunks.append(Chunk("method", method, number, method_end, _slice(lines, number, method_end)))
+            number = method_end + 1
+        else:
+            number += 1
+    header_end = _trim(lines, start, header_end if header_end is not None else end)
+    return _split_lines(lines, start, header_end, "class", name, max_lines) + chunks
+
+
+def line_chunks(source, size=60):
+    """Fallback pentru celelalte fisiere: ferestre fixe de linii"""
+    lines = source.splitlines()
+    return _split_lines(lines, 1, len(lines), "lines", "", size) if lines else []
+
+
+def chunk_source(path, source, max_lines=MAX_CHUNK_LINES):
+    """Imparte continutul unui fisier in bucati dupa limbaj"""
+    ext = os.path.splitext(path)[1].lower()
+    if ext == '.py':
+        try:
+            return python_chunks(source, max_lines)
+        except (SyntaxError, ValueError):
+            pass
+    elif ext in JS_EXTENSIONS:
+        return js_chunks(source, max_lines)
+    return line_chunks(source)
+
+
+class ChunkCache:
+    """Cache LRU de bucati, indexat dupa hash-ul continutului fisierului"""
+
+    def __init__(self, max_files=1024):
+        self.max_files = max_files
+        self._chunks = OrderedDict()
+
+    def get(self, path, source):
+        key = (os.path.splitext(path)[1].lower(), hashlib.sha1(source.encode('utf-8')).hexdigest())
+        chunks = self._chunks.get(key)
+        if chunks is None:
+            chunks = chunk_source(path, source)
+            self._chunks[key] = chunks
+            if len(self._chunks) > self.max_files:
+                self._chunks.popitem(last=False)
+        else:
+            self._chunks.move_to_end(key)
+        return chunks
@@ -1,23 +1,64 @@
-import requests
-import json
 import os
+import copy
 import glob
-import difflib
+import fnmatch
 import re
-import subprocess
 import shutil
+import asyncio
+import sqlite3
+import hashlib
+import time
+from concurrent.futures import ThreadPoolExecutor, wait
 from datetime import datetime
 from rich.console import Console
 from rich.syntax import Syntax
 from rich.panel import Panel
 from rich.tree import Tree
 from rich.table import Table
+from rich.live import Live
+from rich.text import Text
+from rich.prompt import Confirm
+from workspace_index import WorkspaceIndex, diff_snapshots
+from search_index import TrigramIndex, FileFilter
+from grep_engine import GrepEngine, Matcher, DEFAULT_MAX_FILE_SIZE
+from http_client import ChatClient, RetryPolicy, CircuitBreaker, CircuitOpenError
+from response_cache import ResponseCache, cache_key, referenced_files, replay_chunks
+from conversation import ConversationMemory, estimate_tokens
+from file_blocks import FILE_BLOCK, FileBlockParser
+from retrieval import RetrievalIndex, mentioned_files, build_context
+from chunker import ChunkCache
+from project_profile import ProjectProfile
+from snapshot_store import SnapshotStore
+from version_store import VersionStore
+from diff_engine import DiffPager, diff_text, hunk_header
+from rewrite_engine import RewriteEngine, RuleSet, make_rule, read_source, stage_rewrite
+from symbol_index import SymbolIndex, apply_renames, is_identifier
+from import_graph import ImportGraph
+from shard_runner import ShardRunner, ResultCache, cache_keys, impacted_tests
+from worker_pool import WorkerPool
+from proc_stream import LOG_DIR, ProcessOutput, astream_process
+from git_context import GitRepo, rank_hunks, format_hunk, describe_xy
+from async_core import run_async, iterate_async, astream_events
 
 console = Console()
 
+# Randuri afisate in rezumatele /batch (restul doar numarate)
+BATCH_TABLE_ROWS = 30
+
+# Esecuri afisate complet dupa /test si cate teste apar in "Slowest tests"
+TEST_FAILURE_PANELS = 10
+SLOWEST_TESTS = 10
+
+# Liniile de la final aratate cand ecoul live a sarit linii
+OUTPUT_TAIL_PANEL = 20
+# Extrasul din iesirea ultimei comenzi trimis modelului (inceput + final)
+MODEL_OUTPUT_HEAD = 20
+MODEL_OUTPUT_TAIL = 80
+
 class CLIAgent:
     def __init__(self):
-        # Încarcă API key
+        # Încarcă setările și API key
+        self.config = self._load_config()
         self.api_key = self._load_api_key()
         
         # Dacă cheia lipsește, afișăm o alertă clară
@@ -27,9 +68,111 @@ class CLIAgent:
             console.print(f"[green]✅ API Key încărcat: {self.api_key[:8]}...[/green]")
             
         self.model = "kwaipilot/kat-coder-pro:free"
+        self.temperature = 0.2
+        self.max_tokens = 3000
         self.base_url = "https://openrouter.ai/api/v1/chat/completions"
+        self.client = ChatClient(
+            self.base_url, self.api_key,
+            connect_timeout=self._setting('HTTP_CONNECT_TIMEOUT', 10.0, float),
+            read_timeout=self._setting('HTTP_READ_TIMEOUT', 60.0, float),
+            total_timeout=self._setting('HTTP_TOTAL_TIMEOUT', 300.0, float),
+            retry_policy=RetryPolicy(max_retries=self._setting('HTTP_MAX_RETRIES', 3, int)),
+            circuit_breaker=CircuitBreaker(
+                failure_threshold=self._setting('CIRCUIT_FAILURE_THRESHOLD', 5, int),
+                reset_timeout=self._setting('CIRCUIT_RESET_TIMEOUT', 30.0, float))
+        )
         self.conversation = []
-        self.file_history = {}
+        self.memory = ConversationMemory(
+            budget=self._setting('CONTEXT_TOKEN_BUDGET', 24000, int),
+            keep_recent=self._setting('CONTEXT_KEEP_MESSAGES', 4, int)
+        )
+        self.context_usage = None
+        # Prompt-ul de sistem stabil si starea workspace-ului la ultima tura (pentru delta)
+        self.system_prompt = None
+        self.system_prompt_generation = None
+        self.index_snapshot = None
+        self.known_dependencies = set()
+        # Hash-urile fragmentelor de cod deja trimise in conversatia curenta
+        self.sent_chunks = set()
+        # Metadatele ultimei ture: din cache, usage raportat de provider, eroare
+        self.last_turn = {}
+        self.diff_pager = DiffPager(max_hunks=self._setting('DIFF_MAX_HUNKS', 5, int),
+                                    max_lines=self._setting('DIFF_MAX_LINES', 300, int))
+        self.diff_timeout = self._setting('DIFF_TIMEOUT_MS', 500, int) / 1000.0
+        self.diff_stats = {}
+        self.history = VersionStore(keep=self._setting('HISTORY_KEEP', 20, int),
+                                    max_age=self._setting('HISTORY_MAX_DAYS', 30, float) * 86400)
+        # Un singur worker: blocurile de fisiere se scriu in ordinea din raspuns
+        self.file_writer = ThreadPoolExecutor(max_workers=1)
+        self.index = WorkspaceIndex()
+        self.cache = None
+        if self._setting('CACHE_ENABLED', True, lambda v: v.lower() not in ('0', 'false', 'no', 'off')):
+            self.cache = ResponseCache(
+                max_entries=self._setting('CACHE_MAX_ENTRIES', 500, int),
+                max_bytes=self._setting('CACHE_MAX_MB', 50, int) * 1024 * 1024,
+                ttl=self._setting('CACHE_TTL_HOURS', 168, float) * 3600
+            )
+        self.search_filter = FileFilter.from_strings(self._setting('SEARCH_INCLUDE'),
+                                                     self._setting('SEARCH_EXCLUDE'))
+        self.retrieval = RetrievalIndex()
+        self.retrieval_budget = self._setting('RETRIEVAL_TOKEN_BUDGET', 3000, int)
+        self.retrieval_max_files = self._setting('RETRIEVAL_MAX_FILES', 8, int)
+        self.chunk_cache = ChunkCache()
+        self.project = ProjectProfile()
+        self.snapshots = SnapshotStore()
+        self.backup_keep = self._setting('BACKUP_KEEP', 50, int)
+        self.git = GitRepo()
+        self.git_context = self._setting('GIT_CONTEXT', True, lambda v: v.lower() not in ('0', 'false', 'no', 'off'))
+        self.git_diff_budget = self._setting('GIT_DIFF_TOKEN_BUDGET', 1500, int)
+        self.git_changed_sent = None
+        self.import_graph = ImportGraph()
+        self.worker_pool = None
+        if self._setting('WORKER_POOL', True, lambda v: v.lower() not in ('0', 'false', 'no', 'off')) and WorkerPool.supported():
+            # Pornit la primul job Python (/run, /test, /profile), nu la fiecare sesiune
+            self.worker_pool = WorkerPool(preload=self._setting('WORKER_PRELOAD', 'pytest').replace(',', ' ').split())
+        self.shard_runner = ShardRunner(workers=self._setting('TEST_WORKERS', None, int), pool=self.worker_pool,
+                                        timeout=self._setting('TEST_TIMEOUT', 0, float))
+        self.output_limits = {"head": self._setting('OUTPUT_HEAD_LINES', 50, int),
+                              "tail": self._setting('OUTPUT_TAIL_LINES', 200, int),
+                              "max_line": self._setting('OUTPUT_MAX_LINE', 2000, int)}
+        self.output_echo_rate = self._setting('OUTPUT_ECHO_RATE', 200, int)
+        self.output_log_keep = self._setting('OUTPUT_LOG_KEEP', 20, int)
+        self.run_timeout = self._setting('RUN_TIMEOUT', 0, float) or None
+        # Extrasul iesirii ultimei comenzi /run sau /cmd, pentru urmatoarea tura
+        self.last_output = None
+        self.test_auto_run = self._setting('TEST_AUTO_RUN', False, lambda v: v.lower() in ('1', 'true', 'yes', 'on'))
+        self.written_since_test = set()
+        self.symbols = SymbolIndex(workers=self._setting('SEARCH_WORKERS', None, int))
+        self.rewrite_engine = RewriteEngine(workers=self._setting('SEARCH_WORKERS', None, int),
+                                             max_file_size=self._setting('SEARCH_MAX_FILE_SIZE', DEFAULT_MAX_FILE_SIZE, int))
+        self.grep_engine = GrepEngine(workers=self._setting('SEARCH_WORKERS', None, int),
+                                      max_file_size=self._setting('SEARCH_MAX_FILE_SIZE', DEFAULT_MAX_FILE_SIZE, int))
+    
+    def _load_config(self):
+        """Încarcă setările KEY=VALUE din .codemate_config"""
+        config = {}
+        config_file = '.codemate_config'
+        if os.path.exists(config_file):
+            try:
+                with open(config_file, 'r', encoding='utf-8-sig') as f:
+                    for line in f:
+                        match = re.match(r'\s*([A-Za-z_][A-Za-z0-9_]*)\s*=\s*(.*?)\s*$', line)
+                        if match:
+                            config[match.group(1).upper()] = match.group(2)
+            except Exception as e:
+                console.print(f"[dim red]Eroare la citirea fișierului config: {e}[/dim red]")
+        return config
+    
+    def _setting(self, key, default=None, cast=str):
+        """Citește o setare (CODEMATE_<KEY> din mediu are prioritate față de config)"""
+        value = os.getenv(f'CODEMATE_{key}', self.config.get(key))
+        if value is None or value == '':
+            return default
+        try:
+            return cast(value)
+        except ValueError:
+            console.print(f"[dim red]Valoare invalidă pentru {key}: {value}[/dim red]")
+            return default
     
     def _load_api_key(self):
         """Încarcă API key din surse multiple cu parsare robustă"""
@@ -53,55 +196,104 @@ class CLIAgent:
         
         return None
         
+    def retrieve_context(self, query):
+        """Fisierele relevante pentru mesaj (BM25) si fragmentele lor, in limita bugetului"""
+        ranked = []
+        try:
+            self.retrieval.update(self.index, self.search_filter)
+            ranked = [path for path, _ in self.retrieval.search(query, limit=self.retrieval_max_files)]
+        except sqlite3.Error as e:
+            console.print(f"[dim red]Retrieval index unavailable: {e}[/dim red]")
+        finally:
+            self.retrieval.close()
+        
+        # Fisierele numite explicit in mesaj au prioritate
+        mentioned = mentioned_files(query, self.index)
+        ranked = mentioned + [p for p in ranked if p not in mentioned]
+        snippets, _ = build_context(ranked, query, self.retrieval_budget, chunk_cache=self.chunk_cache,
+                                    seen=self.sent_chunks)
+        return ranked, snippets
+    
+    def _files_overview(self, files, max_listed=40):
+        """Lista fisierelor; pentru proiecte mari doar directoarele de top cu numarul de fisiere"""
+        if len(files) <= max_listed:
+            return ', '.join(files)
+        counts = {}
+        for f in files:
+            top = f.split(os.sep, 1)[0] + (os.sep if os.sep in f else '')
+            counts[top] = counts.get(top, 0) + 1
+        listed = sorted(counts.items(), key=lambda item: -item[1])[:max_listed]
+        return f"{len(files)} files; " + ', '.join(f"{name} ({n})" if n > 1 else name for name, n in listed)
+    
+    def git_diff_context(self, query, max_listed=15):
+        """Fisierele schimbate (git status) si hunk-urile din git diff, ordonate si in limita bugetului"""
+        if not self.git_context:
+            return ""
+        changed = self.git.changed_files(self.index.generation)
+        if not changed:
+            return ""
+        
+        parts, already_shown = [], []
+        # Lista fisierelor schimbate se retrimite doar cand difera de cea trimisa
+        if changed != self.git_changed_sent:
+            more = f" (+{len(changed) - max_listed} more)" if len(changed) > max_listed else ""
+            parts.append("Uncommitted changes (most recent first): " +
+                         ", ".join(f"{path} ({what})" for path, what in changed[:max_listed]) + more)
+            self.git_changed_sent = changed
+        
+        used = sum(estimate_tokens(p) for p in parts)
+        for hunk in rank_hunks(self.git.diff(self.index.generation), query):
+            text = format_hunk(hunk)
+            digest = hashlib.sha1(text.encode('utf-8')).hexdigest()
+            if digest in self.sent_chunks:
+                already_shown.append(f"{hunk['path']}:{hunk['start']}")
+                continue
+            cost = estimate_tokens(text)
+            if used + cost > self.git_diff_budget:
+                continue
+            parts.append(text)
+            self.sent_chunks.add(digest)
+            used += cost
+        
+        if already_shown:
+            parts.append("Diff hunks already shown (unchanged): " + ", ".join(already_shown))
+        return "\n\n".join(parts)
+    
     def get_workspace_context(self):
         """Obtine contextul complet si inteligent al workspace-ului"""
-        # Context de baza
-        files = []
-        for root, dirs, filenames in os.walk("."):
-            for filename in filenames:
-                if not filename.startswith('.') and not '__pycache__' in root:
-                    rel_path = os.path.relpath(os.path.join(root, filename))
-                    files.append(rel_path)
+        # Context de baza (din indexul workspace-ului)
+        self.index.refresh()
+        files = [f for f in self.index.paths() if not os.path.basename(f).startswith('.')]
         
-        # Detecteaza tipul de proiect
-        project_info = self.detect_project_type()
+        # Profilul proiectului (memorat pana se schimba un manifest)
+        profile = self.project.profile(self.index)
+        project_info = profile["root"]
         
         # Incarca configuratii
         configs = self.load_config_files()
         
-        # Analizeaza dependentele
-        dependencies = self.analyze_dependencies()
-        
         # Construieste contextul
         context = f"""Current directory: {os.getcwd()}
 Project type: {project_info['type']}
 Language: {project_info['language']}
-Framework: {project_info.get('framework', 'None')}
+Framework: {project_info.get('framework') or 'None'}
 
-Available files: {', '.join(files[:15])}
+Available files: {self._files_overview(files)}
 """
         
-        # Adauga dependentele
-        if dependencies["main"]:
-            context += f"\nMain dependencies: {', '.join(dependencies['main'][:8])}"
-        if dependencies["python"]:
-            context += f"\nPython packages: {', '.join(dependencies['python'][:8])}"
+        # Adauga sub-proiectele si dependentele lor
+        for project in profile["projects"]:
+            deps = project["dependencies"]["main"]
+            more = f" (+{len(deps) - 12} more)" if len(deps) > 12 else ""
+            framework = f", {project['framework']}" if project["framework"] else ""
+            context += (f"\nProject {project['path']} ({project['type']}{framework}): "
+                        f"{', '.join(deps[:12]) or 'no runtime dependencies'}{more}")
         
         # Adauga preview-uri de configuratie
         for config_name, config_content in configs.items():
             if len(config_content) < 500:
                 context += f"\n\n{config_name}:\n{config_content[:300]}\n---"
         
-        # Adauga continutul fisierelor importante
-        important_files = [f for f in files[:5] if f.endswith(('.py', '.js', '.md')) and os.path.getsize(f) < 1000]
-        for file in important_files:
-            try:
-                with open(file, 'r', encoding='utf-8') as f:
-                    content = f.read()[:400]
-                context += f"\n\n{file} preview:\n{content}\n---"
-            except:
-                pass
-        
         return context
     
     def read_file(self, filepath):
@@ -145,6 +337,8 @@ Available files: {', '.join(files[:15])}
             
             with open(filepath, 'w', encoding='utf-8') as f:
                 f.write(content)
+            self.index.touch(filepath)
+            self.written_since_test.add(os.path.relpath(filepath))
             
             # Arata diff-ul
             self.show_diff(filepath, old_content, content)
@@ -154,49 +348,49 @@ Available files: {', '.join(files[:15])}
             return False
     
     def _save_backup(self, filepath, content):
-        """Salveaza backup pentru undo"""
-        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-        
-        if filepath not in self.file_history:
-            self.file_history[filepath] = []
-        
-        # Pastreaza ultimele 5 versiuni
-        self.file_history[filepath].append({
-            'content': content,
-            'timestamp': timestamp
-        })
-        
-        if len(self.file_history[filepath]) > 5:
-            self.file_history[filepath].pop(0)
+        """Salveaza backup pentru undo (istoric persistent, vezi version_store.py)"""
+        try:
+            self.history.record(filepath, content.encode('utf-8') if isinstance(content, str) else content)
+        except OSError as e:
+            console.print(f"[dim red]Could not save history for {filepath}: {e}[/dim red]")
+    
+    def _read_current(self, filepath):
+        try:
+            with open(filepath, 'rb') as f:
+                return f.read()
+        except OSError:
+            return b""
+    
+    def _write_version(self, filepath, content):
+        os.makedirs(os.path.dirname(filepath) or '.', exist_ok=True)
+        with open(filepath, 'wb') as f:
+            f.write(content)
+        self.index.touch(filepath)
     
     def undo_file_changes(self, filepath):
         """Anuleaza ultima modificare a fisierului"""
-        if filepath not in self.file_history or not self.file_history[filepath]:
+        versions = self.history.versions(filepath)
+        if not versions:
             console.print(f"[yellow]No backup found for {filepath}[/yellow]")
             return False
         
-        # Ia ultima versiune din istoric
-        last_backup = self.file_history[filepath][-1]
-        
         try:
-            # Salveaza versiunea curenta inainte de undo
-            if os.path.exists(filepath):
-                with open(filepath, 'r', encoding='utf-8') as f:
-                    current_content = f.read()
-            else:
-                current_content = ""
+            # Ia ultima versiune din istoric
+            last_content = self.history.read(filepath, len(versions))
+            current_content = self._read_current(filepath)
             
             # Restaureaza versiunea anterioara
-            with open(filepath, 'w', encoding='utf-8') as f:
-                f.write(last_backup['content'])
+            self._write_version(filepath, last_content)
             
             # Arata ce s-a schimbat
-            self.show_diff(filepath, current_content, last_backup['content'])
+            self.show_diff(filepath, current_content.decode('utf-8', errors='replace'),
+                           last_content.decode('utf-8', errors='replace'))
             
             # Sterge din istoric (nu mai poate face undo la aceasta)
-            self.file_history[filepath].pop()
+            self.history.pop(filepath)
             
-            console.print(f"[green]✅ Reverted {filepath} to version from {last_backup['timestamp']}[/green]")
+            timestamp = datetime.fromtimestamp(versions[-1]['time']).strftime("%Y%m%d_%H%M%S")
+            console.print(f"[green]✅ Reverted {filepath} to version from {timestamp}[/green]")
             return True
             
         except Exception as e:
@@ -205,7 +399,8 @@ Available files: {', '.join(files[:15])}
     
     def show_file_history(self, filepath):
         """Afiseaza istoricul modificarilor pentru un fisier"""
-        if filepath not in self.file_history or not self.file_history[filepath]:
+        versions = self.history.versions(filepath)
+        if not versions:
             console.print(f"[yellow]No history found for {filepath}[/yellow]")
             return
         
@@ -213,37 +408,37 @@ Available files: {', '.join(files[:15])}
         table.add_column("Version", style="cyan")
         table.add_column("Timestamp", style="green")
         table.add_column("Size", style="magenta")
+        table.add_column("Stored", style="dim")
         
-        for i, backup in enumerate(self.file_history[filepath], 1):
-            size = f"{len(backup['content'])} chars"
-            table.add_row(str(i), backup['timestamp'], size)
+        for i, version in enumerate(versions, 1):
+            timestamp = datetime.fromtimestamp(version['time']).strftime("%Y%m%d_%H%M%S")
+            table.add_row(str(i), timestamp, f"{version['size']} bytes", f"{version['stored']} bytes")
         
         console.print(table)
     
     def restore_file_version(self, filepath, version_index):
         """Restaureaza o versiune specifica din istoric"""
-        if filepath not in self.file_history or not self.file_history[filepath]:
+        versions = self.history.versions(filepath)
+        if not versions:
             console.print(f"[yellow]No history found for {filepath}[/yellow]")
             return False
         
-        if version_index < 1 or version_index > len(self.file_history[filepath]):
-            console.print(f"[red]Invalid version index. Available: 1-{len(self.file_history[filepath])}[/red]")
+        if version_index < 1 or version_index > len(versions):
+            console.print(f"[red]Invalid version index. Available: 1-{len(versions)}[/red]")
             return False
         
-        backup = self.file_history[filepath][version_index - 1]
-        
         try:
+            content = self.history.read(filepath, version_index)
+            
             # Salveaza versiunea curenta
             if os.path.exists(filepath):
-                with open(filepath, 'r', encoding='utf-8') as f:
-                    current_content = f.read()
-                self._save_backup(filepath, current_content)
+                self._save_backup(filepath, self._read_current(filepath))
             
             # Restaureaza versiunea selectata
-            with open(filepath, 'w', encoding='utf-8') as f:
-                f.write(backup['content'])
+            self._write_version(filepath, content)
             
-            console.print(f"[green]✅ Restored {filepath} to version {version_index} ({backup['timestamp']})[/green]")
+            timestamp = datetime.fromtimestamp(versions[version_index - 1]['time']).strftime("%Y%m%d_%H%M%S")
+            console.print(f"[green]✅ Restored {filepath} to version {version_index} ({timestamp})[/green]")
             return True
             
         except Exception as e:
@@ -251,46 +446,63 @@ Available files: {', '.join(files[:15])}
             return False
     
     def show_diff(self, filepath, old_content, new_content):
-        """Arata diferentele intre versiuni"""
+        """Arata diferentele intre versiuni: rezumat si prima pagina de hunk-uri (restul cu /diff more)"""
         if not old_content:
-            console.print(f"[green]✅ Created {filepath}[/green]")
-            # Afiseaza continutul nou creat
+            lines = new_content.splitlines()
+            console.print(f"[green]✅ Created {filepath}[/green] [dim]({len(lines)} lines)[/dim]")
+            # Afiseaza inceputul continutului nou creat
             ext = os.path.splitext(filepath)[1].lower()
             lang_map = {
                 '.py': 'python', '.js': 'javascript', '.html': 'html',
                 '.css': 'css', '.json': 'json', '.md': 'markdown'
             }
-            syntax = Syntax(new_content, lang_map.get(ext, 'text'), theme="monokai")
-            console.print(Panel(syntax, title=f"📄 {filepath}", border_style="green"))
+            self.diff_stats[filepath] = (1, len(lines), 0)
+            self._render_diff_page(self.diff_pager.add(filepath, [(lang_map.get(ext, 'text'), "", lines)]))
             return
-            
-        old_lines = old_content.splitlines(keepends=True)
-        new_lines = new_content.splitlines(keepends=True)
-        
-        diff = list(difflib.unified_diff(
-            old_lines, new_lines,
-            fromfile=f"{filepath} (before)",
-            tofile=f"{filepath} (after)",
-            lineterm=""
-        ))
         
-        if diff:
-            console.print(f"\n[yellow]🔄 Modified {filepath}:[/yellow]")
-            diff_text = "".join(diff)
-            console.print(Panel(
-                Syntax(diff_text, "diff", theme="monokai"),
-                title="Changes",
-                border_style="yellow"
-            ))
+        result = diff_text(old_content, new_content, timeout=self.diff_timeout)
+        hunks = result["hunks"]
+        if not hunks:
+            self.diff_pager.discard(filepath)
+            return
+        
+        self.diff_stats[filepath] = (len(hunks), result["added"], result["removed"])
+        note = " [yellow](time limit reached, diff may not be minimal)[/yellow]" if result["timed_out"] else ""
+        console.print(f"\n[yellow]🔄 Modified {filepath}:[/yellow] [dim]{len(hunks)} hunks,[/dim] "
+                      f"[green]+{result['added']}[/green] [red]-{result['removed']}[/red]{note}")
+        self._render_diff_page(self.diff_pager.add(
+            filepath, [("diff", hunk_header(hunk), hunk["lines"]) for hunk in hunks]))
+    
+    def _render_diff_page(self, page):
+        """Afiseaza o pagina de blocuri (un Panel per fisier) si cat a mai ramas"""
+        by_path = {}
+        for path, lexer, header, lines in page:
+            by_path.setdefault(path, (lexer, []))[1].extend(([header] if header else []) + lines)
+        for path, (lexer, lines) in by_path.items():
+            if lexer == "diff":
+                console.print(Panel(Syntax("\n".join(lines), "diff", theme="monokai"),
+                                    title=f"Changes: {path}", border_style="yellow"))
+            else:
+                console.print(Panel(Syntax("\n".join(lines), lexer, theme="monokai"),
+                                    title=f"📄 {path}", border_style="green"))
+        files, blocks, lines = self.diff_pager.remaining()
+        if blocks:
+            console.print(f"[dim]… {lines} more lines in {blocks} hunks across {files} files - /diff more[/dim]")
+    
+    def show_more_diff(self):
+        """Urmatoarea pagina de hunk-uri neafisate"""
+        page = self.diff_pager.next_page()
+        if not page:
+            console.print("[dim]No more changes to show[/dim]")
+            return
+        self._render_diff_page(page)
     
     def list_files(self, pattern="*"):
         """Listeaza fisierele din workspace"""
         tree = Tree(f"📁 {os.path.basename(os.getcwd())}")
         
-        for root, dirs, files in os.walk("."):
-            if '__pycache__' in root or '.git' in root:
-                continue
-                
+        self.index.refresh()
+        for root, files in self.index.directories():
             level = tree
             if root != ".":
                 level = tree.add(f"📁 {os.path.relpath(root)}")
@@ -302,18 +514,24 @@ Available files: {', '.join(files[:15])}
         
         console.print(tree)
     
-    def execute_file_operations(self, response_text):
+    def execute_file_operations(self, response_text, written_files=None):
         """Executa operatiunile cu fisiere din raspunsul AI"""
         modified_response = response_text
         
         # Detecteaza si executa blocuri de cod cu nume de fisier
-        code_blocks = re.findall(r'```(\w+):([^\n]+)\n(.*?)```', response_text, re.DOTALL)
+        # (cele deja scrise in timpul streaming-ului sunt doar confirmate)
+        code_blocks = FILE_BLOCK.findall(response_text)
         
-        for lang, filename, code in code_blocks:
+        for index, (lang, filename, code) in enumerate(code_blocks):
             filename = filename.strip()
             code = code.strip()
             
-            if self.write_file(filename, code):
+            if written_files is not None and index < len(written_files):
+                written = written_files[index]
+            else:
+                written = self.write_file(filename, code)
+            
+            if written:
                 # Inlocuieste blocul de cod cu confirmarea
                 old_block = f'```{lang}:{filename}\n{code}\n```'
                 new_block = f'✅ **Created/Modified {filename}**'
@@ -339,13 +557,19 @@ Available files: {', '.join(files[:15])}
         
         return modified_response
     
-    def send_message_stream(self, user_message):
-        """Trimite mesaj la AI cu streaming"""
+    def fork(self):
+        """Copie a agentului cu conversatie proprie (client, cache si index sunt partajate)"""
+        clone = copy.copy(self)
+        clone.conversation = []
+        clone.context_usage = None
+        clone.last_turn = {}
+        clone.sent_chunks = set()
+        clone.git_changed_sent = None
+        return clone
+    
+    def _build_system_prompt(self):
         context = self.get_workspace_context()
-        
-        system_prompt = {
-            "role": "system",
-            "content": f"""You are CodeMate CLI, an advanced AI coding assistant with full file system access.
+        return f"""You are CodeMate CLI, an advanced AI coding assistant with full file system access.
 
 Current workspace context:
 {context}
@@ -357,344 +581,751 @@ Capabilities:
 - Analyze code, suggest improvements, debug issues
 - Understand project structure and dependencies
 
+User messages may end with "Workspace changes since last turn" and "Relevant workspace files";
+code you have already been shown in this conversation is referenced, not repeated.
+
 Always:
 1. Understand the full context before acting
 2. Explain what you're doing
 3. Use appropriate file formats and naming
 4. Follow best practices for the language/framework
 5. Be concise but thorough"""
-        }
-        
+    
+    def _dependency_set(self):
+        """Toate dependentele din toate sub-proiectele (indexul este deja reimprospatat)"""
+        return {dep for project in self.project.profile(self.index)["projects"]
+                for group in project["dependencies"].values() for dep in group}
+    
+    def _ensure_system_prompt(self):
+        """Prompt-ul de sistem; reconstruit doar daca workspace-ul s-a schimbat de la ultima constructie"""
+        self.index.refresh()
+        if self.system_prompt is None or self.index.generation != self.system_prompt_generation:
+            self.system_prompt = self._build_system_prompt()
+            self.system_prompt_generation = self.index.generation
+        self.index_snapshot = self.index.snapshot()
+        self.known_dependencies = self._dependency_set()
+        return self.system_prompt
+    
+    def _workspace_delta(self, max_listed=20):
+        """Schimbarile din workspace de la tura precedenta, ca text compact ('' daca nu sunt)"""
+        self.index.refresh()
+        snapshot = self.index.snapshot()
+        changes = diff_snapshots(self.index_snapshot or {}, snapshot)
+        dependencies = self._dependency_set()
+        added_deps = sorted(dependencies - self.known_dependencies)
+        removed_deps = sorted(self.known_dependencies - dependencies)
+        self.index_snapshot, self.known_dependencies = snapshot, dependencies
+        
+        lines = []
+        for label, items in (("added", changes["added"]), ("removed", changes["removed"]),
+                             ("modified", changes["modified"]), ("new dependencies", added_deps),
+                             ("removed dependencies", removed_deps)):
+            if items:
+                more = f" (+{len(items) - max_listed} more)" if len(items) > max_listed else ""
+                lines.append(f"- {label}: {', '.join(items[:max_listed])}{more}")
+        return "Workspace changes since last turn:\n" + "\n".join(lines) if lines else ""
+    
+    def _acknowledge_writes(self, paths):
+        """Fisierele scrise chiar de model nu apar ca schimbari in delta turei urmatoare"""
+        if self.index_snapshot is None:
+            return
+        for path in paths:
+            entry = self.index.entry(path)
+            if entry is not None:
+                self.index_snapshot[os.path.relpath(path)] = (entry["size"], entry["mtime"])
+    
+    def send_message_stream(self, user_message):
+        """Trimite mesaj la AI cu streaming (wrapper sincron peste asend_message)"""
+        return iterate_async(self.asend_message(user_message))
+    
+    async def asend_message(self, user_message):
+        """Trimite mesaj la AI cu streaming; la anulare pastreaza raspunsul partial"""
+        # Prompt de sistem stabil (prefix cache-uibil la provider); schimbarile din
+        # workspace ajung in mesajul userului ca delta fata de tura precedenta
+        delta = ""
         if not self.conversation or self.conversation[0]["role"] != "system":
-            self.conversation.insert(0, system_prompt)
-        
+            self.conversation.insert(0, {"role": "system", "content": self._ensure_system_prompt()})
+        else:
+            delta = self._workspace_delta()
+        relevant_files, snippets = self.retrieve_context(user_message)
+        git_changes = self.git_diff_context(user_message)
+        
+        if delta:
+            user_message = f"{user_message}\n\n{delta}"
+        # Modificarile in curs (git diff) sunt de obicei subiectul intrebarii
+        if git_changes:
+            user_message = f"{user_message}\n\n{git_changes}"
+        # Iesirea ultimei comenzi rulate, o singura data
+        if self.last_output:
+            user_message = f"{user_message}\n\n{self.last_output}"
+            self.last_output = None
+        # Codul relevant pentru mesaj (BM25) insoteste intrebarea, la fiecare tura
+        if snippets:
+            user_message = f"{user_message}\n\nRelevant workspace files ({', '.join(relevant_files[:8])}):\n\n{snippets}"
         self.conversation.append({"role": "user", "content": user_message})
+        self.last_turn = {"cached": False, "usage": None, "error": None}
+        
+        # Tine istoricul sub bugetul de tokeni (compacteaza turele vechi)
+        self.conversation, self.context_usage = self.memory.compact(self.conversation)
+        if self.context_usage["stubbed"] or self.context_usage["summarized"]:
+            # Codul trimis anterior poate sa fi fost compactat: poate fi retrimis
+            self.sent_chunks.clear()
+            self.git_changed_sent = None
+        
+        def on_retry(attempt, delay, reason):
+            console.print(f"[dim yellow]⏳ {reason}, retrying in {delay:.1f}s (attempt {attempt})...[/dim yellow]")
         
         try:
-            response = requests.post(self.base_url, json={
-                "model": self.model,
-                "messages": self.conversation,
-                "temperature": 0.2,
-                "max_tokens": 3000,
-                "stream": True
-            }, headers={
-                "Authorization": f"Bearer {self.api_key}",
-                "Content-Type": "application/json"
-            }, stream=True)
+            # Raspunsurile pentru prompturi identice (si fisiere neschimbate) vin din cache
+            key, cached = None, None
+            if self.cache:
+                key = cache_key(self.model, self.temperature, self.conversation,
+                                referenced_files(self.conversation, self.index))
+                cached = self.cache.get(key)
             
-            response.raise_for_status()
+            if cached is not None:
+                self.last_turn["cached"] = True
+                chunks = self._replay_chunks(cached)
+            else:
+                chunks = self._stream_chunks(on_retry)
             
+            # Blocurile de fisiere inchise sunt scrise in fundal cat timp stream-ul continua
             full_response = ""
-            for line in response.iter_lines():
-                if line:
-                    line = line.decode('utf-8')
-                    if line.startswith('data: '):
-                        data = line[6:]
-                        if data == '[DONE]':
-                            break
-                        try:
-                            json_data = json.loads(data)
-                            if 'choices' in json_data and json_data['choices']:
-                                delta = json_data['choices'][0].get('delta', {})
-                                if 'content' in delta:
-                                    chunk = delta['content']
-                                    full_response += chunk
-                                    yield chunk
-                        except json.JSONDecodeError:
-                            continue
+            parser = FileBlockParser()
+            pending_writes, write_paths = [], []
+            self.diff_stats = {}
+            try:
+                async for chunk in chunks:
+                    full_response += chunk
+                    for lang, filename, code in parser.feed(chunk):
+                        pending_writes.append(self.file_writer.submit(self.write_file, filename, code))
+                        write_paths.append(filename)
+                    yield chunk
+            except (asyncio.CancelledError, GeneratorExit):
+                # Tura anulata: raspunsul partial ramane in conversatie
+                if full_response:
+                    self.conversation.append({"role": "assistant", "content": full_response + "\n\n[interrupted]"})
+                raise
+            finally:
+                await chunks.aclose()
+                wait(pending_writes)
             
-            # Executa operatiunile cu fisiere dupa streaming
-            self.execute_file_operations(full_response)
+            if cached is None and key and full_response:
+                self.cache.put(key, full_response)
+            
+            # Restul operatiunilor (citiri, listari) dupa streaming
+            written = [f.result() for f in pending_writes]
+            if len(self.diff_stats) > 1:
+                console.print(f"[bold]📝 {len(self.diff_stats)} files changed:[/bold] "
+                              f"{sum(s[0] for s in self.diff_stats.values())} hunks, "
+                              f"[green]+{sum(s[1] for s in self.diff_stats.values())}[/green] "
+                              f"[red]-{sum(s[2] for s in self.diff_stats.values())}[/red]")
+            self.execute_file_operations(full_response, written_files=written)
+            self.last_turn["written"] = [path for path, ok in zip(write_paths, written) if ok]
+            self._acknowledge_writes(self.last_turn["written"])
             self.conversation.append({"role": "assistant", "content": full_response})
+            self.context_usage["after"] = self.memory.usage(self.conversation)
             
+        except (asyncio.CancelledError, GeneratorExit):
+            raise
+        except CircuitOpenError as e:
+            self.last_turn["error"] = str(e)
+            yield f"⛔ {e}"
         except Exception as e:
+            self.last_turn["error"] = str(e)
             yield f"❌ Error: {e}"
     
-    def search_in_files(self, search_term):
-        """Cauta text in toate fisierele"""
-        results = []
-        for root, dirs, files in os.walk("."):
-            if '__pycache__' in root or '.git' in root:
-                continue
-            for file in files:
-                if file.endswith(('.py', '.js', '.html', '.css', '.md', '.txt', '.json')):
-                    filepath = os.path.join(root, file)
-                    try:
-                        with open(filepath, 'r', encoding='utf-8') as f:
-                            lines = f.readlines()
-                            for i, line in enumerate(lines, 1):
-                                if search_term.lower() in line.lower():
-                                    results.append((filepath, i, line.strip()))
-                    except:
-                        continue
-        
-        if results:
-            table = Table(title=f"Search Results for '{search_term}'")
-            table.add_column("File", style="cyan")
-            table.add_column("Line", style="magenta")
-            table.add_column("Content", style="white")
-            
-            for filepath, line_num, content in results[:20]:  # Primele 20
-                table.add_row(filepath, str(line_num), content[:80] + "..." if len(content) > 80 else content)
-            
-            console.print(table)
+    async def _replay_chunks(self, text):
+        """Async generator: reda un raspuns din cache ca pe un stream"""
+        for chunk in replay_chunks(text):
+            yield chunk
+            await asyncio.sleep(0)
+    
+    async def _stream_chunks(self, on_retry=None):
+        """Async generator: fragmentele de text ale raspunsului de la provider"""
+        async for json_data in astream_events(self.client, {
+            "model": self.model,
+            "messages": list(self.conversation),
+            "temperature": self.temperature,
+            "max_tokens": self.max_tokens,
+            "stream": True,
+            "stream_options": {"include_usage": True}
+        }, on_retry=on_retry):
+            if json_data.get('usage'):
+                self.last_turn["usage"] = json_data['usage']
+            if 'choices' in json_data and json_data['choices']:
+                delta = json_data['choices'][0].get('delta', {})
+                if delta.get('content'):
+                    yield delta['content']
+    
+    def show_context_usage(self):
+        """Afiseaza cat din bugetul de tokeni foloseste conversatia"""
+        if not self.context_usage:
+            return
+        
+        used, budget = self.context_usage["after"], self.memory.budget
+        percent = used * 100 // budget if budget else 0
+        color = "green" if percent < 70 else "yellow" if percent < 100 else "red"
+        message = f"[dim]Context: [{color}]~{used:,}[/{color}] / {budget:,} tokens ({percent}%)"
+        if self.context_usage["stubbed"] or self.context_usage["summarized"]:
+            message += (f" · compacted {self.context_usage['stubbed']} code blocks,"
+                        f" summarized {self.context_usage['summarized']} messages")
+        console.print(message + "[/dim]")
+    
+    def show_cache_stats(self):
+        """Afiseaza statisticile cache-ului de raspunsuri"""
+        if not self.cache:
+            console.print("[yellow]Response cache is disabled (CACHE_ENABLED=0)[/yellow]")
+            return
+        
+        stats = self.cache.stats()
+        table = Table(title="Response Cache")
+        table.add_column("Metric", style="cyan")
+        table.add_column("Value", style="magenta")
+        table.add_row("Entries", f"{stats['entries']} / {self.cache.max_entries}")
+        table.add_row("Size", f"{stats['bytes'] / 1024:.1f} KB / {self.cache.max_bytes / 1024 / 1024:.0f} MB")
+        table.add_row("TTL", f"{self.cache.ttl / 3600:.0f} h")
+        table.add_row("Hits (all time)", str(stats['total_hits']))
+        table.add_row("Hits / misses (session)", f"{stats['session_hits']} / {stats['session_misses']}")
+        console.print(table)
+    
+    def clear_cache(self):
+        """Goleste cache-ul de raspunsuri"""
+        if not self.cache:
+            console.print("[yellow]Response cache is disabled (CACHE_ENABLED=0)[/yellow]")
+            return
+        
+        removed = self.cache.clear()
+        console.print(f"[green]✅ Cleared {removed} cached responses[/green]")
+    
+    def build_search_index(self):
+        """Construieste/actualizeaza indexul de trigrame pentru /search"""
+        self.index.refresh()
+        trigram_index = TrigramIndex()
+        try:
+            updated = trigram_index.update(self.index, self.search_filter)
+            total = len(self.search_filter.apply(self.index.paths()))
+            console.print(f"[green]✅ Search index updated ({updated} files reindexed, {total} total)[/green]")
+        except Exception as e:
+            console.print(f"[red]Error building search index: {e}[/red]")
+        finally:
+            trigram_index.close()
+    
+    def _search_batches(self, search_term, matcher, regex):
+        """Produce rezultatele pe loturi; indexul de trigrame (daca exista) restrange fisierele"""
+        if TrigramIndex.exists():
+            trigram_index = TrigramIndex()
+            try:
+                trigram_index.update(self.index, self.search_filter)
+                filepaths = trigram_index.candidate_paths(search_term, regex)
+            finally:
+                trigram_index.close()
+        else:
+            filepaths = self.search_filter.apply(self.index.paths())
+        
+        total_bytes = sum(self.index.entry(p)['size'] for p in filepaths if self.index.entry(p))
+        for batch in self.grep_engine.search(filepaths, matcher, total_bytes):
+            yield batch
+    
+    def search_in_files(self, search_term, case_sensitive=False, regex=False, whole_word=False, max_rows=50):
+        """Cauta text in toate fisierele (prin indexul de trigrame, daca exista)"""
+        try:
+            matcher = Matcher(search_term, case_sensitive, regex, whole_word)
+        except re.error as e:
+            console.print(f"[red]Invalid regex '{search_term}': {e}[/red]")
+            return
+        
+        self.index.refresh()
+        
+        table = Table(title=f"Search Results for '{search_term}'")
+        table.add_column("File", style="cyan")
+        table.add_column("Line", style="magenta")
+        table.add_column("Content", style="white")
+        
+        total_lines, total_matches, files = 0, 0, set()
+        
+        # Rezultatele apar in tabel pe masura ce sunt gasite
+        with Live(table, console=console, refresh_per_second=10, transient=False) as live:
+            for batch in self._search_batches(search_term, matcher, regex):
+                for filepath, line_num, content, count in batch:
+                    if total_lines < max_rows:
+                        table.add_row(filepath, str(line_num), content[:80] + "..." if len(content) > 80 else content)
+                    total_lines += 1
+                    total_matches += count
+                    files.add(filepath)
+                if total_lines > max_rows:
+                    table.caption = f"Showing {max_rows} of {total_lines} matching lines"
+                live.refresh()
+            if not total_lines:
+                live.update("")
+        
+        if total_lines:
+            console.print(f"[dim]{total_matches} matches on {total_lines} lines in {len(files)} files[/dim]")
         else:
             console.print(f"[yellow]No results found for '{search_term}'[/yellow]")
     
     def git_status(self):
-        """Afiseaza status Git"""
-        try:
-            result = subprocess.run(['git', 'status', '--porcelain'], 
-                                  capture_output=True, text=True, cwd='.')
-            if result.returncode == 0:
-                if result.stdout.strip():
-                    console.print("[yellow]Git Status:[/yellow]")
-                    for line in result.stdout.strip().split('\n'):
-                        status = line[:2]
-                        filename = line[3:]
-                        color = "green" if status.strip() == "A" else "red" if status.strip() == "D" else "yellow"
-                        console.print(f"[{color}]{status} {filename}[/{color}]")
-                else:
-                    console.print("[green]Working directory clean[/green]")
-            else:
-                console.print("[red]Not a git repository[/red]")
-        except FileNotFoundError:
+        """Afiseaza status Git (din status-ul parsat si memorat de GitRepo)"""
+        if not shutil.which('git'):
             console.print("[red]Git not installed[/red]")
+            return
+        
+        self.index.refresh()
+        status = self.git.status(self.index.generation)
+        if status is None:
+            console.print("[red]Not a git repository[/red]")
+            return
+        
+        branch = status["branch"]
+        line = f"[bold]On branch {branch.get('head', '?')}[/bold]"
+        if branch.get("ab"):
+            ahead, behind = branch["ab"].split()
+            line += f" [dim]({ahead} ahead, {behind.lstrip('-')} behind {branch.get('upstream', 'upstream')})[/dim]"
+        console.print(line)
+        
+        entries = [e for e in status["entries"] if e["xy"] != '!!']
+        if not entries:
+            console.print("[green]Working directory clean[/green]")
+            return
+        
+        console.print("[yellow]Git Status:[/yellow]")
+        for entry in entries:
+            xy = entry["xy"]
+            color = "dim" if xy == '??' else "red" if 'D' in xy or 'U' in xy else "green" if xy[1] == '.' else "yellow"
+            name = f"{entry['orig_path']} -> {entry['path']}" if entry["orig_path"] else entry["path"]
+            console.print(f"[{color}]{xy.replace('.', ' ')} {name}[/{color}] [dim]{describe_xy(xy)}[/dim]")
     
-    def run_file(self, filepath):
+    def run_file(self, filepath, timeout=None):
         """Executa un fisier si arata output-ul"""
+        return run_async(self.arun_file(filepath, timeout))
+    
+    async def arun_file(self, filepath, timeout=None):
+        """Executa un fisier cu output-ul afisat live (asincron, anulabil, cu timeout)"""
         if not os.path.exists(filepath):
             console.print(f"[red]File {filepath} not found[/red]")
             return
         
         ext = os.path.splitext(filepath)[1].lower()
+        if ext not in ('.py', '.js'):
+            console.print(f"[red]Cannot run {ext} files[/red]")
+            return
         
+        timeout = timeout or self.run_timeout
+        console.print(f"[green]Output from {filepath}:[/green]")
+        output = self._process_output(f"run-{os.path.basename(filepath)}")
+        start = time.perf_counter()
         try:
             if ext == '.py':
-                result = subprocess.run(['python', filepath], 
-                                      capture_output=True, text=True, cwd='.')
-            elif ext == '.js':
-                result = subprocess.run(['node', filepath], 
-                                      capture_output=True, text=True, cwd='.')
+                result = await self._run_python([filepath], output, timeout)
             else:
-                console.print(f"[red]Cannot run {ext} files[/red]")
-                return
-            
-            console.print(f"[green]Output from {filepath}:[/green]")
-            if result.stdout:
-                console.print(Panel(result.stdout, title="STDOUT", border_style="green"))
-            if result.stderr:
-                console.print(Panel(result.stderr, title="STDERR", border_style="red"))
-            console.print(f"[dim]Exit code: {result.returncode}[/dim]")
-            
+                result = await astream_process(['node', filepath], output, cwd='.', timeout=timeout)
+        except asyncio.TimeoutError:
+            self._output_summary(filepath, output, None, time.perf_counter() - start, timeout=timeout)
+            return
         except FileNotFoundError as e:
             console.print(f"[red]Runtime not found: {e}[/red]")
+            return
+        self._output_summary(filepath, output, result.returncode, time.perf_counter() - start,
+                             warm=getattr(result, 'warm', False))
     
-    def backup_project(self):
-        """Creeaza backup al proiectului"""
-        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-        backup_name = f"backup_{timestamp}"
-        
+    def _process_output(self, label, echo=True):
+        """ProcessOutput dupa setarile OUTPUT_*: ecou live in terminal, log complet in .codemate/logs"""
+        return ProcessOutput(echo=self._echo_output if echo else None, echo_rate=self.output_echo_rate,
+                             log_dir=LOG_DIR if self.output_log_keep else None, log_keep=self.output_log_keep,
+                             label=label, **self.output_limits)
+    
+    @staticmethod
+    def _echo_output(stream, lines, skipped):
+        if skipped:
+            console.print(f"[dim]... {skipped} lines not shown (OUTPUT_ECHO_RATE) ...[/dim]")
+        if lines:
+            console.print(Text("\n".join(lines), style="red" if stream == "stderr" else ""))
+    
+    def _output_summary(self, command, output, returncode, seconds, warm=False, timeout=None):
+        """Dupa o comanda cu ecou live: finalul sarit de ecou, logurile complete, codul de iesire"""
+        if output.skipped:
+            for name, capture in output.streams.items():
+                if capture.buffer.lines:
+                    console.print(Panel(Text(capture.buffer.text(head=0, tail=OUTPUT_TAIL_PANEL)),
+                                        title=f"Last lines of {name}",
+                                        border_style="red" if name == "stderr" else "green"))
+        for name, path in output.logs:
+            capture = output.streams[name]
+            console.print(f"[dim]Full {name} ({capture.buffer.lines} lines, {capture.bytes / 1024:.0f} KB): {path}[/dim]")
+        if returncode is None:
+            console.print(f"[yellow]⏱ Killed after {timeout:g}s (timeout)[/yellow]")
+        else:
+            console.print(f"[dim]Exit code: {returncode}{' (warm worker)' if warm else ''} · {seconds:.2f}s[/dim]")
+        status = "killed by timeout" if returncode is None else f"exit code {returncode}"
+        parts = [f"Output of `{command}` that I just ran ({status}):"]
+        for name, capture in output.streams.items():
+            if capture.buffer.lines:
+                parts.append(f"{name}:\n```\n{capture.buffer.text(MODEL_OUTPUT_HEAD, MODEL_OUTPUT_TAIL)}\n```")
+        self.last_output = "\n".join(parts)
+    
+    def worker_status(self, restart=False):
+        """Starea worker pool-ului: zygote, module preincarcate, joburi calde/reci"""
+        pool = self.worker_pool
+        if pool is None:
+            console.print("[yellow]Worker pool disabled (WORKER_POOL=0 or no os.fork on this platform)[/yellow]")
+            return
+        if restart:
+            pool.restart()
+            console.print("[green]✅ Worker pool restarted[/green]")
+        running = pool.process is not None and pool.process.poll() is None
+        state = "ready" if pool.ready else ("starting" if running else "idle (starts with the first /run, /test or /profile)")
+        console.print(f"[bold]Worker pool:[/bold] {state} [dim]({pool.python})[/dim]")
+        console.print(f"Preloaded: {', '.join(pool.loaded) or '-'}")
+        if pool.failed:
+            console.print(f"[yellow]Could not preload: {', '.join(f'{name} ({error})' for name, error in pool.failed.items())}[/yellow]")
+        console.print(f"[dim]Jobs: {pool.stats['warm']} warm, {pool.stats['cold']} cold[/dim]")
+    
+    async def _run_python(self, argv, output, timeout=None):
+        """`python <argv>` in worker pool (interpretor deja pornit) sau ca subproces nou; iesirea curge in `output`"""
+        env = dict(os.environ, PYTHONUNBUFFERED="1")
+        if self.worker_pool is not None:
+            return await self.worker_pool.run(argv, env=env, timeout=timeout, output=output)
+        return await astream_process(['python'] + argv, output, cwd='.', timeout=timeout, env=env)
+    
+    def backup_project(self, label=None):
+        """Creeaza un snapshot incremental al proiectului (doar fisierele noi/schimbate sunt copiate)"""
         try:
-            # Creeaza directorul de backup
-            os.makedirs("backups", exist_ok=True)
-            backup_path = os.path.join("backups", backup_name)
-            
-            # Copiaza toate fisierele (exclude backups si __pycache__)
-            def ignore_patterns(dir, files):
-                return [f for f in files if f in ['__pycache__', '.git', 'backups', 'node_modules']]
-            
-            shutil.copytree(".", backup_path, ignore=ignore_patterns)
-            console.print(f"[green]✅ Backup created: {backup_path}[/green]")
-            
+            manifest = self.snapshots.create(self.index, label)
+            stats = manifest["stats"]
+            console.print(f"[green]✅ Backup created: {manifest['id']}[/green] "
+                          f"[dim]({stats['files']} files, {stats['new_blobs']} new blobs, "
+                          f"{stats['new_bytes'] / 1024:.1f} KB stored, {stats['seconds']:.2f}s)[/dim]")
+            pruned = self.snapshots.prune(self.backup_keep)
+            if pruned:
+                removed, freed = self.snapshots.gc()
+                console.print(f"[dim]Pruned {len(pruned)} old backups (BACKUP_KEEP={self.backup_keep}), "
+                              f"freed {freed / 1024:.1f} KB[/dim]")
+            return manifest["id"]
         except Exception as e:
             console.print(f"[red]Backup failed: {e}[/red]")
+            return None
+    
+    def list_backups(self):
+        """Afiseaza snapshot-urile existente"""
+        snapshots = self.snapshots.list()
+        if not snapshots:
+            console.print("[yellow]No backups yet (use /backup)[/yellow]")
+            return
+        
+        table = Table(title="Backups (.codemate/snapshots)")
+        table.add_column("Id", style="cyan", no_wrap=True)
+        table.add_column("Created", style="green", no_wrap=True)
+        table.add_column("Files", style="magenta", justify="right")
+        table.add_column("Size", justify="right")
+        table.add_column("Stored", justify="right")
+        table.add_column("Label", style="dim")
+        for manifest in snapshots:
+            stats = manifest["stats"]
+            table.add_row(manifest["id"], datetime.fromtimestamp(manifest["created"]).strftime("%Y-%m-%d %H:%M:%S"),
+                          str(stats["files"]), f"{stats['total_bytes'] / 1024:.1f} KB",
+                          f"{stats['new_bytes'] / 1024:.1f} KB", manifest.get("label") or "")
+        console.print(table)
+    
+    def diff_backups(self, old_ref, new_ref=None):
+        """Compara doua snapshot-uri (sau un snapshot cu workspace-ul curent)"""
+        try:
+            old = self.snapshots.load(old_ref)
+            if new_ref:
+                new = self.snapshots.load(new_ref)
+                new_files, new_name = new["files"], new["id"]
+            else:
+                new_files, new_name = self.snapshots.current_files(self.index), "workspace"
+        except (KeyError, OSError, ValueError) as e:
+            console.print(f"[red]Backup diff failed: {e}[/red]")
+            return
+        
+        changes = self.snapshots.diff(old["files"], new_files)
+        console.print(f"[bold]{old['id']} → {new_name}[/bold]")
+        if not any(changes.values()):
+            console.print("[green]No differences[/green]")
+            return
+        for kind, style, sign in (("added", "green", "+"), ("removed", "red", "-"), ("modified", "yellow", "~")):
+            for path in changes[kind]:
+                console.print(f"  [{style}]{sign} {path}[/{style}]")
+        console.print(f"[dim]{len(changes['added'])} added, {len(changes['removed'])} removed, "
+                      f"{len(changes['modified'])} modified[/dim]")
+    
+    def restore_backup(self, ref, paths=None):
+        """Restaureaza un snapshot; workspace-ul curent este salvat intai (restaurarea se poate anula)"""
+        try:
+            snapshot_id = self.snapshots.resolve(ref)
+            safety = self.snapshots.create(self.index, f"before restore {snapshot_id}")
+            result = self.snapshots.restore(snapshot_id, self.index, paths)
+        except (KeyError, OSError, ValueError) as e:
+            console.print(f"[red]Restore failed: {e}[/red]")
+            return False
+        
+        for path in result["restored"]:
+            console.print(f"  [green]↺ {path}[/green]")
+        console.print(f"[green]✅ Restored {len(result['restored'])} files from {result['id']}[/green] "
+                      f"[dim]({result['unchanged']} already identical; previous state saved as {safety['id']})[/dim]")
+        if result["missing"]:
+            console.print(f"[red]Missing blobs for: {', '.join(result['missing'])}[/red]")
+        if result["extra"]:
+            console.print(f"[yellow]Files created after this backup were kept: {', '.join(result['extra'][:20])}"
+                          f"{' ...' if len(result['extra']) > 20 else ''}[/yellow]")
+        return True
+    
+    def gc_backups(self):
+        """Sterge blob-urile care nu mai sunt referite de niciun backup"""
+        removed, freed = self.snapshots.gc()
+        console.print(f"[green]✅ Removed {removed} unreferenced blobs ({freed / 1024:.1f} KB)[/green]")
+    
     def detect_project_type(self):
         """Detecteaza tipul de proiect"""
-        project_info = {"type": "Unknown", "framework": None, "language": "Mixed"}
-        
-        # Detecteaza prin fisiere de configurare
-        if os.path.exists("package.json"):
-            try:
-                with open("package.json", 'r') as f:
-                    pkg = json.loads(f.read())
-                    project_info["type"] = "Node.js"
-                    project_info["language"] = "JavaScript"
-                    
-                    # Detecteaza framework-uri
-                    deps = {**pkg.get("dependencies", {}), **pkg.get("devDependencies", {})}
-                    if "react" in deps:
-                        project_info["framework"] = "React"
-                    elif "vue" in deps:
-                        project_info["framework"] = "Vue.js"
-                    elif "express" in deps:
-                        project_info["framework"] = "Express"
-            except:
-                pass
-        
-        elif os.path.exists("requirements.txt") or os.path.exists("pyproject.toml"):
-            project_info["type"] = "Python"
-            project_info["language"] = "Python"
-            
-            # Detecteaza framework-uri Python
-            try:
-                if os.path.exists("requirements.txt"):
-                    with open("requirements.txt", 'r') as f:
-                        reqs = f.read().lower()
-                        if "flask" in reqs:
-                            project_info["framework"] = "Flask"
-                        elif "django" in reqs:
-                            project_info["framework"] = "Django"
-                        elif "fastapi" in reqs:
-                            project_info["framework"] = "FastAPI"
-            except:
-                pass
-        
-        elif os.path.exists("pom.xml"):
-            project_info["type"] = "Java"
-            project_info["language"] = "Java"
-            project_info["framework"] = "Maven"
-        
-        elif os.path.exists("Cargo.toml"):
-            project_info["type"] = "Rust"
-            project_info["language"] = "Rust"
-        
-        # Detecteaza prin extensii de fisiere
-        py_files = len(glob.glob("*.py"))
-        js_files = len(glob.glob("*.js")) + len(glob.glob("*.ts"))
-        
-        if py_files > js_files and project_info["type"] == "Unknown":
-            project_info["type"] = "Python"
-            project_info["language"] = "Python"
-        elif js_files > py_files and project_info["type"] == "Unknown":
-            project_info["type"] = "JavaScript"
-            project_info["language"] = "JavaScript"
-        
-        return project_info
+        self.index.refresh()
+        return self.project.profile(self.index)["root"]
     
     def load_config_files(self):
         """Incarca fisiere de configurare importante"""
-        configs = {}
-        
-        config_files = [
-            ".env", "config.json", "package.json", "requirements.txt",
-            "pyproject.toml", "tsconfig.json", "webpack.config.js"
-        ]
-        
-        for config_file in config_files:
-            if os.path.exists(config_file):
-                try:
-                    with open(config_file, 'r', encoding='utf-8') as f:
-                        content = f.read()
-                        if len(content) < 2000:  # Doar fisiere mici
-                            configs[config_file] = content[:1000]
-                except:
-                    pass
-        
-        return configs
+        return self.project.configs()
     
     def analyze_dependencies(self):
-        """Analizeaza dependentele proiectului"""
+        """Analizeaza dependentele proiectului (toate sub-proiectele, liste complete)"""
         deps = {"main": [], "dev": [], "python": []}
+        self.index.refresh()
+        for project in self.project.profile(self.index)["projects"]:
+            main = deps["python"] if project["type"] == "Python" else deps["main"]
+            main.extend(d for d in project["dependencies"]["main"] if d not in main)
+            deps["dev"].extend(d for d in project["dependencies"]["dev"] if d not in deps["dev"])
+        return deps
+    
+    def show_project_info(self):
+        """Afiseaza profilul proiectului cu fiecare sub-proiect si dependentele lui complete"""
+        self.index.refresh()
+        profile = self.project.profile(self.index)
+        info = profile["root"]
+        total = len(self._dependency_set())
+        console.print(Panel.fit(
+            f"[bold cyan]Project Information[/bold cyan]\n"
+            f"Type: [yellow]{info['type']}[/yellow]\n"
+            f"Language: [green]{info['language']}[/green]\n"
+            f"Framework: [magenta]{info.get('framework') or 'None'}[/magenta]\n"
+            f"Sub-projects: [cyan]{len(profile['projects'])}[/cyan]\n"
+            f"Dependencies: [dim]{total} total[/dim]",
+            border_style="cyan"
+        ))
         
-        # Node.js dependencies
-        if os.path.exists("package.json"):
-            try:
-                with open("package.json", 'r') as f:
-                    pkg = json.loads(f.read())
-                    deps["main"] = list(pkg.get("dependencies", {}).keys())[:10]
-                    deps["dev"] = list(pkg.get("devDependencies", {}).keys())[:10]
-            except:
-                pass
-        
-        # Python dependencies
-        if os.path.exists("requirements.txt"):
-            try:
-                with open("requirements.txt", 'r') as f:
-                    lines = f.readlines()
-                    for line in lines[:15]:
-                        if line.strip() and not line.startswith("#"):
-                            dep = line.strip().split("==")[0].split(">=")[0]
-                            deps["python"].append(dep)
-            except:
-                pass
+        for project in profile["projects"]:
+            name = f" [dim]{project['name']}[/dim]" if project["name"] not in (None, os.path.basename(project["path"])) else ""
+            framework = f", {project['framework']}" if project["framework"] else ""
+            table = Table(title=f"📦 {project['path']}{name} ({project['type']}{framework}) - "
+                                f"{', '.join(project['manifests'])}", title_justify="left", show_lines=False)
+            table.add_column("Group", style="cyan", no_wrap=True)
+            table.add_column("Count", style="magenta", justify="right")
+            table.add_column("Dependencies", style="green")
+            for group in ("main", "dev", "optional"):
+                deps = project["dependencies"][group]
+                if deps:
+                    table.add_row(group, str(len(deps)), ", ".join(deps))
+            if project["members"]:
+                table.add_row("members", str(len(project["members"])), ", ".join(project["members"]))
+            console.print(table)
         
-        return deps
+        for path, error in profile["errors"].items():
+            console.print(f"[red]Could not parse {path}: {error}[/red]")
     
     def batch_modify_files(self, pattern, old_text, new_text):
         """Modifica text in multiple fisiere simultan"""
-        modified_files = []
-        
-        for root, dirs, files in os.walk("."):
-            if '__pycache__' in root or '.git' in root:
-                continue
-            for file in files:
-                if file.endswith(('.py', '.js', '.html', '.css', '.md', '.txt')):
-                    filepath = os.path.join(root, file)
-                    try:
-                        with open(filepath, 'r', encoding='utf-8') as f:
-                            content = f.read()
-                        
-                        if old_text in content:
-                            new_content = content.replace(old_text, new_text)
-                            with open(filepath, 'w', encoding='utf-8') as f:
-                                f.write(new_content)
-                            modified_files.append(filepath)
-                            
-                    except Exception as e:
-                        console.print(f"[red]Error modifying {filepath}: {e}[/red]")
-        
-        if modified_files:
-            console.print(f"[green]✅ Modified {len(modified_files)} files:[/green]")
-            for file in modified_files:
-                console.print(f"  📄 {file}")
-        else:
-            console.print(f"[yellow]No files found containing '{old_text}'[/yellow]")
-    
-    def refactor_rename(self, old_name, new_name, file_types=None):
-        """Redenumeste functii/clase in toate fisierele"""
-        if file_types is None:
-            file_types = ['.py', '.js']
-        
-        modified_files = []
-        patterns = [
-            rf'\bdef\s+{old_name}\b',  # Python functions
-            rf'\bclass\s+{old_name}\b',  # Python/JS classes
-            rf'\bfunction\s+{old_name}\b',  # JS functions
-            rf'\b{old_name}\s*=\s*function',  # JS function assignments
-            rf'\b{old_name}\(',  # Function calls
-        ]
+        self.batch_rewrite([make_rule(old_text, new_text)])
+    
+    def batch_rewrite(self, rules, dry_run=False):
+        """Aplica mai multe reguli (literale/regex) pe fisierele workspace-ului, intr-o singura trecere per fisier"""
+        try:
+            rule_set = RuleSet(rules)
+        except ValueError as e:
+            console.print(f"[red]{e}[/red]")
+            return None
         
-        for root, dirs, files in os.walk("."):
-            if '__pycache__' in root or '.git' in root:
-                continue
-            for file in files:
-                if any(file.endswith(ext) for ext in file_types):
-                    filepath = os.path.join(root, file)
-                    try:
-                        with open(filepath, 'r', encoding='utf-8') as f:
-                            content = f.read()
-                        
-                        original_content = content
-                        
-                        # Aplica toate pattern-urile
-                        for pattern in patterns:
-                            content = re.sub(pattern, lambda m: m.group().replace(old_name, new_name), content)
-                        
-                        if content != original_content:
-                            with open(filepath, 'w', encoding='utf-8') as f:
-                                f.write(content)
-                            modified_files.append(filepath)
-                            
-                    except Exception as e:
-                        console.print(f"[red]Error refactoring {filepath}: {e}[/red]")
+        self.index.refresh()
+        paths = self.search_filter.apply(self.index.paths())
+        try:
+            results = self.rewrite_engine.plan(paths, rule_set, dry_run)
+        except Exception as e:
+            console.print(f"[red]Batch rewrite failed: {e}[/red]")
+            return None
+        if not results:
+            console.print(f"[yellow]No files matched any of the {len(rules)} rules[/yellow]")
+            return None
+        
+        table = Table(title=f"{'Dry run: ' if dry_run else ''}{len(results)} files, "
+                            f"{sum(sum(r['counts']) for r in results)} replacements")
+        table.add_column("File", style="cyan")
+        table.add_column("Replacements", style="magenta", justify="right")
+        if dry_run:
+            table.add_column("+/-", justify="right")
+        # Cele mai multe inlocuiri primele; restul doar numarate
+        ranked = sorted(results, key=lambda r: -sum(r["counts"]))
+        for result in ranked[:BATCH_TABLE_ROWS]:
+            row = [result["path"], str(sum(result["counts"]))]
+            if dry_run:
+                row.append(f"[green]+{result['added']}[/green] [red]-{result['removed']}[/red]")
+            table.add_row(*row)
+        if len(ranked) > BATCH_TABLE_ROWS:
+            table.add_row(f"[dim]… {len(ranked) - BATCH_TABLE_ROWS} more files[/dim]", "")
+        console.print(table)
+        if len(rules) > 1:
+            for rule, total in zip(rules, [sum(r["counts"][i] for r in results) for i in range(len(rules))]):
+                console.print(f"  [dim]{rule.pattern!r} → {rule.replacement!r}: {total}[/dim]")
+        
+        if dry_run:
+            # Diff-ul agregat: prima pagina acum, restul cu /diff more
+            self.diff_pager.clear()
+            for result in results:
+                self.diff_pager.queue(result["path"], [("diff", hunk_header(h), h["lines"]) for h in result["hunks"]])
+            self._render_diff_page(self.diff_pager.next_page())
+            console.print("[dim]Dry run: nothing was written. Run the same command without --dry-run to apply.[/dim]")
+            return None
         
-        if modified_files:
-            console.print(f"[green]✅ Refactored '{old_name}' to '{new_name}' in {len(modified_files)} files:[/green]")
-            for file in modified_files:
-                console.print(f"  📄 {file}")
-        else:
-            console.print(f"[yellow]No occurrences of '{old_name}' found[/yellow]")
+        try:
+            journal, skipped = self.rewrite_engine.commit(results, rule_set, ", ".join(
+                f"{r.pattern} → {r.replacement}" for r in rules))
+        except Exception as e:
+            console.print(f"[red]Batch rewrite failed, no files were changed: {e}[/red]")
+            return None
+        for entry in journal["files"]:
+            self.index.touch(entry["path"])
+        if skipped:
+            console.print(f"[yellow]Skipped (changed while rewriting): {', '.join(skipped)}[/yellow]")
+        console.print(f"[green]✅ Modified {len(journal['files'])} files[/green] "
+                      f"[dim](batch {journal['id']}; undo with /batch undo)[/dim]")
+        return journal["id"]
+    
+    def batch_undo(self, journal_id=None):
+        """Anuleaza ultima rescriere in masa (sau una anume), pentru toate fisierele ei"""
+        try:
+            journal, restored, conflicts = self.rewrite_engine.undo(journal_id)
+        except (KeyError, OSError, ValueError) as e:
+            console.print(f"[yellow]{e}[/yellow]")
+            return False
+        for path in restored:
+            self.index.touch(path)
+        for path in restored[:BATCH_TABLE_ROWS]:
+            console.print(f"  [green]↺ {path}[/green]")
+        if len(restored) > BATCH_TABLE_ROWS:
+            console.print(f"  [dim]… {len(restored) - BATCH_TABLE_ROWS} more[/dim]")
+        if conflicts:
+            console.print(f"[yellow]Not restored (modified since the batch): {', '.join(conflicts)}[/yellow]")
+        console.print(f"[green]✅ Undid batch {journal['id']}: {len(restored)} files restored[/green]")
+        return True
+    
+    def refactor_rename(self, old_name, new_name, dry_run=False, assume_yes=False):
+        """Redenumeste un simbol (functie, clasa, metoda, variabila) prin indexul de simboluri.
+
+        Doar aparitiile rezolvate la acelasi simbol sunt schimbate; inainte de
+        scriere se afiseaza diff-ul si se cere confirmare. Scrierea trece prin
+        RewriteEngine, deci poate fi anulata cu /batch undo.
+        """
+        if not is_identifier(new_name):
+            console.print(f"[red]'{new_name}' is not a valid identifier[/red]")
+            return None
+        
+        start = time.perf_counter()
+        self.index.refresh()
+        try:
+            updated = self.symbols.update(self.index, self.search_filter)
+            candidates = self.symbols.definitions(old_name)
+            if len(candidates) == 1:
+                plan = self.symbols.rename_plan(candidates[0]["symbol"], new_name)
+        finally:
+            self.symbols.close()
+        elapsed = time.perf_counter() - start
+        
+        if not candidates:
+            console.print(f"[yellow]No definition of '{old_name}' in the symbol index (.py/.js/.ts files)[/yellow]")
+            return None
+        if len(candidates) > 1:
+            table = Table(title=f"'{old_name}' is defined {len(candidates)} times - rename one by its qualified name")
+            table.add_column("Symbol", style="cyan")
+            table.add_column("Kind", style="magenta")
+            table.add_column("Defined at")
+            for candidate in candidates[:BATCH_TABLE_ROWS]:
+                table.add_row(candidate["symbol"], candidate["kind"], f"{candidate['path']}:{candidate['line']}")
+            console.print(table)
+            console.print(f"[dim]e.g. /batch rename {candidates[0]['symbol']} {new_name}[/dim]")
+            return None
+        
+        name = plan["name"]
+        results, failed = [], []
+        for path, positions in plan["files"].items():
+            result = self._stage_rename(path, positions, name, new_name, dry_run=True)
+            if isinstance(result, str):
+                failed.append((path, result))
+            else:
+                results.append(result)
+        
+        table = Table(title=f"Rename {plan['symbol']} → {new_name}: "
+                            f"{sum(sum(r['counts']) for r in results)} occurrences in {len(results)} files")
+        table.add_column("File", style="cyan")
+        table.add_column("Occurrences", style="magenta", justify="right")
+        for result in results[:BATCH_TABLE_ROWS]:
+            table.add_row(result["path"], str(sum(result["counts"])))
+        if len(results) > BATCH_TABLE_ROWS:
+            table.add_row(f"[dim]… {len(results) - BATCH_TABLE_ROWS} more files[/dim]", "")
+        console.print(table)
+        console.print(f"[dim]Symbol index: {updated} files re-analyzed, lookup took {elapsed * 1000:.0f} ms[/dim]")
+        for path, error in failed:
+            console.print(f"[red]  {path}: {error} (run the rename again to re-index)[/red]")
+        if plan["conflicts"]:
+            where = ", ".join(f"{path}:{line}" for path, line, _ in plan["conflicts"][:5])
+            console.print(f"[yellow]⚠ '{new_name}' is already defined in the same scope: {where}[/yellow]")
+        if plan["unresolved"]:
+            where = ", ".join(f"{path}:{line}" for path, line in plan["unresolved"][:5])
+            more = f" (+{len(plan['unresolved']) - 5} more)" if len(plan["unresolved"]) > 5 else ""
+            console.print(f"[yellow]Not renamed - '.{name}' on objects of unknown type: {where}{more}[/yellow]")
+        if plan["skipped"]:
+            console.print(f"[yellow]Not analyzed (parse errors) but mention '{name}': {', '.join(plan['skipped'][:5])}[/yellow]")
+        if not results:
+            return None
+        
+        self.diff_pager.clear()
+        for result in results:
+            self.diff_pager.queue(result["path"], [("diff", hunk_header(h), h["lines"]) for h in result["hunks"]])
+        self._render_diff_page(self.diff_pager.next_page())
+        if dry_run:
+            console.print("[dim]Dry run: nothing was written.[/dim]")
+            return None
+        if not assume_yes and not Confirm.ask(f"Rename {name} → {new_name} in {len(results)} files?", default=False):
+            console.print("[dim]Rename cancelled[/dim]")
+            return None
+        
+        staged = []
+        try:
+            for result in results:
+                stage = self._stage_rename(result["path"], plan["files"][result["path"]], name, new_name)
+                if isinstance(stage, str):
+                    raise ValueError(f"{result['path']}: {stage}")
+                staged.append(stage)
+            journal, skipped = self.rewrite_engine.commit(
+                staged, RuleSet([make_rule(name, new_name, whole_word=True)]), f"rename {plan['symbol']} → {new_name}")
+        except Exception as e:
+            self.rewrite_engine.discard(staged)
+            console.print(f"[red]Rename failed, no files were changed: {e}[/red]")
+            return None
+        for entry in journal["files"]:
+            self.index.touch(entry["path"])
+        if skipped:
+            console.print(f"[yellow]Skipped (changed while renaming): {', '.join(skipped)}[/yellow]")
+        console.print(f"[green]✅ Renamed '{name}' to '{new_name}' in {len(journal['files'])} files[/green] "
+                      f"[dim](batch {journal['id']}; undo with /batch undo)[/dim]")
+        return journal["id"]
+    
+    def _stage_rename(self, path, positions, old_name, new_name, dry_run=False):
+        """Rezultatul RewriteEngine pentru un fisier, sau mesajul de eroare daca fisierul nu mai corespunde indexului"""
+        source = read_source(path)
+        if source is None:
+            return "unreadable"
+        data, text, st = source
+        try:
+            new_text = apply_renames(text, positions, old_name, new_name)
+        except ValueError as e:
+            return f"changed since indexing ({e})"
+        return stage_rewrite(path, data, st, new_text, [len(positions)], dry_run=dry_run)
     
     def apply_design_pattern(self, pattern_type, target_files=None):
         """Aplica design patterns comune"""
@@ -855,6 +1486,10 @@ Always:
     
     def run_with_profiling(self, filepath):
         """Executa cod cu profiling de performanta"""
+        return run_async(self.arun_with_profiling(filepath))
+    
+    async def arun_with_profiling(self, filepath):
+        """Executa cod cu profiling de performanta (asincron, anulabil)"""
         if not os.path.exists(filepath):
             console.print(f"[red]File {filepath} not found[/red]")
             return
@@ -885,15 +1520,23 @@ if __name__ == "__main__":
 '''
             
             try:
-                result = subprocess.run(['python', '-c', profile_script], 
-                                      capture_output=True, text=True, cwd='.')
+                output = self._process_output(f"profile-{os.path.basename(filepath)}", echo=False)
+                try:
+                    result = await self._run_python(['-c', profile_script], output, self.run_timeout)
+                except asyncio.TimeoutError:
+                    console.print(f"[yellow]⏱ Profiling killed after {self.run_timeout:g}s (RUN_TIMEOUT)[/yellow]")
+                    return
                 
                 console.print(f"[green]Performance Profile for {filepath}:[/green]")
                 if result.stdout:
                     console.print(Panel(result.stdout, title="Profiling Results", border_style="blue"))
                 if result.stderr:
                     console.print(Panel(result.stderr, title="Errors", border_style="red"))
+                for name, path in output.logs:
+                    console.print(f"[dim]Full {name}: {path}[/dim]")
                     
+            except asyncio.CancelledError:
+                raise
             except Exception as e:
                 console.print(f"[red]Profiling failed: {e}[/red]")
         
@@ -946,64 +1589,160 @@ if __name__ == "__main__":
         except Exception as e:
             console.print(f"[red]Error analyzing {filepath}: {e}[/red]")
     
-    def test_runner(self, test_pattern="test_*.py"):
+    def test_runner(self, test_pattern="test_*.py", use_cache=True):
         """Ruleaza teste si arata rezultatele"""
-        test_files = glob.glob(test_pattern)
+        return run_async(self.atest_runner(test_pattern, use_cache))
+    
+    async def atest_changed(self, test_pattern="test_*.py", changed=None, use_cache=True):
+        """Ruleaza doar testele care importa (tranzitiv) fisierele schimbate.
+        
+        Fara `changed`: fisierele modificate fata de git plus cele scrise de
+        CodeMate de la ultimul /test --changed.
+        """
+        self.index.refresh()
+        if changed is None:
+            changed = set(self.written_since_test)
+            changed.update(path for path, _ in self.git.changed_files(self.index.generation))
+        changed = {os.path.normpath(path) for path in changed}
+        # Directoare noi (git le raporteaza ca 'dir/')
+        for directory in [p for p in changed if os.path.isdir(p)]:
+            changed.discard(directory)
+            changed.update(p for p in self.index.paths() if p.startswith(directory + os.sep))
+        if not changed:
+            console.print("[green]No changed files since the last run[/green]")
+            return
+        
+        # Fisierele sterse dispar din graf la update: importatorii lor sunt cautati inainte
+        removed = {path for path in changed if not os.path.exists(path)}
+        importers = self.import_graph.dependents(removed) if removed else set()
+        self.import_graph.update(self.index)
+        test_files = self._test_files(test_pattern)
+        selected = impacted_tests(test_files, changed | importers, self.import_graph)
+        
+        shown = ", ".join(sorted(changed)[:5]) + (f" (+{len(changed) - 5} more)" if len(changed) > 5 else "")
+        console.print(f"[cyan]{len(changed)} changed files → {len(selected)} impacted test files[/cyan] [dim]{shown}[/dim]")
+        if selected:
+            await self.atest_runner(test_pattern, use_cache, files=selected)
+        else:
+            console.print("[green]No tests import the changed files[/green]")
+        self.written_since_test -= changed
+    
+    def _test_files(self, test_pattern):
+        """Fisierele de test: un glob cu director ('tests/*.py') sau un nume cautat in tot workspace-ul ('test_*.py')"""
+        if '/' in test_pattern or os.sep in test_pattern or os.path.isfile(test_pattern):
+            return sorted(os.path.relpath(p) for p in glob.glob(test_pattern, recursive=True) if p.endswith('.py'))
+        self.index.refresh()
+        return [p for p in self.index.paths(['.py']) if fnmatch.fnmatch(os.path.basename(p), test_pattern)]
+    
+    def _test_progress(self, run):
+        """Tabelul live al shard-urilor"""
+        if run is None or not run.shards:
+            return "[dim]Collecting tests...[/dim]"
+        table = Table(title=f"Tests ({run.mode}, {len(run.shards)} workers)")
+        table.add_column("Shard", style="cyan", justify="right")
+        table.add_column("Done", justify="right")
+        table.add_column("Failed", justify="right")
+        table.add_column("Time", justify="right", style="dim")
+        table.add_column("Running", style="dim")
+        now = time.perf_counter()
+        for shard in run.shards:
+            elapsed = shard["seconds"] if shard["seconds"] is not None else now - run.started
+            current = shard["current"] or ("" if shard["seconds"] is None else "finished")
+            table.add_row(str(shard["index"]), f"{shard['done']}/{shard['tests']}",
+                          f"[red]{shard['failed']}[/red]" if shard["failed"] else "0",
+                          f"{elapsed:.1f}s", current[-70:])
+        done = sum(shard["done"] for shard in run.shards)
+        table.caption = f"{done}/{len(run.collected)} tests"
+        return table
+    
+    async def atest_runner(self, test_pattern="test_*.py", use_cache=True, files=None):
+        """Ruleaza testele in paralel (shard-uri pytest), sarind fisierele neschimbate de la ultima trecere"""
+        test_files = self._test_files(test_pattern) if files is None else files
+        what = f"test files matching '{test_pattern}'" if files is None else "impacted test files"
         
         if not test_files:
             console.print(f"[yellow]No test files found matching '{test_pattern}'[/yellow]")
             return
         
-        console.print(f"[green]Running tests matching '{test_pattern}'...[/green]")
+        self.index.refresh()
+        self.import_graph.update(self.index)
+        cache = ResultCache()
+        keys = cache_keys(test_files, self.import_graph, self.index, self.shard_runner.python)
+        cached = cache.fresh(keys) if use_cache else []
+        to_run = [p for p in test_files if p not in set(cached)]
+        
+        note = f" [dim]({len(cached)} unchanged since they last passed, skipped)[/dim]" if cached else ""
+        if not to_run:
+            console.print(f"[green]✅ All {len(cached)} {what} are unchanged since they last passed[/green]")
+            console.print("[dim]Use /test --no-cache to run them anyway[/dim]")
+            return
+        console.print(f"[green]Running {len(to_run)} {what}...[/green]{note}")
         
-        for test_file in test_files:
-            try:
-                result = subprocess.run(['python', '-m', 'pytest', test_file, '-v'], 
-                                      capture_output=True, text=True, cwd='.')
-                
-                console.print(f"\n[cyan]📋 {test_file}:[/cyan]")
-                if result.returncode == 0:
-                    console.print(f"[green]✅ PASSED[/green]")
-                else:
-                    console.print(f"[red]❌ FAILED[/red]")
-                
-                if result.stdout:
-                    console.print(Panel(result.stdout, title="Test Output", border_style="green" if result.returncode == 0 else "red"))
-                    
-            except FileNotFoundError:
-                # Fallback la unittest
-                try:
-                    result = subprocess.run(['python', '-m', 'unittest', test_file.replace('.py', '').replace('/', '.')], 
-                                          capture_output=True, text=True, cwd='.')
-                    
-                    console.print(f"\n[cyan]📋 {test_file}:[/cyan]")
-                    if result.returncode == 0:
-                        console.print(f"[green]✅ PASSED[/green]")
-                    else:
-                        console.print(f"[red]❌ FAILED[/red]")
-                    
-                    if result.stdout or result.stderr:
-                        output = result.stdout + result.stderr
-                        console.print(Panel(output, title="Test Output", border_style="green" if result.returncode == 0 else "red"))
-                        
-                except Exception as e:
-                    console.print(f"[red]Error running {test_file}: {e}[/red]")
+        with Live(self._test_progress(None), console=console, refresh_per_second=10) as live:
+            run = await self.shard_runner.run(to_run, cache.durations,
+                                              on_update=lambda current: live.update(self._test_progress(current)))
+            live.update(self._test_progress(run))
+        
+        outcomes = run.file_outcomes(to_run)
+        cache.record(run, outcomes, keys)
+        self._test_report(run, outcomes, len(cached))
     
-    def terminal_command(self, command):
+    def _test_report(self, run, outcomes, cached):
+        """Rezumatul, esecurile si cele mai lente teste"""
+        failures = [(nodeid, test) for nodeid, test in sorted(run.tests.items()) if test["outcome"] in ('failed', 'error')]
+        for nodeid, message in sorted(run.collect_errors.items()):
+            failures.append((nodeid or "collection", {"outcome": "error", "message": message}))
+        for nodeid, test in failures[:TEST_FAILURE_PANELS]:
+            console.print(Panel(test["message"] or "(no details)", title=f"{test['outcome'].upper()} {nodeid}", border_style="red"))
+        if len(failures) > TEST_FAILURE_PANELS:
+            console.print(f"[dim]... and {len(failures) - TEST_FAILURE_PANELS} more failures[/dim]")
+        for title, output in run.output:
+            console.print(Panel(output or "(no output)", title=f"Test Output ({title})", border_style="red"))
+        
+        slowest = [(seconds, nodeid) for seconds, nodeid in run.slowest(SLOWEST_TESTS) if seconds >= 0.01]
+        if slowest:
+            table = Table(title="Slowest tests")
+            table.add_column("Test", style="cyan")
+            table.add_column("Time", justify="right", style="magenta")
+            for seconds, nodeid in slowest:
+                table.add_row(nodeid, f"{seconds:.2f}s")
+            console.print(table)
+        
+        counts = run.counts()
+        summary = ", ".join(f"{counts[k]} {k}" for k in ('passed', 'failed', 'error', 'skipped', 'missing') if counts.get(k))
+        failed_files = sum(1 for outcome in outcomes.values() if outcome != 'passed')
+        extra = f", {cached} cached files" if cached else ""
+        line = f"{summary or 'no tests'} in {run.seconds:.1f}s ({len(run.shards)} workers{extra})"
+        if failed_files:
+            console.print(f"[red]❌ {line} - {failed_files}/{len(outcomes)} files failed[/red]")
+        else:
+            console.print(f"[green]✅ {line}[/green]")
+    
+    def terminal_command(self, command, timeout=None):
         """Executa comenzi de terminal integrate"""
+        return run_async(self.aterminal_command(command, timeout))
+    
+    async def aterminal_command(self, command, timeout=None):
+        """Executa comenzi de terminal cu output-ul afisat live (asincron, anulabil, cu timeout).
+        
+        Comanda ruleaza fara stdin, in sesiune proprie: la timeout sau Ctrl+C
+        este oprita impreuna cu procesele pornite de ea.
+        """
+        timeout = timeout or self.run_timeout
+        console.print(f"[cyan]$ {command}[/cyan]")
+        words = command.split()
+        output = self._process_output(f"cmd-{os.path.basename(words[0]) if words else ''}")
+        start = time.perf_counter()
         try:
-            result = subprocess.run(command, shell=True, capture_output=True, text=True, cwd='.')
-            
-            console.print(f"[cyan]$ {command}[/cyan]")
-            
-            if result.stdout:
-                console.print(Panel(result.stdout, title="Output", border_style="green"))
-            
-            if result.stderr:
-                console.print(Panel(result.stderr, title="Error", border_style="red"))
-            
-            console.print(f"[dim]Exit code: {result.returncode}[/dim]")
+            try:
+                result = await astream_process(command, output, shell=True, cwd='.', timeout=timeout, detach=True)
+            except asyncio.TimeoutError:
+                self._output_summary(command, output, None, time.perf_counter() - start, timeout=timeout)
+                return
+            self._output_summary(command, output, result.returncode, time.perf_counter() - start)
             
+        except asyncio.CancelledError:
+            raise
         except Exception as e:
             console.print(f"[red]Command failed: {e}[/red]")
     
@@ -1161,6 +1900,10 @@ if __name__ == "__main__":
     
     def live_file_monitor(self, filepath, duration=30):
         """Monitorizeaza fisierul pentru modificari"""
+        return run_async(self.alive_file_monitor(filepath, duration))
+    
+    async def alive_file_monitor(self, filepath, duration=30):
+        """Monitorizeaza fisierul pentru modificari (asincron, anulabil)"""
         if not os.path.exists(filepath):
             console.print(f"[red]File {filepath} not found[/red]")
             return
@@ -1182,12 +1925,17 @@ if __name__ == "__main__":
                     self.syntax_check_realtime(filepath)
                     last_modified = current_modified
                 
-                time.sleep(1)
+                await asyncio.sleep(1)
             
             console.print(f"[yellow]Monitoring stopped after {duration} seconds[/yellow]")
             
         except KeyboardInterrupt:
             console.print("[yellow]Monitoring stopped by user[/yellow]")
+        # CancelledError (Ctrl+C sub run_async) se propaga: apelantul afiseaza oprirea
     
     def clear_conversation(self):
+        # Prompt-ul de sistem este refolosit daca workspace-ul nu s-a schimbat
         self.conversation = []
+        self.context_usage = None
+        self.sent_chunks.clear()
+        self.git_changed_sent = None
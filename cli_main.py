@@ -1,20 +1,327 @@
 #!/usr/bin/env python3
 import click
 import os
+import sys
+import asyncio
 from rich.console import Console
-from rich.markdown import Markdown
 from rich.panel import Panel
 from rich.prompt import Prompt
 from rich.live import Live
 from rich.spinner import Spinner
+import cli_agent
 from cli_agent import CLIAgent
+from stream_render import StreamingMarkdown
+from async_core import run_async
+from batch_runner import BatchRunner, parse_jobs
+from rewrite_engine import make_rule, load_rules
 
 console = Console()
 
+
+async def stream_response(agent, user_input):
+    """Afiseaza raspunsul in streaming; anularea pastreaza raspunsul partial"""
+    # Streaming response (doar blocul Markdown deschis este re-randat)
+    with Live("", refresh_per_second=10, console=console) as live:
+        renderer = StreamingMarkdown(live, refresh_per_second=10)
+        chunks = agent.asend_message(user_input)
+        try:
+            async for chunk in chunks:
+                renderer.feed(chunk)
+        finally:
+            await chunks.aclose()
+            renderer.close()
+
+
+def run_cancellable(coro, message="Cancelled"):
+    """Ruleaza o operatie a agentului; Ctrl+C o anuleaza si revine la prompt"""
+    try:
+        return run_async(coro)
+    except asyncio.CancelledError:
+        console.print(f"\n[yellow]⏹ {message}[/yellow]")
+
+
+def split_timeout(text):
+    """'--timeout 30 rest' -> (30.0, 'rest'); fara optiune -> (None, text)"""
+    parts = text.split(None, 2)
+    if len(parts) == 3 and parts[0] == '--timeout':
+        try:
+            return float(parts[1]), parts[2]
+        except ValueError:
+            console.print(f"[yellow]Invalid timeout: {parts[1]}[/yellow]")
+    return None, text
+
+
+def split_words(text):
+    """Imparte argumentele pe spatii: [(cuvant, inceput, intre_ghilimele)].
+
+    Spre deosebire de shlex, backslash-urile raman neatinse (regex: \\b,
+    \\1), iar ghilimelele grupeaza doar la inceputul unui cuvant, deci un
+    apostrof din text (don't) este un caracter obisnuit. Ridica ValueError
+    pentru ghilimele neinchise.
+    """
+    words, i = [], 0
+    while i < len(text):
+        if text[i].isspace():
+            i += 1
+            continue
+        start = i
+        if text[i] in '"\'':
+            end = text.find(text[i], i + 1)
+            # Ghilimeaua de inchidere trebuie urmata de spatiu sau de sfarsit
+            while end != -1 and end + 1 < len(text) and not text[end + 1].isspace():
+                end = text.find(text[i], end + 1)
+            if end == -1:
+                raise ValueError(f"No closing quotation for the argument at column {start + 1}")
+            words.append((text[start + 1:end], start, True))
+            i = end + 1
+        else:
+            while i < len(text) and not text[i].isspace():
+                i += 1
+            words.append((text[start:i], start, False))
+    return words
+
+
+def batch_replace(agent, args):
+    """/batch replace [--dry-run] [-r] [-i] [-w] [--rules file.jsonl] <old> <new> ["<old>" "<new>" ...]"""
+    try:
+        words = split_words(args)
+    except ValueError as e:
+        console.print(f"[red]{e}[/red]")
+        return
+    flags = {'-r': 'regex', '--regex': 'regex', '-w': 'whole_word', '--word': 'whole_word'}
+    options, dry_run, rules_file = {}, False, None
+    while words and not words[0][2]:
+        flag = words[0][0]
+        if flag in flags:
+            options[flags[flag]] = True
+        elif flag in ('-i', '--ignore-case'):
+            options['case_sensitive'] = False
+        elif flag in ('-n', '--dry-run'):
+            dry_run = True
+        elif flag == '--rules' and len(words) > 1:
+            rules_file = words.pop(1)[0]
+        else:
+            break
+        words.pop(0)
+
+    tokens = [word for word, _, _ in words]
+    if len(words) > 2 and not any(quoted for _, _, quoted in words):
+        # Forma veche fara ghilimele: /batch replace <old> <new text cu spatii>, restul liniei neschimbat
+        tokens = [tokens[0], args[words[1][1]:].rstrip()]
+    try:
+        rules = load_rules(rules_file, options) if rules_file else []
+    except (OSError, ValueError) as e:
+        console.print(f"[red]{e}[/red]")
+        return
+    if len(tokens) % 2:
+        console.print("[yellow]Usage: /batch replace [--dry-run] [-r] [-i] [-w] [--rules file.jsonl] "
+                      "<old> <new> (several rules: quote each part, \"<old>\" \"<new>\" ...)[/yellow]")
+        return
+    rules += [make_rule(tokens[i], tokens[i + 1], **options) for i in range(0, len(tokens), 2)]
+    if not rules:
+        console.print("[yellow]No replacement rules given[/yellow]")
+        return
+    agent.batch_rewrite(rules, dry_run=dry_run)
+
+
+def handle_command(agent, user_input):
+    """Executa o comanda /...; intoarce False daca textul nu este o comanda cunoscuta"""
+    if user_input.lower() == '/clear':
+        agent.clear_conversation()
+        console.print("[yellow]✨ Conversation cleared. Fresh start![/yellow]\n")
+        return True
+    elif user_input.lower() == '/files':
+        agent.list_files()
+        return True
+    elif user_input.lower().startswith('/search '):
+        args = user_input[8:].strip().split(' ')
+        flags = {'-c': 'case_sensitive', '--case': 'case_sensitive',
+                 '-r': 'regex', '--regex': 'regex',
+                 '-w': 'whole_word', '--word': 'whole_word'}
+        options = {}
+        while len(args) > 1 and args[0] in flags:
+            options[flags[args.pop(0)]] = True
+        search_term = ' '.join(args)
+        agent.search_in_files(search_term, **options)
+        return True
+    elif user_input.lower().startswith('/cache'):
+        action = user_input[6:].strip().lower() or 'stats'
+        if action == 'stats':
+            agent.show_cache_stats()
+        elif action == 'clear':
+            agent.clear_cache()
+        else:
+            console.print("[yellow]Usage: /cache [stats|clear][/yellow]")
+        return True
+    elif user_input.lower() == '/index':
+        agent.build_search_index()
+        return True
+    elif user_input.lower() == '/git':
+        agent.git_status()
+        return True
+    elif user_input.lower().startswith('/run '):
+        timeout, filepath = split_timeout(user_input[5:].strip())
+        run_cancellable(agent.arun_file(filepath, timeout))
+        return True
+    elif user_input.lower() == '/backup' or user_input.lower().startswith('/backup '):
+        args = user_input.split()[1:]
+        action = args[0].lower() if args else 'create'
+        if action == 'create':
+            agent.backup_project(' '.join(args[1:]) or None)
+        elif action == 'list':
+            agent.list_backups()
+        elif action == 'diff' and len(args) in (2, 3):
+            agent.diff_backups(*args[1:])
+        elif action == 'restore' and len(args) >= 2:
+            agent.restore_backup(args[1], args[2:] or None)
+        elif action == 'gc':
+            agent.gc_backups()
+        else:
+            console.print("[yellow]Usage: /backup [create [label]|list|diff <a> [b]|restore <id> [paths]|gc][/yellow]")
+        return True
+    elif user_input.lower() == '/info':
+        agent.show_project_info()
+        return True
+    elif user_input.lower().startswith('/batch replace '):
+        batch_replace(agent, user_input[15:])
+        return True
+    elif user_input.lower().startswith('/batch undo'):
+        agent.batch_undo(user_input[11:].strip() or None)
+        return True
+    elif user_input.lower().startswith('/batch '):
+        parts = user_input[7:].split()
+        if parts and parts[0] == 'rename':
+            flags = {p for p in parts[1:] if p.startswith('-')}
+            names = [p for p in parts[1:] if not p.startswith('-')]
+            if len(names) == 2 and flags <= {'-n', '--dry-run', '-y', '--yes'}:
+                agent.refactor_rename(names[0], names[1], dry_run=bool(flags & {'-n', '--dry-run'}),
+                                      assume_yes=bool(flags & {'-y', '--yes'}))
+            else:
+                console.print("[yellow]Usage: /batch rename [--dry-run] [--yes] <name|Class.name|module:name> <new>[/yellow]")
+        elif len(parts) >= 2 and parts[0] == 'pattern':
+            pattern_type = parts[1]
+            agent.apply_design_pattern(pattern_type)
+        elif len(parts) >= 2 and parts[0] == 'create':
+            structure_type = parts[1]
+            agent.batch_create_structure(structure_type)
+        else:
+            console.print("[yellow]Usage: /batch [replace|undo|rename|pattern|create] <args>[/yellow]")
+        return True
+    elif user_input.lower().startswith('/debug '):
+        filepath = user_input[7:].strip()
+        agent.debug_code(filepath)
+        return True
+    elif user_input.lower().startswith('/profile '):
+        filepath = user_input[9:].strip()
+        run_cancellable(agent.arun_with_profiling(filepath))
+        return True
+    elif user_input.lower().startswith('/fix '):
+        filepath = user_input[5:].strip()
+        agent.suggest_fixes(filepath)
+        return True
+    elif user_input.lower().startswith('/test'):
+        args = user_input[5:].split()
+        if args[:1] == ['--auto']:
+            if args[1:] in (['on'], ['off']):
+                agent.test_auto_run = args[1] == 'on'
+            console.print(f"[cyan]Auto-run of impacted tests after AI edits: {'on' if agent.test_auto_run else 'off'}[/cyan]")
+            return True
+        use_cache = '--no-cache' not in args
+        patterns = [a for a in args if a not in ('--no-cache', '--changed')]
+        pattern = patterns[0] if patterns else "test_*.py"
+        if '--changed' in args:
+            run_cancellable(agent.atest_changed(pattern, use_cache=use_cache))
+        else:
+            run_cancellable(agent.atest_runner(pattern, use_cache))
+        return True
+    elif user_input.lower().startswith('/workers'):
+        agent.worker_status(restart=user_input[8:].strip() == 'restart')
+        return True
+    elif user_input.lower().startswith('/cmd '):
+        timeout, command = split_timeout(user_input[5:].strip())
+        run_cancellable(agent.aterminal_command(command, timeout))
+        return True
+    elif user_input.lower().startswith('/preview '):
+        filepath = user_input[9:].strip()
+        agent.preview_file(filepath)
+        return True
+    elif user_input.lower().startswith('/check '):
+        filepath = user_input[7:].strip()
+        agent.syntax_check_realtime(filepath)
+        return True
+    elif user_input.lower().startswith('/monitor '):
+        parts = user_input[9:].split()
+        filepath = parts[0]
+        duration = int(parts[1]) if len(parts) > 1 else 30
+        run_cancellable(agent.alive_file_monitor(filepath, duration), "Monitoring stopped by user")
+        return True
+    elif user_input.lower() in ('/diff', '/diff more'):
+        agent.show_more_diff()
+        return True
+    elif user_input.lower().startswith('/undo '):
+        filepath = user_input[6:].strip()
+        agent.undo_file_changes(filepath)
+        return True
+    elif user_input.lower().startswith('/history '):
+        filepath = user_input[9:].strip()
+        agent.show_file_history(filepath)
+        return True
+    elif user_input.lower().startswith('/restore '):
+        parts = user_input[9:].split()
+        if len(parts) >= 2:
+            filepath, version = parts[0], int(parts[1])
+            agent.restore_file_version(filepath, version)
+        else:
+            console.print("[yellow]Usage: /restore <file> <version_number>[/yellow]")
+        return True
+    return False
+
+
+def run_batch(batch_file, output, concurrency, rate):
+    """Mod headless: ruleaza job-urile JSONL si scrie rezultatele JSONL"""
+    # Rezultatele merg pe stdout (sau --output); mesajele agentului pe stderr
+    console.stderr = True
+    cli_agent.console.stderr = True
+    
+    agent = CLIAgent()
+    if concurrency is None:
+        concurrency = agent._setting('BATCH_CONCURRENCY', 4, int)
+    if rate is None:
+        rate = agent._setting('BATCH_RATE_LIMIT', 0.0, float)
+    
+    jobs = parse_jobs(batch_file)
+    console.print(f"[dim]Batch: {len(jobs)} jobs, concurrency {concurrency}, "
+                  f"rate {f'{rate:g}/s' if rate > 0 else 'unlimited'}[/dim]")
+    
+    runner = BatchRunner(agent, handle_command, output, concurrency=concurrency, rate=rate,
+                         consoles=(console, cli_agent.console))
+    try:
+        summary = run_async(runner.run(jobs))
+    except asyncio.CancelledError:
+        console.print(f"[yellow]⏹ Batch cancelled after {runner.summary['jobs']} of {len(jobs)} jobs[/yellow]")
+        return 130
+    
+    console.print(f"[dim]Batch done: {summary['ok']} ok, {summary['error']} failed, {summary['cached']} cached, "
+                  f"{summary['prompt_tokens'] + summary['completion_tokens']:,} tokens "
+                  f"in {summary['duration_ms'] / 1000:.1f}s[/dim]")
+    return 1 if summary['error'] else 0
+
+
 @click.command()
-def main():
+@click.option('--batch', 'batch_file', type=click.File('r', encoding='utf-8'),
+              help='Run prompts and /commands from a JSONL file ("-" for stdin) without the interactive prompt.')
+@click.option('--output', '-o', type=click.File('w', encoding='utf-8'), default='-',
+              help='Where to write the JSONL results of --batch (default: stdout).')
+@click.option('--concurrency', type=click.IntRange(min=1), default=None,
+              help='Prompts run in parallel in --batch mode (default: BATCH_CONCURRENCY or 4).')
+@click.option('--rate', type=float, default=None,
+              help='Max model requests per second in --batch mode (default: BATCH_RATE_LIMIT, 0 = unlimited).')
+def main(batch_file, output, concurrency, rate):
     """CodeMate CLI - Advanced AI Assistant"""
     
+    if batch_file is not None:
+        sys.exit(run_batch(batch_file, output, concurrency, rate))
+    
     console.print(Panel.fit(
         "[bold blue]CodeMate CLI[/bold blue]\n"
         "[dim]Advanced AI Assistant with Full File System Access[/dim]\n"
@@ -32,28 +339,36 @@ def main():
     console.print("• [cyan]Project management:[/cyan] 'Show me the project structure'")
     console.print("• [cyan]Code review:[/cyan] 'Review my Python code for improvements'")
     console.print("\n[bold yellow]Quick Commands:[/bold yellow]")
-    console.print("• [green]/search <text>[/green] - Search in all files")
+    console.print("• [green]/search [-c] [-r] [-w] <text>[/green] - Search in all files (case, regex, whole word)")
+    console.print("• [green]/index[/green] - Build/update the search index")
+    console.print("• [green]/cache [stats|clear][/green] - Response cache statistics / reset")
     console.print("• [green]/git[/green] - Show Git status")
-    console.print("• [green]/run <file>[/green] - Execute code file")
-    console.print("• [green]/backup[/green] - Create project backup")
+    console.print("• [green]/run [--timeout N] <file>[/green] - Execute code file (output streamed live)")
+    console.print("• [green]/backup [list|diff|restore|gc][/green] - Incremental project backups")
     console.print("• [green]/info[/green] - Show project information")
     console.print("• [green]/files[/green] - List files")
     console.print("\n[bold magenta]Batch Operations:[/bold magenta]")
     console.print("• [cyan]/batch replace <old> <new>[/cyan] - Replace text in all files")
-    console.print("• [cyan]/batch rename <old> <new>[/cyan] - Rename functions/classes")
+    console.print("• [cyan]/batch replace --dry-run -r <regex> <new> ...[/cyan] - Multi-rule rewrite with preview")
+    console.print("• [cyan]/batch undo [id][/cyan] - Revert the last batch rewrite")
+    console.print("• [cyan]/batch rename [--dry-run] <old> <new>[/cyan] - Rename a symbol and its references (preview + confirm)")
     console.print("• [cyan]/batch pattern <type>[/cyan] - Apply design pattern (singleton, factory)")
     console.print("• [cyan]/batch create <type>[/cyan] - Create project structure (flask, fastapi, react)")
     console.print("\n[bold red]Debug & Testing:[/bold red]")
     console.print("• [red]/debug <file>[/red] - Analyze code for issues")
     console.print("• [red]/profile <file>[/red] - Performance profiling")
     console.print("• [red]/fix <file>[/red] - Suggest optimizations")
-    console.print("• [red]/test [pattern][/red] - Run tests (default: test_*.py)")
+    console.print("• [red]/test [--no-cache] [pattern][/red] - Run tests in parallel, skipping unchanged passing files (default: test_*.py)")
+    console.print("• [red]/test --changed[/red] - Run only tests that import files changed in git or edited by CodeMate")
+    console.print("• [red]/test --auto on|off[/red] - Auto-run impacted tests after AI edits")
+    console.print("• [red]/workers [restart][/red] - Warm Python worker pool status (used by /run, /test, /profile)")
     console.print("\n[bold blue]Integrations:[/bold blue]")
-    console.print("• [blue]/cmd <command>[/blue] - Execute terminal command")
+    console.print("• [blue]/cmd [--timeout N] <command>[/blue] - Execute terminal command (output streamed live)")
     console.print("• [blue]/preview <file>[/blue] - Preview HTML/Markdown/JSON")
     console.print("• [blue]/check <file>[/blue] - Real-time syntax checking")
     console.print("• [blue]/monitor <file> [seconds][/blue] - Monitor file changes (default: 30s)")
     console.print("\n[bold purple]Version Control:[/bold purple]")
+    console.print("• [purple]/diff more[/purple] - Show the next page of changes")
     console.print("• [purple]/undo <file>[/purple] - Undo last changes to file")
     console.print("• [purple]/history <file>[/purple] - Show file modification history")
     console.print("• [purple]/restore <file> <version>[/purple] - Restore specific version")
@@ -69,117 +384,17 @@ def main():
             if user_input.lower() in ['/quit', '/exit', 'quit', 'exit']:
                 console.print("[yellow]Goodbye! Happy coding! 🚀[/yellow]")
                 break
-            elif user_input.lower() == '/clear':
-                agent.clear_conversation()
-                console.print("[yellow]✨ Conversation cleared. Fresh start![/yellow]\n")
-                continue
-            elif user_input.lower() == '/files':
-                agent.list_files()
-                continue
-            elif user_input.lower().startswith('/search '):
-                search_term = user_input[8:].strip()
-                agent.search_in_files(search_term)
-                continue
-            elif user_input.lower() == '/git':
-                agent.git_status()
-                continue
-            elif user_input.lower().startswith('/run '):
-                filepath = user_input[5:].strip()
-                agent.run_file(filepath)
-                continue
-            elif user_input.lower() == '/backup':
-                agent.backup_project()
-                continue
-            elif user_input.lower() == '/info':
-                project_info = agent.detect_project_type()
-                deps = agent.analyze_dependencies()
-                
-                console.print(Panel.fit(
-                    f"[bold cyan]Project Information[/bold cyan]\n"
-                    f"Type: [yellow]{project_info['type']}[/yellow]\n"
-                    f"Language: [green]{project_info['language']}[/green]\n"
-                    f"Framework: [magenta]{project_info.get('framework', 'None')}[/magenta]\n"
-                    f"Dependencies: [dim]{len(deps['main']) + len(deps['python'])} total[/dim]",
-                    border_style="cyan"
-                ))
-                continue
-            elif user_input.lower().startswith('/batch '):
-                parts = user_input[7:].split(' ', 2)
-                if len(parts) >= 3 and parts[0] == 'replace':
-                    old_text, new_text = parts[1], parts[2]
-                    agent.batch_modify_files("*", old_text, new_text)
-                elif len(parts) >= 3 and parts[0] == 'rename':
-                    old_name, new_name = parts[1], parts[2]
-                    agent.refactor_rename(old_name, new_name)
-                elif len(parts) >= 2 and parts[0] == 'pattern':
-                    pattern_type = parts[1]
-                    agent.apply_design_pattern(pattern_type)
-                elif len(parts) >= 2 and parts[0] == 'create':
-                    structure_type = parts[1]
-                    agent.batch_create_structure(structure_type)
-                else:
-                    console.print("[yellow]Usage: /batch [replace|rename|pattern|create] <args>[/yellow]")
-                continue
-            elif user_input.lower().startswith('/debug '):
-                filepath = user_input[7:].strip()
-                agent.debug_code(filepath)
-                continue
-            elif user_input.lower().startswith('/profile '):
-                filepath = user_input[9:].strip()
-                agent.run_with_profiling(filepath)
-                continue
-            elif user_input.lower().startswith('/fix '):
-                filepath = user_input[5:].strip()
-                agent.suggest_fixes(filepath)
-                continue
-            elif user_input.lower().startswith('/test'):
-                pattern = user_input[5:].strip() if len(user_input) > 5 else "test_*.py"
-                agent.test_runner(pattern)
-                continue
-            elif user_input.lower().startswith('/cmd '):
-                command = user_input[5:].strip()
-                agent.terminal_command(command)
-                continue
-            elif user_input.lower().startswith('/preview '):
-                filepath = user_input[9:].strip()
-                agent.preview_file(filepath)
-                continue
-            elif user_input.lower().startswith('/check '):
-                filepath = user_input[7:].strip()
-                agent.syntax_check_realtime(filepath)
-                continue
-            elif user_input.lower().startswith('/monitor '):
-                parts = user_input[9:].split()
-                filepath = parts[0]
-                duration = int(parts[1]) if len(parts) > 1 else 30
-                agent.live_file_monitor(filepath, duration)
-                continue
-            elif user_input.lower().startswith('/undo '):
-                filepath = user_input[6:].strip()
-                agent.undo_file_changes(filepath)
-                continue
-            elif user_input.lower().startswith('/history '):
-                filepath = user_input[9:].strip()
-                agent.show_file_history(filepath)
-                continue
-            elif user_input.lower().startswith('/restore '):
-                parts = user_input[9:].split()
-                if len(parts) >= 2:
-                    filepath, version = parts[0], int(parts[1])
-                    agent.restore_file_version(filepath, version)
-                else:
-                    console.print("[yellow]Usage: /restore <file> <version_number>[/yellow]")
+            if handle_command(agent, user_input):
                 continue
             
             console.print("\n[bold magenta]CodeMate[/bold magenta]:")
             
-            # Streaming response
-            response_text = ""
-            with Live("", refresh_per_second=10, console=console) as live:
-                for chunk in agent.send_message_stream(user_input):
-                    response_text += chunk
-                    live.update(Markdown(response_text))
+            run_cancellable(stream_response(agent, user_input),
+                            "Response cancelled (partial answer kept in conversation)")
+            if agent.test_auto_run and agent.last_turn.get("written"):
+                run_cancellable(agent.atest_changed(changed=agent.last_turn["written"]), "Tests cancelled")
             
+            agent.show_context_usage()
             console.print()
             
     except KeyboardInterrupt:
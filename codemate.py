@@ -10,7 +10,8 @@ def main():
     
     # Ruleaza CodeMate CLI
     try:
-        subprocess.run([sys.executable, cli_main_path], cwd=script_dir)
+        result = subprocess.run([sys.executable, cli_main_path] + sys.argv[1:], cwd=script_dir)
+        sys.exit(result.returncode)
     except KeyboardInterrupt:
         print("\nCodeMate CLI stopped.")
     except Exception as e:
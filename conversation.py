@@ -0,0 +1,117 @@
+import re
+import hashlib
+
+# Aproximare locala: ~4 caractere per token, dar cel putin un token per cuvant/simbol
+CHARS_PER_TOKEN = 4
+MESSAGE_OVERHEAD = 4
+
+_PIECES = re.compile(r"\w+|[^\w\s]")
+_CODE_BLOCK = re.compile(r'```([^\n`]*)\n(.*?)```', re.DOTALL)
+
+SUMMARY_HEADER = "Summary of earlier conversation (older turns were compacted):"
+
+
+def estimate_tokens(text):
+    """Estimeaza numarul de tokeni ai unui text fara tokenizer"""
+    if not text:
+        return 0
+    return max(len(text) // CHARS_PER_TOKEN, int(len(_PIECES.findall(text)) * 0.75)) + 1
+
+
+def stub_code_blocks(text, min_chars):
+    """Inlocuieste blocurile de cod mari cu un stub care pastreaza hash-ul continutului"""
+    def replace(match):
+        header, code = match.group(1).strip(), match.group(2)
+        if len(code) < min_chars:
+            return match.group(0)
+        digest = hashlib.sha1(code.encode('utf-8')).hexdigest()[:12]
+        label = f" {header}" if header else ""
+        return f"```{header}\n[code block{label} omitted: {code.count(chr(10)) + 1} lines, sha1 {digest}]\n```"
+    return _CODE_BLOCK.sub(replace, text)
+
+
+def _first_line(text, limit=160):
+    line = next((l.strip() for l in text.splitlines() if l.strip()), "")
+    return line if len(line) <= limit else line[:limit - 3] + "..."
+
+
+class ConversationMemory:
+    """Tine conversatia sub un buget de tokeni.
+
+    Cand bugetul este depasit, mesajele mai vechi decat ultimele keep_recent
+    sunt compactate in doi pasi: intai blocurile de cod mari devin stub-uri
+    cu hash, apoi cele mai vechi schimburi sunt inlocuite cu un rezumat scurt.
+    Prompt-ul de sistem nu este niciodata atins.
+    """
+
+    def __init__(self, budget=24000, keep_recent=4, stub_min_chars=400):
+        self.budget = budget
+        self.keep_recent = keep_recent
+        self.stub_min_chars = stub_min_chars
+        self._cache = {}
+
+    def message_tokens(self, message):
+        content = message["content"]
+        tokens = self._cache.get(content)
+        if tokens is None:
+            tokens = estimate_tokens(content) + MESSAGE_OVERHEAD
+            if len(self._cache) > 2048:
+                self._cache.clear()
+            self._cache[content] = tokens
+        return tokens
+
+    def usage(self, messages):
+        return sum(self.message_tokens(m) for m in messages)
+
+    def _split(self, messages):
+        """Imparte in (mesaje de sistem de la inceput, mesaje vechi, mesaje recente)"""
+        head = 0
+        while head < len(messages) and messages[head]["role"] == "system":
+            head += 1
+        tail = max(head, len(messages) - self.keep_recent)
+        return messages[:head], messages[head:tail], messages[tail:]
+
+    def compact(self, messages):
+        """Intoarce (mesaje, info) cu conversatia adusa sub buget, daca se poate"""
+        before = self.usage(messages)
+        info = {"before": before, "after": before, "stubbed": 0, "summarized": 0}
+        if before <= self.budget:
+            return messages, info
+
+        head, old, recent = self._split(messages)
+
+        # Pasul 1: stub-uri pentru blocurile de cod mari din mesajele vechi
+        compacted = []
+        for message in old:
+            content = stub_code_blocks(message["content"], self.stub_min_chars)
+            if content != message["content"]:
+                info["stubbed"] += 1
+                message = dict(message, content=content)
+            compacted.append(message)
+        old = compacted
+
+        # Pasul 2: rezuma cele mai vechi mesaje pana intra in buget
+        summary_lines = []
+        if head and head[-1]["content"].startswith(SUMMARY_HEADER):
+            summary_lines = head.pop()["content"].splitlines()[1:]
+
+        def total():
+            summary = "\n".join([SUMMARY_HEADER] + summary_lines)
+            summary_tokens = estimate_tokens(summary) + MESSAGE_OVERHEAD if summary_lines else 0
+            return self.usage(head) + summary_tokens + self.usage(old) + self.usage(recent)
+
+        while old and total() > self.budget:
+            message = old.pop(0)
+            summary_lines.append(f"- {message['role']}: {_first_line(message['content'])}")
+            info["summarized"] += 1
+
+        # Rezumatul insusi nu trebuie sa creasca la nesfarsit
+        while len(summary_lines) > 1 and total() > self.budget:
+            summary_lines.pop(0)
+
+        if summary_lines:
+            head.append({"role": "system", "content": "\n".join([SUMMARY_HEADER] + summary_lines)})
+
+        result = head + old + recent
+        info["after"] = self.usage(result)
+        return result, info
@@ -0,0 +1,240 @@
+import time
+import difflib
+from bisect import bisect_left
+from collections import Counter
+
+# Regiunile fara linii unice mai mici de atat (linii x linii) trec prin difflib
+FALLBACK_CELLS = 250000
+
+
+def _longest_increasing(pairs):
+    """Cel mai lung subsir de perechi (i, j) crescator in j (pairs este sortat dupa i)"""
+    tails, tail_index, back = [], [], [None] * len(pairs)
+    for k, (_, j) in enumerate(pairs):
+        pos = bisect_left(tails, j)
+        if pos == len(tails):
+            tails.append(j)
+            tail_index.append(k)
+        else:
+            tails[pos] = j
+            tail_index[pos] = k
+        back[k] = tail_index[pos - 1] if pos else None
+    anchors, k = [], tail_index[-1] if tail_index else None
+    while k is not None:
+        anchors.append(pairs[k])
+        k = back[k]
+    return anchors[::-1]
+
+
+def _patience_anchors(a, alo, ahi, b, blo, bhi):
+    """Liniile unice in ambele regiuni, in ordine crescatoare in a si b (LIS prin patience sorting)"""
+    unique_a, unique_b = {}, {}
+    for i in range(alo, ahi):
+        unique_a[a[i]] = -1 if a[i] in unique_a else i
+    for j in range(blo, bhi):
+        unique_b[b[j]] = -1 if b[j] in unique_b else j
+    pairs = sorted((i, unique_b[x]) for x, i in unique_a.items() if i >= 0 and unique_b.get(x, -1) >= 0)
+    return _longest_increasing(pairs)
+
+
+def _occurrence_anchors(a, alo, ahi, b, blo, bhi):
+    """Ca _patience_anchors cand nu exista linii unice (cod generat, linii repetate):
+    a k-a aparitie a unei linii din a este pereche cu a k-a aparitie din b."""
+    seen, positions = Counter(), {}
+    for j in range(blo, bhi):
+        positions[(b[j], seen[b[j]])] = j
+        seen[b[j]] += 1
+    seen, pairs = Counter(), []
+    for i in range(alo, ahi):
+        j = positions.get((a[i], seen[a[i]]))
+        seen[a[i]] += 1
+        if j is not None:
+            pairs.append((i, j))
+    return _longest_increasing(pairs)
+
+
+def match_lines(a, b, deadline=None):
+    """Perechile (i, j) de linii egale dintre a si b (liste de int), prin patience diff.
+
+    Prefixul/sufixul comun sunt potrivite direct, apoi liniile unice in
+    ambele parti devin ancore si regiunile dintre ele sunt procesate la fel.
+    Fara linii unice se incearca ancore dupa numarul aparitiei; regiunile
+    mici ramase fara ancore trec prin difflib; dupa `deadline`
+    (time.perf_counter()) regiunile ramase sunt raportate ca inlocuiri.
+    Intoarce (perechi sortate, timed_out).
+    """
+    matches, timed_out = [], False
+    stack = [(0, len(a), 0, len(b))]
+    while stack:
+        alo, ahi, blo, bhi = stack.pop()
+        while alo < ahi and blo < bhi and a[alo] == b[blo]:
+            matches.append((alo, blo))
+            alo += 1
+            blo += 1
+        while alo < ahi and blo < bhi and a[ahi - 1] == b[bhi - 1]:
+            ahi -= 1
+            bhi -= 1
+            matches.append((ahi, bhi))
+        if alo == ahi or blo == bhi:
+            continue
+        if deadline is not None and time.perf_counter() > deadline:
+            timed_out = True
+            continue
+
+        anchors = _patience_anchors(a, alo, ahi, b, blo, bhi) or _occurrence_anchors(a, alo, ahi, b, blo, bhi)
+        if anchors:
+            prev_a, prev_b = alo, blo
+            for i, j in anchors:
+                stack.append((prev_a, i, prev_b, j))
+                matches.append((i, j))
+                prev_a, prev_b = i + 1, j + 1
+            stack.append((prev_a, ahi, prev_b, bhi))
+        elif (ahi - alo) * (bhi - blo) <= FALLBACK_CELLS:
+            matcher = difflib.SequenceMatcher(None, a[alo:ahi], b[blo:bhi], autojunk=False)
+            for block in matcher.get_matching_blocks():
+                matches.extend((alo + block.a + k, blo + block.b + k) for k in range(block.size))
+    matches.sort()
+    return matches, timed_out
+
+
+def opcodes(matches, len_a, len_b):
+    """Perechile potrivite -> opcodes in stilul difflib (tag, i1, i2, j1, j2)"""
+    codes, i, j = [], 0, 0
+
+    def gap(i2, j2):
+        tag = 'replace' if i2 > i and j2 > j else ('delete' if i2 > i else 'insert')
+        codes.append((tag, i, i2, j, j2))
+
+    for mi, mj in matches:
+        if mi > i or mj > j:
+            gap(mi, mj)
+        if codes and codes[-1][0] == 'equal' and codes[-1][2] == mi and codes[-1][4] == mj:
+            codes[-1] = ('equal', codes[-1][1], mi + 1, codes[-1][3], mj + 1)
+        else:
+            codes.append(('equal', mi, mi + 1, mj, mj + 1))
+        i, j = mi + 1, mj + 1
+    if i < len_a or j < len_b:
+        gap(len_a, len_b)
+    return codes
+
+
+def group_opcodes(codes, context=3):
+    """Grupeaza opcodes in hunk-uri cu `context` linii comune in jur (ca difflib.get_grouped_opcodes)"""
+    codes = list(codes)
+    if not codes:
+        return []
+    if codes[0][0] == 'equal':
+        tag, i1, i2, j1, j2 = codes[0]
+        codes[0] = tag, max(i1, i2 - context), i2, max(j1, j2 - context), j2
+    if codes[-1][0] == 'equal':
+        tag, i1, i2, j1, j2 = codes[-1]
+        codes[-1] = tag, i1, min(i2, i1 + context), j1, min(j2, j1 + context)
+
+    groups, group = [], []
+    for tag, i1, i2, j1, j2 in codes:
+        if tag == 'equal' and i2 - i1 > context * 2:
+            group.append((tag, i1, min(i2, i1 + context), j1, min(j2, j1 + context)))
+            groups.append(group)
+            group = []
+            i1, j1 = max(i1, i2 - context), max(j1, j2 - context)
+        group.append((tag, i1, i2, j1, j2))
+    if group and not (len(group) == 1 and group[0][0] == 'equal'):
+        groups.append(group)
+    return [g for g in groups if any(code[0] != 'equal' for code in g)]
+
+
+def diff_text(old, new, timeout=0.5, context=3):
+    """Diff intre doua texte: {"hunks", "added", "removed", "timed_out", "seconds"}.
+
+    Liniile sunt hash-uite (interne ca int) inainte de comparare. Fiecare
+    hunk: {"old_start", "old_count", "new_start", "new_count", "lines"} cu
+    liniile prefixate de ' ', '-' sau '+'.
+    """
+    start = time.perf_counter()
+    old_lines, new_lines = old.splitlines(), new.splitlines()
+    ids = {}
+    a = [ids.setdefault(line, len(ids)) for line in old_lines]
+    b = [ids.setdefault(line, len(ids)) for line in new_lines]
+    matches, timed_out = match_lines(a, b, start + timeout if timeout else None)
+
+    hunks, added, removed = [], 0, 0
+    for group in group_opcodes(opcodes(matches, len(a), len(b)), context):
+        lines = []
+        for tag, i1, i2, j1, j2 in group:
+            if tag == 'equal':
+                lines.extend(' ' + line for line in old_lines[i1:i2])
+                continue
+            lines.extend('-' + line for line in old_lines[i1:i2])
+            lines.extend('+' + line for line in new_lines[j1:j2])
+            removed += i2 - i1
+            added += j2 - j1
+        first, last = group[0], group[-1]
+        hunks.append({"old_start": first[1] + 1, "old_count": last[2] - first[1],
+                      "new_start": first[3] + 1, "new_count": last[4] - first[3], "lines": lines})
+    return {"hunks": hunks, "added": added, "removed": removed, "timed_out": timed_out,
+            "seconds": time.perf_counter() - start}
+
+
+def hunk_header(hunk):
+    return f"@@ -{hunk['old_start']},{hunk['old_count']} +{hunk['new_start']},{hunk['new_count']} @@"
+
+
+class DiffPager:
+    """Hunk-urile inca neafisate, pentru /diff more.
+
+    Un fisier scris din nou inlocuieste hunk-urile lui vechi. O pagina are
+    cel mult `max_hunks` hunk-uri si (aproximativ) `max_lines` linii; un hunk
+    mai lung este impartit intre pagini.
+    """
+
+    def __init__(self, max_hunks=5, max_lines=300):
+        self.max_hunks = max_hunks
+        self.max_lines = max_lines
+        self.pending = []
+
+    def _take(self, items):
+        """Scoate din `items` (pe loc) o pagina"""
+        page, used = [], 0
+        while items and len(page) < self.max_hunks and used < self.max_lines:
+            path, lexer, header, lines = items[0]
+            room = self.max_lines - used
+            if len(lines) > room and page:
+                break
+            if len(lines) > room:
+                page.append((path, lexer, header, lines[:room]))
+                items[0] = (path, lexer, f"{header} (cont.)" if header else "(cont.)", lines[room:])
+                break
+            page.append(items.pop(0))
+            used += len(lines)
+        return page
+
+    def add(self, path, blocks):
+        """Inlocuieste blocurile [(lexer, header, lines)] ale lui path.
+
+        Intoarce prima lor pagina; restul ramane pentru next_page().
+        """
+        self.discard(path)
+        items = [(path, lexer, header, lines) for lexer, header, lines in blocks]
+        page = self._take(items)
+        self.pending.extend(items)
+        return page
+
+    def queue(self, path, blocks):
+        """Ca add(), dar fara sa scoata o pagina (pentru diff-uri agregate pe mai multe fisiere)"""
+        self.discard(path)
+        self.pending.extend((path, lexer, header, lines) for lexer, header, lines in blocks)
+
+    def next_page(self):
+        """Urmatoarea pagina din asteptare: [(path, lexer, header, lines)]"""
+        return self._take(self.pending)
+
+    def remaining(self):
+        """(fisiere, blocuri, linii) inca neafisate"""
+        return (len({item[0] for item in self.pending}), len(self.pending),
+                sum(len(item[3]) for item in self.pending))
+
+    def clear(self):
+        self.pending = []
+
+    def discard(self, path):
+        self.pending = [item for item in self.pending if item[0] != path]
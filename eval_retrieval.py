@@ -0,0 +1,139 @@
+#!/usr/bin/env python3
+"""Evaluare offline pentru retrieval-ul de context (BM25) pe un repo exemplu.
+
+Masoara calitatea (recall@k, MRR) si latenta (build, update incremental,
+query) fata de vechiul context "primele 15 fisiere din index".
+
+Fara --queries, intrebarile sunt generate din repo: pentru fiecare functie
+Python documentata se foloseste prima linie a docstring-ului si numele
+functiei despartit in cuvinte; fisierul care o defineste este raspunsul
+corect. Pentru rezultate realiste folositi un fisier JSONL scris de mana:
+
+    {"query": "where are retries configured?", "relevant": ["http_client.py"]}
+
+    python eval_retrieval.py --repo . --queries queries.jsonl -k 5
+"""
+import os
+import re
+import ast
+import sys
+import json
+import time
+import random
+import argparse
+import tempfile
+
+from workspace_index import WorkspaceIndex
+from search_index import FileFilter
+from retrieval import RetrievalIndex, mentioned_files
+
+
+def generate_queries(index, root, limit, seed=7):
+    """Intrebari sintetice din docstring-urile si numele functiilor Python"""
+    queries = []
+    for path in index.paths(['.py']):
+        try:
+            with open(os.path.join(root, path), 'r', encoding='utf-8') as f:
+                tree = ast.parse(f.read())
+        except (OSError, SyntaxError, UnicodeDecodeError, ValueError):
+            continue
+        for node in ast.walk(tree):
+            if not isinstance(node, (ast.FunctionDef, ast.AsyncFunctionDef)) or node.name.startswith('__'):
+                continue
+            docstring = ast.get_docstring(node)
+            if docstring:
+                queries.append({"query": docstring.splitlines()[0], "relevant": [path], "kind": "docstring"})
+            words = " ".join(w for w in re.split(r'_|(?<=[a-z])(?=[A-Z])', node.name) if w)
+            if len(words.split()) > 1:
+                queries.append({"query": words, "relevant": [path], "kind": "identifier"})
+    random.Random(seed).shuffle(queries)
+    return queries[:limit]
+
+
+def load_queries(path):
+    with open(path, 'r', encoding='utf-8') as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+
+def percentile(values, p):
+    if not values:
+        return 0.0
+    values = sorted(values)
+    return values[min(len(values) - 1, int(round(p / 100.0 * (len(values) - 1))))]
+
+
+def evaluate(rankings, queries, k):
+    """recall@1, recall@k si MRR (raspunsul corect cautat in primele 10)"""
+    hits_1 = hits_k = reciprocal = 0.0
+    for ranked, query in zip(rankings, queries):
+        relevant = set(query["relevant"])
+        positions = [i for i, path in enumerate(ranked[:10]) if path in relevant]
+        if positions:
+            hits_1 += positions[0] == 0
+            hits_k += positions[0] < k
+            reciprocal += 1.0 / (positions[0] + 1)
+    n = max(1, len(queries))
+    return hits_1 / n, hits_k / n, reciprocal / n
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--repo", default=".", help="repository to index (default: current directory)")
+    parser.add_argument("--queries", help="JSONL with {query, relevant: [paths]} (default: generated)")
+    parser.add_argument("--limit", type=int, default=200, help="max generated queries")
+    parser.add_argument("-k", type=int, default=5)
+    args = parser.parse_args()
+
+    root = os.path.abspath(args.repo)
+    with tempfile.TemporaryDirectory() as state:
+        index = WorkspaceIndex(root, index_file=os.path.join(state, "index.json"))
+        start = time.perf_counter()
+        index.refresh()
+        scan_time = time.perf_counter() - start
+
+        retrieval = RetrievalIndex(root, db_file=os.path.join(state, "retrieval.db"))
+        file_filter = FileFilter()
+        start = time.perf_counter()
+        documents = retrieval.update(index, file_filter)
+        build_time = time.perf_counter() - start
+        start = time.perf_counter()
+        retrieval.update(index, file_filter)
+        update_time = time.perf_counter() - start
+
+        queries = load_queries(args.queries) if args.queries else generate_queries(index, root, args.limit)
+        if not queries:
+            print("No queries (no documented Python functions found; pass --queries)")
+            return 1
+
+        baseline = [p for p in index.paths() if not os.path.basename(p).startswith('.')][:15]
+        bm25_rankings, baseline_rankings, latencies = [], [], []
+        cwd = os.getcwd()
+        os.chdir(root)
+        try:
+            for query in queries:
+                start = time.perf_counter()
+                ranked = [path for path, _ in retrieval.search(query["query"], limit=10)]
+                mentioned = mentioned_files(query["query"], index)
+                ranked = mentioned + [p for p in ranked if p not in mentioned]
+                latencies.append(time.perf_counter() - start)
+                bm25_rankings.append(ranked)
+                baseline_rankings.append(baseline)
+        finally:
+            os.chdir(cwd)
+            retrieval.close()
+
+    print(f"Repository: {root} ({len(index.files)} files, {documents} indexed)")
+    print(f"Queries:    {len(queries)}" + ("" if args.queries else " (generated)"))
+    print(f"Index:      scan {scan_time * 1000:.0f} ms, build {build_time * 1000:.0f} ms, "
+          f"no-op update {update_time * 1000:.0f} ms")
+    print(f"Query:      p50 {percentile(latencies, 50) * 1000:.1f} ms, p95 {percentile(latencies, 95) * 1000:.1f} ms")
+    print()
+    print(f"{'method':<16}{'recall@1':>10}{f'recall@{args.k}':>10}{'MRR@10':>10}")
+    for name, rankings in (("first-15 files", baseline_rankings), ("bm25", bm25_rankings)):
+        r1, rk, mrr = evaluate(rankings, queries, args.k)
+        print(f"{name:<16}{r1:>10.3f}{rk:>10.3f}{mrr:>10.3f}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,34 @@
+import re
+
+# Bloc de cod cu nume de fisier: ```language:filename\ncode\n```
+FILE_BLOCK = re.compile(r'```(\w+):([^\n]+)\n(.*?)```', re.DOTALL)
+
+
+class FileBlockParser:
+    """Detecteaza incremental blocurile ```lang:filename``` dintr-un stream.
+
+    Un bloc este raportat imediat ce fence-ul de inchidere a sosit. Cautarea
+    se reia doar de la sfarsitul ultimului bloc gasit si doar cand chunk-ul
+    nou contine un backtick, asa ca rezultatul este identic cu un
+    FILE_BLOCK.findall() pe textul complet.
+    """
+
+    def __init__(self):
+        self.text = ""
+        self._pos = 0
+
+    def feed(self, chunk):
+        """Adauga un chunk; intoarce blocurile (lang, filename, code) inchise acum"""
+        self.text += chunk
+        if '`' not in chunk:
+            return []
+
+        blocks = []
+        while True:
+            match = FILE_BLOCK.search(self.text, self._pos)
+            if not match:
+                break
+            self._pos = match.end()
+            lang, filename, code = match.groups()
+            blocks.append((lang, filename.strip(), code.strip()))
+        return blocks
@@ -0,0 +1,207 @@
+import os
+import re
+import subprocess
+
+from workspace_index import STATE_DIR
+from retrieval import terms
+
+# Literele din XY (porcelain v2) si ce inseamna
+STATUS_NAMES = {'M': 'modified', 'T': 'type changed', 'A': 'added', 'D': 'deleted',
+                'R': 'renamed', 'C': 'copied', 'U': 'unmerged', '?': 'untracked', '!': 'ignored'}
+
+# Un hunk mai lung de atat este trunchiat in context
+MAX_HUNK_LINES = 80
+
+_HUNK_HEADER = re.compile(r'^@@ -\d+(?:,\d+)? \+(\d+)(?:,\d+)? @@')
+
+
+def parse_status(output):
+    """Parseaza `git status --porcelain=v2 -z --branch` in (branch, entries).
+
+    branch: {"oid", "head", "upstream", "ab"}; entries: {"xy", "path",
+    "orig_path"} cu caile relative la radacina repo-ului.
+    """
+    branch, entries = {}, []
+    fields = output.split('\0')
+    i = 0
+    while i < len(fields):
+        field = fields[i]
+        i += 1
+        if not field:
+            continue
+        if field.startswith('# '):
+            key, _, value = field[2:].partition(' ')
+            branch[key.replace('branch.', '')] = value
+        elif field[0] == '1':
+            parts = field.split(' ', 8)
+            entries.append({"xy": parts[1], "path": parts[8], "orig_path": None})
+        elif field[0] == '2':
+            parts = field.split(' ', 9)
+            entries.append({"xy": parts[1], "path": parts[9], "orig_path": fields[i] if i < len(fields) else None})
+            i += 1
+        elif field[0] == 'u':
+            parts = field.split(' ', 10)
+            entries.append({"xy": parts[1], "path": parts[10], "orig_path": None})
+        elif field[0] in '?!':
+            entries.append({"xy": field[0] * 2, "path": field[2:], "orig_path": None})
+    return branch, entries
+
+
+def parse_diff(output):
+    """Imparte un `git diff` unificat in hunk-uri {path, header, start, lines}"""
+    hunks, current = [], None
+    old_path = new_path = None
+    for line in output.splitlines():
+        if line.startswith('diff --git '):
+            current, old_path, new_path = None, None, None
+        elif current is None and line.startswith('--- '):
+            old_path = None if line[4:] == '/dev/null' else line[4:].split('/', 1)[-1]
+        elif current is None and line.startswith('+++ '):
+            new_path = None if line[4:] == '/dev/null' else line[4:].split('/', 1)[-1]
+        elif line.startswith('@@'):
+            match = _HUNK_HEADER.match(line)
+            current = {"path": new_path or old_path, "header": line,
+                       "start": int(match.group(1)) if match else 0, "lines": []}
+            hunks.append(current)
+        elif current is not None:
+            current["lines"].append(line)
+    return hunks
+
+
+def describe_xy(xy):
+    """'M.' -> 'modified, staged'; '.M' -> 'modified'; '??' -> 'untracked'"""
+    if xy in ('??', '!!'):
+        return STATUS_NAMES[xy[0]]
+    staged, unstaged = xy[0], xy[1]
+    if staged != '.' and unstaged == '.':
+        return f"{STATUS_NAMES.get(staged, staged)}, staged"
+    if staged != '.':
+        return f"{STATUS_NAMES.get(staged, staged)}, staged + {STATUS_NAMES.get(unstaged, unstaged)}"
+    return STATUS_NAMES.get(unstaged, unstaged)
+
+
+class GitRepo:
+    """Starea Git a workspace-ului: un singur `git status` parsat, refolosit.
+
+    Status-ul si diff-ul sunt memorate pana cand se schimba .git/index,
+    .git/HEAD sau generatia WorkspaceIndex (orice fisier din workspace).
+    Caile intoarse sunt relative la directorul curent.
+    """
+
+    def __init__(self, root="."):
+        self.root = root
+        self._info = None
+        self._status = (None, None)
+        self._diff = (None, None)
+
+    def _git(self, *args):
+        try:
+            result = subprocess.run(['git', '--no-optional-locks'] + list(args), cwd=self.root,
+                                    stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+        except OSError:
+            return None
+        if result.returncode != 0:
+            return None
+        return result.stdout.decode('utf-8', errors='surrogateescape')
+
+    def info(self):
+        """(toplevel, git_dir) sau None daca nu este un repo Git (ori git lipseste)"""
+        if self._info is None:
+            output = self._git('rev-parse', '--show-toplevel', '--absolute-git-dir')
+            lines = output.splitlines() if output else []
+            self._info = (lines[0], lines[1]) if len(lines) >= 2 else False
+        return self._info or None
+
+    def _key(self, generation):
+        info = self.info()
+        stamps = []
+        for name in ('index', 'HEAD'):
+            try:
+                stamps.append(os.stat(os.path.join(info[1], name)).st_mtime_ns)
+            except OSError:
+                stamps.append(0)
+        return tuple(stamps) + (generation,)
+
+    def _relative(self, path):
+        return os.path.relpath(os.path.join(self.info()[0], path), self.root)
+
+    def status(self, generation=None):
+        """{"branch": {...}, "entries": [...]} sau None in afara unui repo"""
+        if not self.info():
+            return None
+        key = self._key(generation)
+        if self._status[0] == key:
+            return self._status[1]
+
+        output = self._git('status', '--porcelain=v2', '-z', '--branch', '--untracked-files=all')
+        if output is None:
+            return None
+        branch, entries = parse_status(output)
+        for entry in entries:
+            entry["path"] = self._relative(entry["path"])
+            if entry["orig_path"]:
+                entry["orig_path"] = self._relative(entry["orig_path"])
+        status = {"branch": branch, "entries": entries}
+        self._status = (key, status)
+        return status
+
+    def diff(self, generation=None):
+        """Hunk-urile modificarilor fata de HEAD (staged + nestaged), relative la directorul curent"""
+        status = self.status(generation)
+        if status is None:
+            return []
+        key = self._key(generation)
+        if self._diff[0] == key:
+            return self._diff[1]
+
+        options = ['--relative', '--no-color', '--no-ext-diff', '-U3']
+        if status["branch"].get("oid") == '(initial)':
+            # Repo fara commit-uri: diff-ul staged + cel din working tree
+            output = (self._git('diff', '--cached', *options) or '') + (self._git('diff', *options) or '')
+        else:
+            output = self._git('diff', 'HEAD', *options) or ''
+        hunks = parse_diff(output)
+        self._diff = (key, hunks)
+        return hunks
+
+    def changed_files(self, generation=None):
+        """Fisierele modificate/noi, cele mai recent schimbate primele: [(path, descriere)]"""
+        status = self.status(generation)
+        if status is None:
+            return []
+
+        def mtime(entry):
+            try:
+                return os.stat(os.path.join(self.root, entry["path"])).st_mtime_ns
+            except OSError:
+                return 0
+
+        entries = [e for e in status["entries"] if e["xy"] != '!!'
+                   and not e["path"].startswith(STATE_DIR + os.sep)]
+        entries.sort(key=mtime, reverse=True)
+        return [(e["path"], describe_xy(e["xy"])) for e in entries]
+
+
+def rank_hunks(hunks, query, root="."):
+    """Ordoneaza hunk-urile: termeni comuni cu mesajul, apoi fisierele modificate recent, apoi cele mici"""
+    query_terms = set(terms(query))
+    mtimes = {}
+
+    def key(hunk):
+        path = hunk["path"]
+        if path not in mtimes:
+            try:
+                mtimes[path] = os.stat(os.path.join(root, path)).st_mtime_ns
+            except OSError:
+                mtimes[path] = 0
+        overlap = len(query_terms.intersection(terms(path + "\n" + "\n".join(hunk["lines"]))))
+        return (-overlap, -mtimes[path], len(hunk["lines"]))
+
+    return sorted(hunks, key=key)
+
+
+def format_hunk(hunk, max_lines=MAX_HUNK_LINES):
+    lines = hunk["lines"]
+    if len(lines) > max_lines:
+        lines = lines[:max_lines] + [f"... ({len(hunk['lines']) - max_lines} more lines)"]
+    return f"{hunk['path']}:\n```diff\n{hunk['header']}\n" + "\n".join(lines) + "\n```"
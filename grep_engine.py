@@ -0,0 +1,206 @@
+import os
+import re
+import mmap
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+# Fisierele mai mari sunt sarite la scanare
+DEFAULT_MAX_FILE_SIZE = 10 * 1024 * 1024
+
+# Cati octeti se citesc pentru a detecta fisierele binare
+SNIFF_SIZE = 8192
+
+# Sub aceste praguri scanarea se face in procesul curent (pool-ul nu merita)
+INLINE_MAX_FILES = 200
+INLINE_MAX_BYTES = 4 * 1024 * 1024
+
+# Fisiere trimise unui worker intr-un singur job
+BATCH_SIZE = 64
+
+# Peste acest numar de potriviri intr-un fisier se cauta pe linii
+DENSE_HITS = 32
+
+# Memory-map doar pentru fisierele peste aceasta dimensiune
+MMAP_MIN_SIZE = 1024 * 1024
+
+
+def _count(data, needle, start, end):
+    if isinstance(data, bytes):
+        return data.count(needle, start, end)
+    return data[start:end].count(needle)
+
+
+class Matcher:
+    """Gaseste potrivirile intr-un buffer de bytes.
+
+    Cautarile literale folosesc bytes.find (pe o copie lowercase pentru
+    case-insensitive), iar restul modurilor un regex compilat pe bytes. Un
+    fisier mare (mmap) nu este copiat: literalul case-insensitive se cauta
+    acolo cu regex IGNORECASE. Pe bytes, lower(), IGNORECASE si \\b stiu
+    doar ASCII, deci un termen non-ASCII (in afara de literalul
+    case-sensitive) se cauta pe textul decodat, cu regex/lower() pe str.
+    """
+
+    def __init__(self, term, case_sensitive=False, regex=False, whole_word=False):
+        self.case_sensitive = case_sensitive
+        self.literal = not regex and not whole_word
+        self.text_mode = not term.isascii() and not (self.literal and case_sensitive)
+        self.text = term if case_sensitive else term.lower()
+        self.needle = term.encode('utf-8') if case_sensitive else term.encode('utf-8').lower()
+        source = term if regex else re.escape(term)
+        if whole_word:
+            source = rf'\b(?:{source})\b'
+        flags = re.MULTILINE if case_sensitive else re.MULTILINE | re.IGNORECASE
+        # Pe str (mod text) \b si IGNORECASE sunt Unicode
+        self.str_pattern = re.compile(source, flags) if self.text_mode and not self.literal else None
+        self.pattern = None if self.text_mode else re.compile(source.encode('utf-8'), flags)
+
+    def prepare(self, data):
+        """(buffer, literal): buffer-ul in care se cauta si daca se cauta in el cu bytes.find"""
+        if self.literal and not self.case_sensitive:
+            if isinstance(data, bytes):
+                return data.lower(), True
+            return data, False  # mmap: fara copie, regex IGNORECASE
+        return data, self.literal
+
+    def find(self, haystack, pos, literal):
+        if literal:
+            return haystack.find(self.needle, pos)
+        match = self.pattern.search(haystack, pos)
+        return match.start() if match else -1
+
+    def count(self, haystack, start, end, literal):
+        if literal:
+            return _count(haystack, self.needle, start, end)
+        return max(1, len(self.pattern.findall(haystack, start, end)))
+
+
+def _scan_dense(filepath, data, matcher):
+    """Varianta pe linii (str): fisierele cu foarte multe potriviri literale si termenii non-ASCII"""
+    text = bytes(data).decode('utf-8', errors='replace')
+    lines = text.split('\n')
+    if matcher.str_pattern is not None:
+        if lines and not lines[-1]:
+            lines.pop()  # dupa ultimul '\n' nu mai urmeaza o linie
+        results = []
+        for i, line in enumerate(lines, 1):
+            found = matcher.str_pattern.findall(line)
+            if found:
+                results.append((filepath, i, line.strip(), len(found)))
+        return results
+    # lower() nu adauga si nu elimina '\n', deci liniile raman aliniate
+    hay_lines = lines if matcher.case_sensitive else text.lower().split('\n')
+    needle = matcher.text
+    return [(filepath, i, lines[i - 1].strip(), line.count(needle))
+            for i, line in enumerate(hay_lines, 1) if needle in line]
+
+
+def scan_bytes(filepath, data, matcher):
+    """Cauta in bytes linie cu linie; intoarce (filepath, linie, continut, nr_potriviri)"""
+    if matcher.literal and not matcher.needle:
+        return []
+    if matcher.text_mode:
+        return _scan_dense(filepath, data, matcher)
+    haystack, literal = matcher.prepare(data)
+    if literal:
+        hits = _count(haystack, matcher.needle, 0, len(haystack))
+        if not hits:
+            return []
+        if hits > DENSE_HITS:
+            return _scan_dense(filepath, data, matcher)
+    results = []
+    line_no, last_pos = 1, 0
+
+    pos = matcher.find(haystack, 0, literal)
+    while pos != -1:
+        if pos == len(data) and data[pos - 1:pos] == b'\n':
+            break  # dupa ultimul '\n' nu mai urmeaza o linie
+        line_no += _count(data, b'\n', last_pos, pos)
+        last_pos = pos
+        line_start = data.rfind(b'\n', 0, pos) + 1
+        line_end = data.find(b'\n', pos)
+        if line_end == -1:
+            line_end = len(data)
+        content = data[line_start:line_end].decode('utf-8', errors='replace').strip()
+        results.append((filepath, line_no, content, matcher.count(haystack, pos, line_end, literal)))
+        if line_end >= len(data):
+            break
+        # Urmatoarea linie: un regex care potriveste sirul vid ('$', 'x*') ar ramane pe loc
+        pos = matcher.find(haystack, line_end + 1, literal)
+
+    return results
+
+
+def scan_file(filepath, matcher, max_size=DEFAULT_MAX_FILE_SIZE, root="."):
+    """Scaneaza un fisier ca bytes (mmap pentru fisiere mari); sare peste binare si fisiere prea mari"""
+    try:
+        with open(os.path.join(root, filepath), 'rb') as f:
+            size = os.fstat(f.fileno()).st_size
+            if size == 0 or size > max_size:
+                return []
+            if b'\0' in f.read(SNIFF_SIZE):
+                return []
+            f.seek(0)
+            if size < MMAP_MIN_SIZE:
+                return scan_bytes(filepath, f.read(), matcher)
+            with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as data:
+                return scan_bytes(filepath, data, matcher)
+    except (OSError, ValueError):
+        return []
+
+
+def _scan_batch(filepaths, matcher, max_size, root):
+    """Job executat in worker: scaneaza un lot de fisiere"""
+    results = []
+    for filepath in filepaths:
+        results.extend(scan_file(filepath, matcher, max_size, root))
+    return results
+
+
+class GrepEngine:
+    """Motor de cautare fara index: imparte fisierele pe un pool de procese.
+
+    Rezultatele sunt produse pe loturi, pe masura ce workerii termina, ca sa
+    poata fi afisate imediat. Pentru putine fisiere scanarea ramane in
+    procesul curent.
+    """
+
+    def __init__(self, workers=None, max_file_size=DEFAULT_MAX_FILE_SIZE, root="."):
+        self.workers = workers or os.cpu_count() or 1
+        self.max_file_size = max_file_size
+        self.root = root
+        self._pool = None
+
+    def _get_pool(self):
+        if self._pool is None:
+            self._pool = ProcessPoolExecutor(max_workers=self.workers)
+        return self._pool
+
+    def close(self):
+        if self._pool is not None:
+            self._pool.shutdown(wait=False)
+            self._pool = None
+
+    def search(self, filepaths, matcher, total_bytes=None):
+        """Generator: produce liste de rezultate pe masura ce sunt gasite"""
+        if total_bytes is None:
+            total_bytes = INLINE_MAX_BYTES + 1
+        batches = [filepaths[start:start + BATCH_SIZE] for start in range(0, len(filepaths), BATCH_SIZE)]
+
+        if self.workers <= 1 or len(filepaths) <= INLINE_MAX_FILES or total_bytes <= INLINE_MAX_BYTES:
+            for batch in batches:
+                results = _scan_batch(batch, matcher, self.max_file_size, self.root)
+                if results:
+                    yield results
+            return
+
+        pool = self._get_pool()
+        futures = [pool.submit(_scan_batch, batch, matcher, self.max_file_size, self.root)
+                   for batch in batches]
+        try:
+            for future in as_completed(futures):
+                results = future.result()
+                if results:
+                    yield results
+        finally:
+            for future in futures:
+                future.cancel()
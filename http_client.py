@@ -0,0 +1,200 @@
+import json
+import time
+import random
+import email.utils
+
+import requests
+from requests.adapters import HTTPAdapter
+
+# Status-uri pentru care cererea este reincercata
+RETRY_STATUSES = {408, 429, 500, 502, 503, 504}
+
+
+class CircuitOpenError(Exception):
+    """Providerul a esuat de prea multe ori la rand; cererile sunt refuzate imediat"""
+
+
+class StreamTimeoutError(Exception):
+    """Raspunsul a depasit timeout-ul total"""
+
+
+class RequestCancelledError(Exception):
+    """Cererea a fost anulata de apelant (inainte de raspuns sau in backoff)"""
+
+
+def parse_retry_after(value):
+    """Interpreteaza header-ul Retry-After (secunde sau data HTTP)"""
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        retry_at = email.utils.parsedate_to_datetime(value)
+        return max(0.0, retry_at.timestamp() - time.time())
+    except (TypeError, ValueError):
+        return None
+
+
+class RetryPolicy:
+    """Backoff exponential cu jitter complet; respecta Retry-After"""
+
+    def __init__(self, max_retries=3, backoff_base=0.5, backoff_max=30.0):
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+
+    def delay(self, attempt, retry_after=None):
+        if retry_after is not None:
+            return min(retry_after, self.backoff_max)
+        return random.uniform(0, min(self.backoff_max, self.backoff_base * (2 ** attempt)))
+
+
+class CircuitBreaker:
+    """Circuit breaker simplu: closed -> open dupa N esecuri -> half-open dupa reset_timeout"""
+
+    def __init__(self, failure_threshold=5, reset_timeout=30.0):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.failures = 0
+        self.opened_at = None
+
+    @property
+    def state(self):
+        if self.opened_at is None:
+            return "closed"
+        if time.monotonic() - self.opened_at >= self.reset_timeout:
+            return "half-open"
+        return "open"
+
+    def check(self):
+        """Ridica CircuitOpenError daca circuitul este deschis"""
+        if self.state == "open":
+            remaining = self.reset_timeout - (time.monotonic() - self.opened_at)
+            raise CircuitOpenError(f"Provider unavailable after {self.failures} consecutive failures; "
+                                   f"retrying in {remaining:.0f}s")
+
+    def record_success(self):
+        self.failures = 0
+        self.opened_at = None
+
+    def record_failure(self):
+        self.failures += 1
+        if self.failures >= self.failure_threshold or self.state == "half-open":
+            self.opened_at = time.monotonic()
+
+
+class ChatClient:
+    """Client HTTP pentru backend-ul de chat.
+
+    Foloseste o singura sesiune requests (pool de conexiuni keep-alive),
+    reincearca erorile 429/5xx si de conexiune cu backoff, si deschide un
+    circuit breaker cand providerul cade. Reincercarile au loc doar inainte
+    de primul chunk primit, ca raspunsul sa nu fie dublat. Un `cancel`
+    (threading.Event) setat opreste reincercarile: nicio cerere noua nu mai
+    pleaca, iar asteptarea din backoff se intrerupe imediat.
+    """
+
+    def __init__(self, base_url, api_key, connect_timeout=10.0, read_timeout=60.0, total_timeout=300.0,
+                 retry_policy=None, circuit_breaker=None, pool_size=4):
+        self.base_url = base_url
+        self.connect_timeout = connect_timeout
+        self.read_timeout = read_timeout
+        self.total_timeout = total_timeout
+        self.retry_policy = retry_policy or RetryPolicy()
+        self.circuit_breaker = circuit_breaker or CircuitBreaker()
+
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size, max_retries=0)
+        self.session.mount("https://", adapter)
+        self.session.mount("http://", adapter)
+        self.session.headers.update({
+            "Authorization": f"Bearer {api_key}",
+            "Content-Type": "application/json"
+        })
+
+    def close(self):
+        self.session.close()
+
+    def _post(self, payload, deadline, on_retry=None, cancel=None):
+        """Trimite cererea cu reincercari; intoarce raspunsul deschis (stream)"""
+        attempt = 0
+        while True:
+            if cancel is not None and cancel.is_set():
+                raise RequestCancelledError("request cancelled")
+            self.circuit_breaker.check()
+            retry_after, reason = None, None
+            try:
+                response = self.session.post(self.base_url, json=payload, stream=True,
+                                             timeout=(self.connect_timeout, self.read_timeout))
+                if cancel is not None and cancel.is_set():
+                    response.close()
+                    raise RequestCancelledError("request cancelled")
+                if response.status_code not in RETRY_STATUSES:
+                    response.raise_for_status()
+                    return response
+                retry_after = parse_retry_after(response.headers.get("Retry-After"))
+                reason = f"HTTP {response.status_code}"
+                response.close()
+            except (requests.ConnectionError, requests.Timeout) as e:
+                if cancel is not None and cancel.is_set():
+                    raise RequestCancelledError("request cancelled")
+                reason = type(e).__name__
+                error = e
+            else:
+                error = requests.HTTPError(f"{reason} from {self.base_url}", response=response)
+
+            self.circuit_breaker.record_failure()
+            if attempt >= self.retry_policy.max_retries:
+                raise error
+
+            delay = self.retry_policy.delay(attempt, retry_after)
+            if time.monotonic() + delay >= deadline:
+                raise error
+            attempt += 1
+            if cancel is not None and cancel.is_set():
+                raise RequestCancelledError("request cancelled")
+            if on_retry:
+                on_retry(attempt, delay, reason)
+            if cancel is not None:
+                if cancel.wait(delay):
+                    raise RequestCancelledError("request cancelled")
+            else:
+                time.sleep(delay)
+
+    def open_stream(self, payload, on_retry=None, cancel=None):
+        """Deschide stream-ul (cu reincercari); intoarce (raspuns, deadline)"""
+        deadline = time.monotonic() + self.total_timeout
+        return self._post(payload, deadline, on_retry, cancel), deadline
+
+    def iter_events(self, response, deadline):
+        """Generator: produce evenimentele JSON dintr-un raspuns SSE deschis"""
+        try:
+            for line in response.iter_lines():
+                if time.monotonic() > deadline:
+                    raise StreamTimeoutError(f"Response exceeded total timeout of {self.total_timeout:.0f}s")
+                if not line:
+                    continue
+                line = line.decode('utf-8')
+                if not line.startswith('data: '):
+                    continue
+                data = line[6:]
+                if data == '[DONE]':
+                    break
+                try:
+                    yield json.loads(data)
+                except json.JSONDecodeError:
+                    continue
+            self.circuit_breaker.record_success()
+        except requests.RequestException:
+            self.circuit_breaker.record_failure()
+            raise
+        finally:
+            response.close()
+
+    def stream_events(self, payload, on_retry=None, cancel=None):
+        """Generator: produce evenimentele JSON din stream-ul SSE"""
+        response, deadline = self.open_stream(payload, on_retry, cancel)
+        for event in self.iter_events(response, deadline):
+            yield event
@@ -0,0 +1,152 @@
+import os
+import re
+import subprocess
+
+# Fisierele de reguli citite in fiecare director (sintaxa .gitignore)
+IGNORE_FILES = (".gitignore", ".codemateignore")
+
+# Ignorate implicit si in afara unui repo Git; se pot reactiva cu '!venv/' in .codemateignore
+DEFAULT_IGNORE = ("node_modules/", "venv/", ".venv/", "backups/", "__pycache__/", "*.pyc")
+
+
+def _glob_to_regex(pattern):
+    """Traduce un glob .gitignore ('*', '?', '[...]', '**') in regex"""
+    out, i = [], 0
+    while i < len(pattern):
+        ch = pattern[i]
+        if pattern.startswith('**/', i):
+            out.append('(?:.*/)?')
+            i += 3
+            continue
+        if pattern.startswith('/**', i) and i + 3 == len(pattern):
+            out.append('/.*')
+            i += 3
+            continue
+        if pattern.startswith('**', i):
+            out.append('.*')
+            i += 2
+            continue
+        if ch == '*':
+            out.append('[^/]*')
+        elif ch == '?':
+            out.append('[^/]')
+        elif ch == '[':
+            end = pattern.find(']', i + 1)
+            if end == -1:
+                out.append(re.escape(ch))
+            else:
+                body = pattern[i + 1:end]
+                if body.startswith('!'):
+                    body = '^' + body[1:]
+                out.append('[' + body.replace('\\', '\\\\') + ']')
+                i = end
+        elif ch == '\\' and i + 1 < len(pattern):
+            i += 1
+            out.append(re.escape(pattern[i]))
+        else:
+            out.append(re.escape(ch))
+        i += 1
+    return ''.join(out)
+
+
+def parse_rules(lines, base="."):
+    """Regulile dintr-un fisier .gitignore aflat in directorul `base`"""
+    rules = []
+    for line in lines:
+        line = line.rstrip('\n').rstrip('\r')
+        if not line.strip() or line.startswith('#'):
+            continue
+        if not line.endswith('\\ '):
+            line = line.rstrip()
+        negate = line.startswith('!')
+        if negate:
+            line = line[1:]
+        elif line.startswith('\\'):
+            line = line[1:]
+        dir_only = line.endswith('/')
+        line = line.rstrip('/')
+        if not line:
+            continue
+        anchored = '/' in line
+        line = line.lstrip('/')
+        regex = re.compile(_glob_to_regex(line) + r'\Z')
+        rules.append((base, regex, negate, dir_only, anchored))
+    return rules
+
+
+class IgnoreRules:
+    """Reguli de ignorare in stil .gitignore, acumulate de la radacina in jos.
+
+    Obiectele sunt imutabile: extend() intoarce reguli noi pentru un
+    subdirector, ca un walker sa poata cobori fara sa copieze starea.
+    Ultima regula care se potriveste castiga (inclusiv negarile '!').
+    """
+
+    def __init__(self, rules=()):
+        self.rules = tuple(rules)
+
+    @classmethod
+    def defaults(cls):
+        return cls(parse_rules(DEFAULT_IGNORE))
+
+    def extend(self, rules):
+        return IgnoreRules(self.rules + tuple(rules)) if rules else self
+
+    def ignored(self, rel_path, is_dir=False):
+        """True daca rel_path (relativ la radacina workspace-ului) este ignorat"""
+        rel_path = rel_path.replace(os.sep, '/')
+        name = rel_path.rsplit('/', 1)[-1]
+        result = False
+        for base, regex, negate, dir_only, anchored in self.rules:
+            if dir_only and not is_dir:
+                continue
+            if base == ".":
+                relative = rel_path
+            elif rel_path.startswith(base + '/'):
+                relative = rel_path[len(base) + 1:]
+            else:
+                continue
+            if regex.match(relative if anchored else name):
+                result = not negate
+        return result
+
+    def excludes(self, rel_path, cache=None):
+        """Ca ignored(), dar verifica si directoarele parinte (pentru liste plate de fisiere)"""
+        parts = rel_path.replace(os.sep, '/').split('/')
+        for depth in range(1, len(parts)):
+            parent = '/'.join(parts[:depth])
+            if cache is not None and parent in cache:
+                hidden = cache[parent]
+            else:
+                hidden = self.ignored(parent, is_dir=True)
+                if cache is not None:
+                    cache[parent] = hidden
+            if hidden:
+                return True
+        return self.ignored(rel_path)
+
+
+def read_rules(root, rel_dir, names=IGNORE_FILES):
+    """Regulile din fisierele de ignorare ale unui director"""
+    rules = []
+    base = rel_dir.replace(os.sep, '/')
+    for name in names:
+        try:
+            with open(os.path.join(root, rel_dir, name), 'r', encoding='utf-8', errors='replace') as f:
+                rules.extend(parse_rules(f, base))
+        except OSError:
+            pass
+    return rules
+
+
+def git_ls_files(root="."):
+    """Fisierele din repo (urmarite + neurmarite neignorate), relative la root; None in afara Git"""
+    try:
+        result = subprocess.run(['git', 'ls-files', '-z', '--cached', '--others', '--exclude-standard'],
+                                cwd=root, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+    except OSError:
+        return None
+    if result.returncode != 0:
+        return None
+    paths = result.stdout.decode('utf-8', errors='surrogateescape').split('\0')
+    return sorted({os.path.normpath(p) for p in paths if p})
@@ -0,0 +1,177 @@
+import os
+import ast
+import json
+import hashlib
+
+from workspace_index import STATE_DIR
+from symbol_index import python_module
+
+
+def parse_imports(source, module, is_package=False):
+    """Modulele importate de un fisier Python (absolute, cu importurile relative rezolvate).
+
+    `from a import b` da atat 'a.b' cat si 'a' (b poate fi submodul sau nume).
+    Sunt incluse si importurile din functii sau din `if TYPE_CHECKING`.
+    """
+    if 'import' not in source:
+        return []
+    tree = ast.parse(source)
+    package = module.split('.') if is_package else module.split('.')[:-1]
+    found = set()
+    for node in ast.walk(tree):
+        if isinstance(node, ast.Import):
+            found.update(alias.name for alias in node.names)
+        elif isinstance(node, ast.ImportFrom):
+            if node.level:
+                base = package[:len(package) - node.level + 1] if node.level <= len(package) + 1 else []
+                prefix = '.'.join(base + ([node.module] if node.module else []))
+            else:
+                prefix = node.module or ''
+            if prefix:
+                found.add(prefix)
+            found.update(f"{prefix}.{alias.name}" if prefix else alias.name
+                         for alias in node.names if alias.name != '*')
+    return sorted(found)
+
+
+class ImportGraph:
+    """Graful importurilor dintre fisierele Python ale workspace-ului.
+
+    Importurile fiecarui fisier sunt memorate in .codemate/imports.json dupa
+    hash-ul continutului, deci un update reanalizeaza doar fisierele
+    schimbate. Un modul importat este legat de fisierul al carui nume de
+    modul se termina cu el ('pkg.core' -> src/pkg/core.py), plus
+    __init__.py-urile pachetelor parinte. Importurile externe (stdlib,
+    site-packages) nu apar in graf.
+    """
+
+    def __init__(self, root=".", cache_file=None):
+        self.root = root
+        self.cache_file = cache_file or os.path.join(root, STATE_DIR, "imports.json")
+        self.files = {}    # path -> [hash, [module importat]]
+        self.edges = {}    # path -> set(path importat)
+        self.reverse = {}  # path -> set(path care il importa)
+        self._closures = {}
+        self._load()
+
+    def _load(self):
+        try:
+            with open(self.cache_file, 'r', encoding='utf-8') as f:
+                self.files = json.load(f).get("files", {})
+        except (OSError, ValueError):
+            self.files = {}
+
+    def save(self):
+        os.makedirs(os.path.dirname(self.cache_file), exist_ok=True)
+        with open(self.cache_file + ".tmp", 'w', encoding='utf-8') as f:
+            json.dump({"files": self.files}, f)
+        os.replace(self.cache_file + ".tmp", self.cache_file)
+
+    def update(self, workspace_index):
+        """Reanalizeaza fisierele .py cu hash schimbat si reconstruieste muchiile; intoarce cate au fost parsate"""
+        hashes = {}
+        for path in workspace_index.paths(['.py']):
+            digest = workspace_index.get_hash(path)
+            if digest is not None:
+                hashes[path] = digest
+
+        parsed = 0
+        for path, digest in hashes.items():
+            cached = self.files.get(path)
+            if cached and cached[0] == digest:
+                continue
+            try:
+                with open(os.path.join(self.root, path), 'r', encoding='utf-8', errors='replace') as f:
+                    source = f.read()
+                imports = parse_imports(source, python_module(path), os.path.basename(path) == '__init__.py')
+            except (OSError, SyntaxError, ValueError):
+                imports = []
+            self.files[path] = [digest, imports]
+            parsed += 1
+
+        removed = set(self.files) - set(hashes)
+        for path in removed:
+            del self.files[path]
+        if parsed or removed or not self.edges:
+            self._link()
+            self.save()
+        return parsed
+
+    def _link(self):
+        # sufix de modul -> fisiere ('src.pkg.core', 'pkg.core', 'core')
+        by_suffix = {}
+        for path in self.files:
+            parts = python_module(path).split('.')
+            for i in range(len(parts)):
+                by_suffix.setdefault('.'.join(parts[i:]), []).append(path)
+
+        def resolve(importer, name):
+            candidates = by_suffix.get(name)
+            if not candidates:
+                return None
+            if len(candidates) == 1:
+                return candidates[0]
+            # Mai multe fisiere cu acelasi sufix: cel mai apropiat de importator
+            directory = os.path.dirname(importer)
+            return max(candidates, key=lambda p: (len(os.path.commonprefix([os.path.dirname(p), directory])), -len(p)))
+
+        self.edges = {}
+        for path, (_, imports) in self.files.items():
+            targets = set()
+            for name in imports:
+                parts = name.split('.')
+                # 'a.b.c' importa si pachetele a si a.b
+                for i in range(1, len(parts) + 1):
+                    target = resolve(path, '.'.join(parts[:i]))
+                    if target is not None and target != path:
+                        targets.add(target)
+            self.edges[path] = targets
+        self.reverse = {}
+        for path, targets in self.edges.items():
+            for target in targets:
+                self.reverse.setdefault(target, set()).add(path)
+        self._closures = {}
+
+    def imports(self, path):
+        """Fisierele din workspace importate direct de `path`"""
+        return self.edges.get(path, set())
+
+    def closure(self, path):
+        """Toate fisierele din workspace de care depinde `path`, tranzitiv (fara el)"""
+        cached = self._closures.get(path)
+        if cached is not None:
+            return cached
+        seen, stack = set(), [path]
+        while stack:
+            for target in self.edges.get(stack.pop(), ()):
+                if target not in seen:
+                    seen.add(target)
+                    stack.append(target)
+        seen.discard(path)
+        self._closures[path] = seen
+        return seen
+
+    def dependents(self, paths):
+        """Fisierele care importa, direct sau tranzitiv, oricare din `paths` (inclusiv `paths`)"""
+        if self.files and not self.edges:
+            self._link()
+        seen = set(paths)
+        stack = list(seen)
+        while stack:
+            for importer in self.reverse.get(stack.pop(), ()):
+                if importer not in seen:
+                    seen.add(importer)
+                    stack.append(importer)
+        return seen
+
+    def closure_key(self, path, extra=()):
+        """Hash al continutului lui `path` si al inchiderii lui de importuri (plus fisierele `extra`)"""
+        paths = {path} | self.closure(path)
+        for other in extra:
+            paths.add(other)
+            paths |= self.closure(other)
+        digest = hashlib.sha1()
+        for item in sorted(paths):
+            entry = self.files.get(item)
+            digest.update(f"{item}\0{entry[0] if entry else '-'}\n".encode('utf-8'))
+        return digest.hexdigest()
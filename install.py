@@ -23,7 +23,7 @@ def install_codemate():
         shutil.copy2(current_dir / "codemate.bat", python_scripts / "codemate.bat")
         
         # Copiaza toate fisierele CLI
-        cli_files = ["cli_main.py", "cli_agent.py", "requirements.txt"]
+        cli_files = ["cli_main.py", "cli_agent.py", "workspace_index.py", "search_index.py", "grep_engine.py", "http_client.py", "response_cache.py", "conversation.py", "stream_render.py", "file_blocks.py", "async_core.py", "batch_runner.py", "retrieval.py", "chunker.py", "git_context.py", "ignore_rules.py", "project_profile.py", "snapshot_store.py", "version_store.py", "diff_engine.py", "rewrite_engine.py", "symbol_index.py", "import_graph.py", "shard_runner.py", "worker_pool.py", "proc_stream.py", "requirements.txt"]
         for file in cli_files:
             if (current_dir / file).exists():
                 shutil.copy2(current_dir / file, python_scripts / file)
@@ -0,0 +1,297 @@
+import os
+import time
+import codecs
+import signal
+import asyncio
+import subprocess
+from collections import deque
+
+from workspace_index import STATE_DIR
+
+# Logurile complete ale comenzilor cu iesire trunchiata
+LOG_DIR = os.path.join(STATE_DIR, "logs")
+READ_CHUNK = 65536
+# Cat mai citim din pipe-uri dupa ce procesul a iesit (un nepot le poate tine deschise)
+DRAIN_GRACE = 2.0
+
+
+class OutputBuffer:
+    """Primele `head` si ultimele `tail` linii ale unui stream.
+
+    Liniile din mijloc sunt doar numarate, iar liniile mai lungi de
+    `max_line` caractere sunt taiate, deci memoria ramane marginita oricat
+    de mult scrie procesul.
+    """
+
+    def __init__(self, head=50, tail=200, max_line=2000):
+        self.head_limit = head
+        self.max_line = max_line
+        self.head = []
+        self.tail = deque(maxlen=tail)
+        self.lines = 0
+        self.omitted = 0
+        self.cut = 0          # linii taiate la max_line
+        self._partial = ""    # linia inceputa (maxim max_line caractere)
+        self._partial_extra = 0
+
+    def feed(self, text):
+        """Adauga text; intoarce liniile complete (deja taiate), pentru ecou"""
+        parts = text.split('\n')
+        self._extend(parts[0])
+        if len(parts) == 1:
+            return []
+        complete = [self._take()]
+        for part in parts[1:-1]:
+            self._extend(part)
+            complete.append(self._take())
+        self._extend(parts[-1])
+        for line in complete:
+            self._store(line)
+        return complete
+
+    def finish(self):
+        """Linia neterminata de la final (fara '\\n'), daca exista"""
+        if not self._partial and not self._partial_extra:
+            return []
+        line = self._take()
+        self._store(line)
+        return [line]
+
+    def _extend(self, piece):
+        room = self.max_line - len(self._partial)
+        if len(piece) <= room:
+            self._partial += piece
+        else:
+            self._partial += piece[:max(0, room)]
+            self._partial_extra += len(piece) - max(0, room)
+
+    def _take(self):
+        line, extra = self._partial, self._partial_extra
+        self._partial, self._partial_extra = "", 0
+        if line.endswith('\r') and not extra:
+            line = line[:-1]
+        if extra:
+            self.cut += 1
+            line += f" ... [+{extra} chars]"
+        return line
+
+    def _store(self, line):
+        self.lines += 1
+        if len(self.head) < self.head_limit:
+            self.head.append(line)
+            return
+        if not self.tail.maxlen:
+            self.omitted += 1
+            return
+        if len(self.tail) == self.tail.maxlen:
+            self.omitted += 1  # linia cea mai veche iese din tail
+        self.tail.append(line)
+
+    @property
+    def truncated(self):
+        return bool(self.omitted or self.cut)
+
+    def text(self, head=None, tail=None):
+        """Textul pastrat; cu `head`/`tail` mai mici, doar un extras (ex. pentru model)"""
+        kept = self.head[:head] if head is not None else list(self.head)
+        # Cu linii omise, intre head si tail este o gaura: extrasul de final vine doar din tail
+        rest = list(self.tail) if self.omitted else self.head[len(kept):] + list(self.tail)
+        last = rest[len(rest) - tail:] if tail is not None and tail < len(rest) else rest
+        omitted = self.lines - len(kept) - len(last)
+        lines = kept + ([f"... [{omitted} lines omitted] ..."] if omitted else []) + last
+        return "\n".join(lines)
+
+
+class StreamCapture:
+    """Un stream al procesului: decodare UTF-8 incrementala, OutputBuffer si log complet optional.
+
+    Logul primeste octetii bruti si este pastrat doar daca buffer-ul a
+    trebuit sa renunte la ceva; altfel este sters la inchidere.
+    """
+
+    def __init__(self, buffer, log_path=None):
+        self.buffer = buffer
+        self.log_path = log_path
+        self.bytes = 0
+        self._decoder = codecs.getincrementaldecoder('utf-8')(errors='replace')
+        self._log = None
+        self._closed = False
+
+    def feed(self, data):
+        self.bytes += len(data)
+        if self.log_path is not None:
+            if self._log is None:
+                os.makedirs(os.path.dirname(self.log_path), exist_ok=True)
+                self._log = open(self.log_path, 'wb')
+            self._log.write(data)
+        return self.buffer.feed(self._decoder.decode(data))
+
+    def close(self):
+        """Intoarce ultimele linii complete; logul ramane doar daca iesirea a fost trunchiata"""
+        if self._closed:
+            return []
+        self._closed = True
+        lines = self.buffer.feed(self._decoder.decode(b"", final=True)) + self.buffer.finish()
+        if self._log is not None:
+            self._log.close()
+            if not self.buffer.truncated:
+                try:
+                    os.remove(self.log_path)
+                except OSError:
+                    pass
+                self.log_path = None
+        else:
+            self.log_path = None
+        return lines
+
+
+class ProcessOutput:
+    """stdout si stderr ale unui proces: buffere marginite, ecou live si log complet pe disc.
+
+    `echo(stream, lines, skipped)` primeste liniile noi pe masura ce apar;
+    peste `echo_rate` linii pe secunda (0 = fara limita) liniile nu mai sunt
+    afisate, doar numarate in `skipped` la urmatorul apel. Cu `log_dir`,
+    iesirea completa a unui stream trunchiat ramane in
+    <log_dir>/<data>-<label>.<stream>.log; se pastreaza ultimele `log_keep`.
+    """
+
+    def __init__(self, head=50, tail=200, max_line=2000, echo=None, echo_rate=200,
+                 log_dir=None, log_keep=20, label="output"):
+        stamp = time.strftime("%Y%m%d-%H%M%S")
+        label = "".join(c if c.isalnum() or c in "._-" else "_" for c in label)[:40] or "output"
+        self.streams = {}
+        for name in ("stdout", "stderr"):
+            log_path = os.path.join(log_dir, f"{stamp}-{label}.{name}.log") if log_dir else None
+            self.streams[name] = StreamCapture(OutputBuffer(head, tail, max_line), log_path)
+        self.echo = echo
+        self.echo_rate = echo_rate
+        self.log_dir = log_dir
+        self.log_keep = log_keep
+        self.skipped = 0
+        self._pending_skip = 0
+        self._tokens = float(echo_rate)
+        self._last = time.monotonic()
+
+    def feed(self, name, data):
+        lines = self.streams[name].feed(data)
+        if lines and self.echo is not None:
+            self._echo(name, lines)
+
+    def _echo(self, name, lines):
+        if self.echo_rate:
+            now = time.monotonic()
+            self._tokens = min(float(self.echo_rate), self._tokens + (now - self._last) * self.echo_rate)
+            self._last = now
+            shown = lines[:int(self._tokens)]
+            self._tokens -= len(shown)
+            self.skipped += len(lines) - len(shown)
+        else:
+            shown = lines
+        if shown:
+            self.echo(name, shown, self._pending_skip)
+            self._pending_skip = 0
+        self._pending_skip += len(lines) - len(shown)
+
+    def close(self):
+        """Goleste decodoarele, inchide logurile si raporteaza liniile inca neafisate"""
+        for name, capture in self.streams.items():
+            lines = capture.close()
+            if lines and self.echo is not None:
+                self._echo(name, lines)
+        if self._pending_skip and self.echo is not None:
+            self.echo(None, [], self._pending_skip)
+            self._pending_skip = 0
+        if self.logs and self.log_keep:
+            prune_logs(self.log_dir, self.log_keep)
+
+    @property
+    def stdout(self):
+        return self.streams["stdout"].buffer.text()
+
+    @property
+    def stderr(self):
+        return self.streams["stderr"].buffer.text()
+
+    @property
+    def logs(self):
+        """(stream, cale) pentru logurile complete pastrate"""
+        return [(name, capture.log_path) for name, capture in self.streams.items() if capture.log_path]
+
+    @property
+    def truncated(self):
+        return any(capture.buffer.truncated for capture in self.streams.values())
+
+
+def prune_logs(log_dir, keep):
+    """Pastreaza doar cele mai noi `keep` comenzi (fisierele unei comenzi au acelasi prefix)"""
+    try:
+        names = os.listdir(log_dir)
+    except OSError:
+        return
+    runs = sorted({name.rsplit('.', 2)[0] for name in names if name.endswith('.log')})
+    stale = set(runs[:-keep]) if keep else set()
+    for name in names:
+        if name.rsplit('.', 2)[0] in stale:
+            try:
+                os.remove(os.path.join(log_dir, name))
+            except OSError:
+                pass
+
+
+def _kill(process, group):
+    try:
+        if group:
+            os.killpg(process.pid, signal.SIGKILL)
+        else:
+            process.kill()
+    except OSError:
+        pass
+
+
+async def astream_process(args, output, shell=False, cwd='.', timeout=None, env=None, detach=False):
+    """Ca arun_process, dar iesirea curge in `output` (ProcessOutput) pe masura ce apare.
+
+    Intoarce subprocess.CompletedProcess cu textul pastrat de buffere. Cu
+    `detach`, procesul ruleaza intr-o sesiune proprie, fara stdin: la timeout
+    sau anulare este omorat cu tot ce a pornit (ex. copiii unui shell).
+    Altfel mosteneste stdin-ul si este omorat doar el. Eroarea
+    (asyncio.TimeoutError, CancelledError) se propaga dupa oprire.
+    """
+    group = detach and os.name == 'posix'
+    options = {"cwd": cwd, "env": env, "stdout": asyncio.subprocess.PIPE, "stderr": asyncio.subprocess.PIPE}
+    if detach:
+        options["stdin"] = asyncio.subprocess.DEVNULL
+        options["start_new_session"] = group
+    if shell:
+        process = await asyncio.create_subprocess_shell(args, **options)
+    else:
+        process = await asyncio.create_subprocess_exec(*args, **options)
+
+    async def pump(name, reader):
+        while True:
+            data = await reader.read(READ_CHUNK)
+            if not data:
+                break
+            output.feed(name, data)
+
+    pumps = [asyncio.ensure_future(pump("stdout", process.stdout)),
+             asyncio.ensure_future(pump("stderr", process.stderr))]
+
+    async def finish():
+        await process.wait()
+        await asyncio.wait(pumps, timeout=DRAIN_GRACE)
+
+    try:
+        await asyncio.wait_for(finish(), timeout)
+    except BaseException:
+        if process.returncode is None:
+            _kill(process, group)
+            await process.wait()
+        raise
+    finally:
+        for task in pumps:
+            task.cancel()
+        await asyncio.gather(*pumps, return_exceptions=True)
+        output.close()
+
+    return subprocess.CompletedProcess(args, process.returncode, output.stdout, output.stderr)
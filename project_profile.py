@@ -0,0 +1,301 @@
+import os
+import re
+import json
+import xml.etree.ElementTree as ET
+from concurrent.futures import ThreadPoolExecutor
+
+try:
+    import tomllib
+except ImportError:  # Python < 3.11
+    try:
+        import tomli as tomllib
+    except ImportError:
+        tomllib = None
+
+# Fisiere de configurare mici incluse in contextul modelului (doar din radacina)
+CONFIG_FILES = (".env", "config.json", "package.json", "requirements.txt",
+                "pyproject.toml", "tsconfig.json", "webpack.config.js")
+
+# Dependenta -> framework, in ordinea prioritatii
+FRAMEWORKS = {
+    "Node.js": (("next", "Next.js"), ("react", "React"), ("vue", "Vue.js"), ("@angular/core", "Angular"),
+                ("svelte", "Svelte"), ("@nestjs/core", "NestJS"), ("express", "Express")),
+    "Python": (("django", "Django"), ("fastapi", "FastAPI"), ("flask", "Flask")),
+    "Rust": (("actix-web", "Actix"), ("axum", "Axum"), ("rocket", "Rocket"), ("tokio", "Tokio")),
+    "Java": (("org.springframework.boot:spring-boot-starter", "Spring Boot"),),
+}
+
+LANGUAGES = {"Node.js": "JavaScript", "Python": "Python", "Rust": "Rust", "Java": "Java"}
+
+_REQUIREMENT_NAME = re.compile(r"^\s*([A-Za-z0-9][A-Za-z0-9._-]*)")
+
+
+def requirement_name(spec):
+    """'requests[socks]>=2.0; python_version<"3.8"' -> 'requests'"""
+    match = _REQUIREMENT_NAME.match(spec)
+    return match.group(1) if match else None
+
+
+def _toml_value(text):
+    text = text.strip()
+    if text[:1] in ('"', "'"):
+        return text[1:text.index(text[0], 1)] if text[0] in text[1:] else text[1:]
+    if text.startswith('['):
+        return [_toml_value(item) for item in re.findall(r'"[^"]*"|\'[^\']*\'', text)]
+    return text
+
+
+def _minimal_toml(text):
+    """Parser TOML redus (tabele, chei, string-uri, liste) cand lipsesc tomllib si tomli"""
+    data = {}
+    data_table = data
+    lines = iter(text.splitlines())
+    for line in lines:
+        line = line.split(' #', 1)[0].strip()
+        if not line or line.startswith('#'):
+            continue
+        header = re.match(r'^\[\[?\s*([^\]]+?)\s*\]\]?$', line)
+        if header:
+            data_table = data
+            for key in header.group(1).split('.'):
+                data_table = data_table.setdefault(key.strip().strip('"'), {})
+            continue
+        key, sep, value = line.partition('=')
+        if not sep:
+            continue
+        value = value.strip()
+        if value.startswith('[') and value.count('[') > value.count(']'):
+            for more in lines:
+                value += ' ' + more.split(' #', 1)[0].strip()
+                if value.count('[') <= value.count(']'):
+                    break
+        table = data_table
+        parts = [p.strip().strip('"') for p in key.split('.')]
+        for part in parts[:-1]:
+            table = table.setdefault(part, {})
+        table[parts[-1]] = {} if value.startswith('{') else _toml_value(value)
+    return data
+
+
+def load_toml(path):
+    if tomllib is not None:
+        with open(path, 'rb') as f:
+            return tomllib.load(f)
+    with open(path, 'r', encoding='utf-8') as f:
+        return _minimal_toml(f.read())
+
+
+def _names(values):
+    return [name for name in (requirement_name(v) for v in values if isinstance(v, str)) if name]
+
+
+def parse_package_json(path):
+    with open(path, 'r', encoding='utf-8') as f:
+        pkg = json.load(f)
+    workspaces = pkg.get("workspaces") or []
+    if isinstance(workspaces, dict):
+        workspaces = workspaces.get("packages", [])
+    return {
+        "type": "Node.js", "name": pkg.get("name"),
+        "main": list(pkg.get("dependencies") or {}),
+        "dev": list(pkg.get("devDependencies") or {}),
+        "optional": list(pkg.get("peerDependencies") or {}) + list(pkg.get("optionalDependencies") or {}),
+        "members": list(workspaces),
+    }
+
+
+def parse_pyproject(path):
+    data = load_toml(path)
+    project = data.get("project") or {}
+    poetry = (data.get("tool") or {}).get("poetry") or {}
+    main = _names(project.get("dependencies") or [])
+    main += [name for name in (poetry.get("dependencies") or {}) if name.lower() != "python"]
+    dev = list(poetry.get("dev-dependencies") or {})
+    for group in (poetry.get("group") or {}).values():
+        dev += list((group or {}).get("dependencies") or {})
+    optional = []
+    for extra in (project.get("optional-dependencies") or {}).values():
+        optional += _names(extra)
+    return {"type": "Python", "name": project.get("name") or poetry.get("name"),
+            "main": main, "dev": dev, "optional": optional, "members": []}
+
+
+def parse_requirements(path):
+    main = []
+    with open(path, 'r', encoding='utf-8', errors='replace') as f:
+        for line in f:
+            line = line.split('#', 1)[0].strip()
+            if line and not line.startswith('-'):
+                name = requirement_name(line)
+                if name:
+                    main.append(name)
+    dev = 'dev' in os.path.basename(path) or 'test' in os.path.basename(path)
+    return {"type": "Python", "name": None, "main": [] if dev else main, "dev": main if dev else [],
+            "optional": [], "members": []}
+
+
+def parse_cargo(path):
+    data = load_toml(path)
+    return {"type": "Rust", "name": (data.get("package") or {}).get("name"),
+            "main": list(data.get("dependencies") or {}) + list((data.get("workspace") or {}).get("dependencies") or {}),
+            "dev": list(data.get("dev-dependencies") or {}),
+            "optional": list(data.get("build-dependencies") or {}),
+            "members": list((data.get("workspace") or {}).get("members") or [])}
+
+
+def parse_pom(path):
+    root = ET.parse(path).getroot()
+    ns = root.tag[:root.tag.index('}') + 1] if root.tag.startswith('{') else ''
+
+    def text(node, tag):
+        child = node.find(ns + tag)
+        return child.text.strip() if child is not None and child.text else ''
+
+    main, dev = [], []
+    # Doar <dependencies> direct sub <project>; <dependencyManagement> sunt doar versiuni
+    for dep in root.findall(f"{ns}dependencies/{ns}dependency"):
+        name = f"{text(dep, 'groupId')}:{text(dep, 'artifactId')}"
+        (dev if text(dep, 'scope') == 'test' else main).append(name)
+    return {"type": "Java", "name": text(root, 'artifactId') or None, "main": main, "dev": dev,
+            "optional": [], "members": [m.text.strip() for m in root.findall(f"{ns}modules/{ns}module") if m.text]}
+
+
+# Fisierele care definesc un (sub)proiect (plus requirements-*.txt)
+PARSERS = {"package.json": parse_package_json, "pyproject.toml": parse_pyproject,
+           "requirements.txt": parse_requirements, "Cargo.toml": parse_cargo, "pom.xml": parse_pom}
+
+
+def _manifest_kind(path):
+    name = os.path.basename(path)
+    if name in PARSERS:
+        return name
+    if name.startswith("requirements") and name.endswith(".txt"):
+        return "requirements.txt"
+    return None
+
+
+def _unique(items):
+    return list(dict.fromkeys(items))
+
+
+def detect_framework(project_type, dependencies):
+    lowered = [d.lower() for d in dependencies]
+    for dependency, framework in FRAMEWORKS.get(project_type, ()):
+        # Artefactele Maven se potrivesc dupa prefix (spring-boot-starter-web)
+        if any(d == dependency or (':' in d and d.startswith(dependency)) for d in lowered):
+            return framework
+    if project_type == "Java":
+        return "Maven"
+    return None
+
+
+class ProjectProfile:
+    """Profilul proiectului (tip, framework, dependinte) pentru toate sub-proiectele.
+
+    Manifestele (package.json, pyproject.toml, requirements*.txt, Cargo.toml,
+    pom.xml) sunt gasite in WorkspaceIndex, deci in tot monorepo-ul, si
+    parsate in paralel. Rezultatul este memorat pana cand se schimba
+    size/mtime-ul vreunui manifest; la o schimbare se re-parseaza doar
+    manifestele modificate.
+    """
+
+    def __init__(self, root=".", workers=8):
+        self.root = root
+        self.workers = workers
+        self._key = None
+        self._profile = None
+        self._parsed = {}
+        self._configs = {}
+
+    def _parse(self, path):
+        try:
+            return PARSERS[_manifest_kind(path)](os.path.join(self.root, path)), None
+        except Exception as e:
+            return None, f"{type(e).__name__}: {e}"
+
+    def profile(self, workspace_index):
+        """{"root": {...}, "projects": [...], "errors": {path: mesaj}}; memorat dupa mtime-urile manifestelor"""
+        manifests = sorted(p for p in workspace_index.paths() if _manifest_kind(p))
+        key = tuple((p, workspace_index.entry(p)["size"], workspace_index.entry(p)["mtime"]) for p in manifests)
+        if key == self._key:
+            return self._profile
+
+        stale = [item for item in key if self._parsed.get(item[0], (None,))[0] != item]
+        if stale:
+            with ThreadPoolExecutor(max_workers=min(self.workers, len(stale))) as pool:
+                for item, result in zip(stale, pool.map(self._parse, [item[0] for item in stale])):
+                    self._parsed[item[0]] = (item,) + result
+        for path in set(self._parsed) - set(manifests):
+            del self._parsed[path]
+
+        self._profile = self._build(manifests, workspace_index)
+        self._key = key
+        return self._profile
+
+    def _build(self, manifests, workspace_index):
+        projects, errors = {}, {}
+        for path in manifests:
+            _, data, error = self._parsed[path]
+            if error:
+                errors[path] = error
+                continue
+            directory = os.path.dirname(path) or "."
+            project = projects.setdefault(directory, {
+                "path": directory, "type": data["type"], "name": None, "manifests": [],
+                "dependencies": {"main": [], "dev": [], "optional": []}, "members": []})
+            project["manifests"].append(os.path.basename(path))
+            project["name"] = project["name"] or data["name"]
+            project["members"] += data["members"]
+            for group in ("main", "dev", "optional"):
+                project["dependencies"][group] = _unique(project["dependencies"][group] + data[group])
+
+        for project in projects.values():
+            deps = project["dependencies"]
+            project["language"] = LANGUAGES.get(project["type"], "Mixed")
+            project["framework"] = detect_framework(project["type"], deps["main"] + deps["dev"])
+
+        ordered = sorted(projects.values(), key=lambda p: (p["path"] != ".", p["path"]))
+        return {"root": self._root_info(projects.get("."), ordered, workspace_index),
+                "projects": ordered, "errors": errors}
+
+    def _root_info(self, root_project, projects, workspace_index):
+        """Tipul proiectului din radacina; fara manifest acolo, dupa sub-proiecte sau extensii"""
+        if root_project is not None:
+            info = {"type": root_project["type"], "language": root_project["language"],
+                    "framework": root_project["framework"]}
+        elif len({p["type"] for p in projects}) == 1:
+            info = {"type": projects[0]["type"], "language": projects[0]["language"], "framework": None}
+        else:
+            py_files = len(workspace_index.paths(['.py']))
+            js_files = len(workspace_index.paths(['.js', '.ts']))
+            if py_files > js_files:
+                info = {"type": "Python", "language": "Python", "framework": None}
+            elif js_files > py_files:
+                info = {"type": "JavaScript", "language": "JavaScript", "framework": None}
+            else:
+                info = {"type": "Unknown", "language": "Mixed", "framework": None}
+        if root_project is None and len(projects) > 1:
+            info["type"] = f"Monorepo ({len(projects)} projects)"
+        return info
+
+    def configs(self, max_size=2000):
+        """Continutul fisierelor mici de configurare din radacina, memorat dupa (size, mtime)"""
+        configs = {}
+        for name in CONFIG_FILES:
+            try:
+                st = os.stat(os.path.join(self.root, name))
+            except OSError:
+                continue
+            if st.st_size >= max_size:
+                continue
+            stamp = (st.st_size, st.st_mtime_ns)
+            cached = self._configs.get(name)
+            if cached is None or cached[0] != stamp:
+                try:
+                    with open(os.path.join(self.root, name), 'r', encoding='utf-8') as f:
+                        cached = (stamp, f.read()[:1000])
+                except (OSError, UnicodeDecodeError):
+                    continue
+                self._configs[name] = cached
+            configs[name] = cached[1]
+        return configs
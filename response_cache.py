@@ -0,0 +1,144 @@
+import os
+import re
+import json
+import time
+import sqlite3
+import hashlib
+
+from workspace_index import STATE_DIR
+
+# Cuvinte care arata ca nume de fisiere intr-un mesaj (ex: main.py, src/app.js)
+_FILE_REF = re.compile(r'[\w./\\-]+\.\w+')
+
+# Dimensiunea fragmentelor la redarea unui raspuns din cache
+REPLAY_CHUNK_SIZE = 24
+
+
+def normalize_messages(messages):
+    """Normalizeaza mesajele (newline-uri, spatii la capete) pentru cheia de cache"""
+    return [{"role": m["role"], "content": m["content"].replace("\r\n", "\n").strip()}
+            for m in messages]
+
+
+def referenced_files(messages, workspace_index):
+    """Fisierele din index mentionate in mesaje, cu hash-ul lor curent"""
+    by_name = {}
+    for path in workspace_index.paths():
+        by_name.setdefault(os.path.basename(path), []).append(path)
+
+    refs = {}
+    for message in messages:
+        for token in _FILE_REF.findall(message["content"]):
+            token = token.strip("./\\")
+            candidates = [token] if workspace_index.entry(token) else by_name.get(os.path.basename(token), [])
+            for path in candidates:
+                refs[path] = workspace_index.get_hash(path)
+    return refs
+
+
+def cache_key(model, temperature, messages, file_hashes):
+    payload = json.dumps({
+        "model": model,
+        "temperature": temperature,
+        "messages": normalize_messages(messages),
+        "files": file_hashes,
+    }, sort_keys=True, ensure_ascii=False)
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+
+def replay_chunks(text, size=REPLAY_CHUNK_SIZE):
+    """Imparte un raspuns salvat in fragmente, ca la un stream real"""
+    for i in range(0, len(text), size):
+        yield text[i:i + size]
+
+
+class ResponseCache:
+    """Cache pe disc (.codemate/cache.db) pentru raspunsuri la prompturi identice.
+
+    Intrarile expira dupa ttl secunde; peste max_entries/max_bytes sunt
+    eliminate cele mai vechi accesate (LRU).
+    """
+
+    def __init__(self, db_file=None, max_entries=500, max_bytes=50 * 1024 * 1024, ttl=7 * 24 * 3600):
+        self.db_file = db_file or os.path.join(STATE_DIR, "cache.db")
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self._db = None
+
+    def _connect(self):
+        if self._db is None:
+            os.makedirs(os.path.dirname(self.db_file) or '.', exist_ok=True)
+            self._db = sqlite3.connect(self.db_file)
+            self._db.execute("""
+                CREATE TABLE IF NOT EXISTS responses (
+                    key TEXT PRIMARY KEY,
+                    response TEXT NOT NULL,
+                    size INTEGER NOT NULL,
+                    created REAL NOT NULL,
+                    accessed REAL NOT NULL,
+                    hits INTEGER NOT NULL DEFAULT 0
+                )
+            """)
+        return self._db
+
+    def close(self):
+        if self._db is not None:
+            self._db.close()
+            self._db = None
+
+    def get(self, key):
+        db = self._connect()
+        row = db.execute("SELECT response, created FROM responses WHERE key = ?", (key,)).fetchone()
+        now = time.time()
+        if row is None or now - row[1] > self.ttl:
+            if row is not None:
+                with db:
+                    db.execute("DELETE FROM responses WHERE key = ?", (key,))
+            self.misses += 1
+            return None
+        with db:
+            db.execute("UPDATE responses SET accessed = ?, hits = hits + 1 WHERE key = ?", (now, key))
+        self.hits += 1
+        return row[0]
+
+    def put(self, key, response):
+        db = self._connect()
+        now = time.time()
+        size = len(response.encode('utf-8'))
+        with db:
+            db.execute("INSERT OR REPLACE INTO responses (key, response, size, created, accessed) "
+                       "VALUES (?, ?, ?, ?, ?)", (key, response, size, now, now))
+        self.evict()
+
+    def evict(self):
+        """Elimina intrarile expirate, apoi LRU pana sub limite"""
+        db = self._connect()
+        with db:
+            db.execute("DELETE FROM responses WHERE created < ?", (time.time() - self.ttl,))
+            count, total = db.execute("SELECT COUNT(*), COALESCE(SUM(size), 0) FROM responses").fetchone()
+            if count <= self.max_entries and total <= self.max_bytes:
+                return
+            for key, size in db.execute("SELECT key, size FROM responses ORDER BY accessed").fetchall():
+                if count <= self.max_entries and total <= self.max_bytes:
+                    break
+                db.execute("DELETE FROM responses WHERE key = ?", (key,))
+                count -= 1
+                total -= size
+
+    def stats(self):
+        db = self._connect()
+        count, total, saved = db.execute(
+            "SELECT COUNT(*), COALESCE(SUM(size), 0), COALESCE(SUM(hits), 0) FROM responses").fetchone()
+        return {"entries": count, "bytes": total, "total_hits": saved,
+                "session_hits": self.hits, "session_misses": self.misses}
+
+    def clear(self):
+        db = self._connect()
+        with db:
+            count = db.execute("SELECT COUNT(*) FROM responses").fetchone()[0]
+            db.execute("DELETE FROM responses")
+        db.execute("VACUUM")
+        return count
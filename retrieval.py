@@ -0,0 +1,253 @@
+import os
+import re
+import math
+import hashlib
+import sqlite3
+from collections import Counter
+
+from workspace_index import STATE_DIR
+from search_index import FileFilter
+from conversation import estimate_tokens
+from chunker import ChunkCache
+
+# Fisierele mai mari nu sunt indexate pentru retrieval (de obicei generate/minificate)
+MAX_RETRIEVAL_SIZE = 512 * 1024
+
+# Termenii din cale conteaza mai mult decat o aparitie oarecare in continut
+PATH_WEIGHT = 3
+
+_WORD = re.compile(r"[A-Za-z_][A-Za-z0-9_]*")
+_CAMEL = re.compile(r"[A-Z]+(?=[A-Z][a-z])|[A-Z]?[a-z]+|[A-Z]+|[0-9]+")
+_FILENAME = re.compile(r"[\w./\\-]+\.\w+")
+
+STOPWORDS = frozenset("""
+a an and are as at be by do does for from has have how i if in into is it its me my no not of on or
+please should so that the their then there these this to was we what when where which who why will
+with you your can could would show make use using get set add new
+self cls def class return import none true false pass else elif try except finally while lambda
+var let const function this null undefined async await
+si sau de la in cu pe ce care este un o din pentru nu
+""".split())
+
+
+def _normalize(word):
+    """Lowercase + plural simplu ('files' -> 'file')"""
+    word = word.lower()
+    if len(word) > 3 and word.endswith('s') and not word.endswith('ss'):
+        word = word[:-1]
+    return word
+
+
+def terms(text):
+    """Termenii unui text: identificatori intregi plus bucatile lor snake_case/camelCase"""
+    result = []
+    for word in _WORD.findall(text):
+        whole = _normalize(word)
+        if len(whole) > 1 and whole not in STOPWORDS:
+            result.append(whole)
+        parts = [p for piece in word.split('_') for p in _CAMEL.findall(piece)]
+        if len(parts) > 1:
+            for part in parts:
+                part = _normalize(part)
+                if len(part) > 1 and part not in STOPWORDS and part != whole:
+                    result.append(part)
+    return result
+
+
+def path_terms(path):
+    return terms(re.sub(r'[/\\.\-]', ' ', path))
+
+
+class RetrievalIndex:
+    """Index BM25 peste caile, identificatorii si continutul fisierelor.
+
+    Salvat in .codemate/retrieval.db si sincronizat incremental cu
+    WorkspaceIndex: un fisier este re-tokenizat doar cand hash-ul lui se
+    schimba. Termenii din cale au pondere PATH_WEIGHT.
+    """
+
+    def __init__(self, root=".", db_file=None, k1=1.2, b=0.75):
+        self.root = root
+        self.db_file = db_file or os.path.join(root, STATE_DIR, "retrieval.db")
+        self.k1 = k1
+        self.b = b
+        self._db = None
+
+    def _connect(self):
+        if self._db is None:
+            os.makedirs(os.path.dirname(self.db_file), exist_ok=True)
+            self._db = sqlite3.connect(self.db_file)
+            self._db.executescript("""
+                PRAGMA journal_mode=WAL;
+                PRAGMA synchronous=NORMAL;
+                CREATE TABLE IF NOT EXISTS docs (
+                    id INTEGER PRIMARY KEY,
+                    path TEXT UNIQUE NOT NULL,
+                    hash TEXT,
+                    length INTEGER NOT NULL
+                );
+                CREATE TABLE IF NOT EXISTS postings (
+                    term TEXT NOT NULL,
+                    doc_id INTEGER NOT NULL,
+                    tf INTEGER NOT NULL,
+                    PRIMARY KEY (term, doc_id)
+                ) WITHOUT ROWID;
+                CREATE INDEX IF NOT EXISTS postings_doc ON postings(doc_id);
+            """)
+        return self._db
+
+    def close(self):
+        if self._db is not None:
+            self._db.close()
+            self._db = None
+
+    def _document_terms(self, path):
+        counts = Counter()
+        for term in path_terms(path):
+            counts[term] += PATH_WEIGHT
+        try:
+            with open(os.path.join(self.root, path), 'r', encoding='utf-8') as f:
+                counts.update(terms(f.read()))
+        except (OSError, UnicodeDecodeError):
+            pass
+        return counts
+
+    def update(self, workspace_index, file_filter=None):
+        """Sincronizeaza incremental indexul cu WorkspaceIndex; intoarce nr. de fisiere reindexate"""
+        db = self._connect()
+        known = {path: (doc_id, file_hash) for doc_id, path, file_hash
+                 in db.execute("SELECT id, path, hash FROM docs")}
+        current = {path for path in (file_filter or FileFilter()).apply(workspace_index.paths())
+                   if workspace_index.entry(path)['size'] <= MAX_RETRIEVAL_SIZE}
+        updated = 0
+
+        with db:
+            for path in set(known) - current:
+                doc_id = known[path][0]
+                db.execute("DELETE FROM postings WHERE doc_id = ?", (doc_id,))
+                db.execute("DELETE FROM docs WHERE id = ?", (doc_id,))
+
+            for path in sorted(current):
+                file_hash = workspace_index.get_hash(path)
+                old = known.get(path)
+                if old and old[1] == file_hash and file_hash is not None:
+                    continue
+
+                counts = self._document_terms(path)
+                length = sum(counts.values())
+                if old:
+                    doc_id = old[0]
+                    db.execute("DELETE FROM postings WHERE doc_id = ?", (doc_id,))
+                    db.execute("UPDATE docs SET hash = ?, length = ? WHERE id = ?", (file_hash, length, doc_id))
+                else:
+                    doc_id = db.execute("INSERT INTO docs (path, hash, length) VALUES (?, ?, ?)",
+                                        (path, file_hash, length)).lastrowid
+                db.executemany("INSERT INTO postings (term, doc_id, tf) VALUES (?, ?, ?)",
+                               ((term, doc_id, tf) for term, tf in counts.items()))
+                updated += 1
+
+        return updated
+
+    def search(self, query, limit=10):
+        """Fisierele cele mai relevante pentru query: lista de (path, scor), descrescator"""
+        query_terms = set(terms(query))
+        db = self._connect()
+        total, avg_length = db.execute("SELECT COUNT(*), AVG(length) FROM docs").fetchone()
+        if not query_terms or not total:
+            return []
+        avg_length = avg_length or 1
+
+        scores = Counter()
+        for term in query_terms:
+            rows = db.execute("SELECT p.doc_id, p.tf, d.length FROM postings p "
+                              "JOIN docs d ON d.id = p.doc_id WHERE p.term = ?", (term,)).fetchall()
+            if not rows:
+                continue
+            idf = math.log(1 + (total - len(rows) + 0.5) / (len(rows) + 0.5))
+            for doc_id, tf, length in rows:
+                norm = self.k1 * (1 - self.b + self.b * length / avg_length)
+                scores[doc_id] += idf * tf * (self.k1 + 1) / (tf + norm)
+
+        top = scores.most_common(limit)
+        paths = dict(db.execute("SELECT id, path FROM docs WHERE id IN ({})".format(
+            ",".join("?" * len(top))), [doc_id for doc_id, _ in top])) if top else {}
+        return [(paths[doc_id], score) for doc_id, score in top]
+
+
+def mentioned_files(text, workspace_index):
+    """Fisierele din workspace numite explicit in mesaj (ex: 'app.py', 'src/utils.js')"""
+    found = []
+    for name in _FILENAME.findall(text):
+        if name.startswith('./'):
+            name = name[2:]
+        if workspace_index.entry(name) is not None and os.path.relpath(name) not in found:
+            found.append(os.path.relpath(name))
+    return found
+
+
+def _chunk_score(chunk, query_terms):
+    """Termenii din query prezenti in bucata; potrivirile in nume conteaza dublu"""
+    return (len(query_terms.intersection(terms(chunk.text)))
+            + 2 * len(query_terms.intersection(terms(chunk.name))))
+
+
+def select_chunks(chunks, query_terms, budget):
+    """Bucatile cele mai relevante care incap in buget, in ordinea din fisier"""
+    scored = sorted(((_chunk_score(c, query_terms), i) for i, c in enumerate(chunks)), reverse=True)
+    selected, used = [], 0
+    for score, i in scored:
+        if score == 0 and selected:
+            break
+        cost = estimate_tokens(chunks[i].text)
+        if used + cost > budget:
+            continue
+        selected.append(i)
+        used += cost
+    return [chunks[i] for i in sorted(selected)]
+
+
+def build_context(ranked_paths, query, budget, root=".", chunk_cache=None, seen=None):
+    """Construieste blocurile de cod relevante in limita bugetului de tokeni.
+
+    Fisierele mici sunt incluse complet; din cele mari se trimit doar
+    functiile/clasele/metodele (vezi chunker.py) care contin termeni din
+    query. Blocurile al caror hash este in `seen` (deja trimise, neschimbate)
+    sunt doar mentionate; cele trimise acum sunt adaugate in `seen`.
+    Intoarce (text, fisiere incluse).
+    """
+    chunk_cache = chunk_cache or ChunkCache()
+    query_terms = set(terms(query))
+    parts, included, already_shown, used = [], [], [], 0
+    for path in ranked_paths:
+        try:
+            with open(os.path.join(root, path), 'r', encoding='utf-8') as f:
+                content = f.read()
+        except (OSError, UnicodeDecodeError):
+            continue
+
+        if estimate_tokens(content) <= budget // 3:
+            blocks = [(path, content)]
+        else:
+            chunks = select_chunks(chunk_cache.get(path, content), query_terms, min(budget // 3, budget - used))
+            blocks = [(f"{path} (lines {c.start}-{c.end}{', ' + c.kind + ' ' + c.name if c.name else ''})", c.text)
+                      for c in chunks]
+
+        for label, text in blocks:
+            digest = hashlib.sha1(f"{path}\0{text}".encode('utf-8')).hexdigest()
+            if seen is not None and digest in seen:
+                already_shown.append(label)
+                continue
+            part = f"{label}:\n```\n{text.rstrip()}\n```"
+            cost = estimate_tokens(part)
+            if used + cost > budget:
+                continue
+            parts.append(part)
+            if seen is not None:
+                seen.add(digest)
+            if path not in included:
+                included.append(path)
+            used += cost
+
+    if already_shown:
+        parts.append("Already shown earlier in this conversation (unchanged): " + "; ".join(already_shown))
+    return "\n\n".join(parts), included
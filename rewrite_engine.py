@@ -0,0 +1,359 @@
+import os
+import re
+import json
+import time
+import shutil
+import hashlib
+import tempfile
+from collections import namedtuple
+from concurrent.futures import ProcessPoolExecutor, wait
+
+from workspace_index import STATE_DIR
+from grep_engine import DEFAULT_MAX_FILE_SIZE, SNIFF_SIZE, INLINE_MAX_FILES, BATCH_SIZE
+from snapshot_store import clone_file
+from diff_engine import diff_text
+
+# O regula de inlocuire; `replacement` poate folosi \1 / \g<name> pentru regulile regex
+Rule = namedtuple("Rule", "pattern replacement regex case_sensitive whole_word")
+
+# Jurnalele de rescriere pastrate pentru /batch undo
+JOURNAL_KEEP = 20
+
+# Prefixul fisierelor temporare scrise de workeri langa fisierele tinta
+TEMP_PREFIX = ".codemate-rewrite-"
+
+
+def make_rule(pattern, replacement, regex=False, case_sensitive=True, whole_word=False):
+    return Rule(pattern, replacement, regex, case_sensitive, whole_word)
+
+
+def load_rules(path, defaults=None):
+    """Reguli dintr-un fisier JSONL: {"pattern", "replacement", "regex", "case_sensitive", "whole_word"}"""
+    defaults = dict(defaults or {})
+    rules = []
+    with open(path, 'r', encoding='utf-8') as f:
+        for number, line in enumerate(f, 1):
+            if not line.strip() or line.lstrip().startswith('#'):
+                continue
+            try:
+                data = json.loads(line)
+                options = dict(defaults, **{k: data[k] for k in ("regex", "case_sensitive", "whole_word") if k in data})
+                rules.append(make_rule(data["pattern"], data["replacement"], **options))
+            except (ValueError, KeyError, TypeError) as e:
+                raise ValueError(f"{path}:{number}: invalid rule ({e})")
+    return rules
+
+
+class RuleSet:
+    """Toate regulile compilate intr-un singur regex (o singura trecere per fisier).
+
+    Fiecare regula devine o alternativa cu nume (r0, r1, ...). La aceeasi
+    pozitie regulile regex se incearca in ordinea data, apoi literalii de la
+    cel mai lung la cel mai scurt (potrivirea cea mai lunga, ca Aho-Corasick).
+    Obiectul se trimite workerilor; regex-urile se compileaza la primul apel.
+    """
+
+    def __init__(self, rules):
+        self.rules = list(rules)
+        self._combined = None
+        self._singles = None
+        self.compile()  # erorile de sintaxa apar imediat, nu in workeri
+
+    def __getstate__(self):
+        return {"rules": self.rules}
+
+    def __setstate__(self, state):
+        self.rules = state["rules"]
+        self._combined = None
+        self._singles = None
+
+    @staticmethod
+    def _source(rule):
+        source = rule.pattern if rule.regex else re.escape(rule.pattern)
+        if rule.whole_word:
+            # Nu \b: un pattern care incepe/se termina cu punctuatie nu ar mai potrivi nimic
+            source = rf'(?<!\w)(?:{source})(?!\w)'
+        return source if rule.case_sensitive else f'(?i:{source})'
+
+    def compile(self):
+        if self._combined is None:
+            order = ([i for i, r in enumerate(self.rules) if r.regex] +
+                     sorted((i for i, r in enumerate(self.rules) if not r.regex),
+                            key=lambda i: -len(self.rules[i].pattern)))
+            singles = []
+            for rule in self.rules:
+                try:
+                    singles.append(re.compile(self._source(rule), re.MULTILINE) if rule.regex else None)
+                except re.error as e:
+                    raise ValueError(f"invalid rule pattern {rule.pattern!r}: {e}")
+            try:
+                self._combined = re.compile('|'.join(f'(?P<r{i}>{self._source(self.rules[i])})' for i in order),
+                                            re.MULTILINE)
+            except re.error as e:
+                raise ValueError(f"rules cannot be combined: {e} (numbered backreferences and repeated group "
+                                 f"names clash between rules; use named groups unique to each rule)")
+            self._singles = singles
+        return self._combined
+
+    def apply(self, text):
+        """(text nou, numarul de inlocuiri per regula)"""
+        combined = self.compile()
+        counts = [0] * len(self.rules)
+
+        def replace(match):
+            index = int(match.lastgroup[1:])
+            counts[index] += 1
+            rule = self.rules[index]
+            if not rule.regex:
+                return rule.replacement
+            # Regex-ul regulii, aplicat la aceeasi pozitie, da grupurile pentru \1 / \g<name>
+            single = self._singles[index].match(match.string, match.start())
+            return single.expand(rule.replacement) if single else match.group()
+
+        return combined.sub(replace, text), counts
+
+
+def _sha1(data):
+    return hashlib.sha1(data).hexdigest()
+
+
+def read_source(path, root=".", max_size=DEFAULT_MAX_FILE_SIZE):
+    """(bytes, text, stat) pentru un fisier text UTF-8; None daca e binar, gol, prea mare sau ilizibil"""
+    full = os.path.join(root, path)
+    try:
+        with open(full, 'rb') as f:
+            st = os.fstat(f.fileno())
+            if st.st_size == 0 or st.st_size > max_size:
+                return None
+            data = f.read()
+    except OSError:
+        return None
+    if b'\0' in data[:SNIFF_SIZE]:
+        return None
+    try:
+        return data, data.decode('utf-8'), st
+    except UnicodeDecodeError:
+        return None
+
+
+def stage_rewrite(path, data, st, new_text, counts, root=".", dry_run=False):
+    """Rezultatul pentru RewriteEngine.commit: hash-urile si fie hunk-urile (dry-run),
+    fie un fisier temporar cu noul continut (in acelasi director, pentru os.replace atomic)"""
+    new_data = new_text.encode('utf-8')
+    result = {"path": path, "counts": counts, "size": st.st_size, "mtime": st.st_mtime_ns,
+              "before": _sha1(data), "after": _sha1(new_data)}
+    if dry_run:
+        diff = diff_text(data.decode('utf-8'), new_text)
+        result.update(hunks=diff["hunks"], added=diff["added"], removed=diff["removed"])
+        return result
+
+    full = os.path.join(root, path)
+    fd, tmp = tempfile.mkstemp(dir=os.path.dirname(full) or '.', prefix=TEMP_PREFIX)
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            f.write(new_data)
+            f.flush()
+            os.fsync(f.fileno())
+        os.chmod(tmp, st.st_mode & 0o7777)
+    except BaseException:
+        os.remove(tmp)
+        raise
+    result["tmp"] = tmp
+    return result
+
+
+def rewrite_file(path, rules, root=".", max_size=DEFAULT_MAX_FILE_SIZE, dry_run=False):
+    """Aplica regulile pe un fisier.
+
+    Intoarce None daca nu se schimba nimic (sau fisierul e binar/prea mare),
+    altfel rezultatul lui stage_rewrite cu numarul de inlocuiri per regula.
+    """
+    source = read_source(path, root, max_size)
+    if source is None:
+        return None
+    data, text, st = source
+    new_text, counts = rules.apply(text)
+    if new_text == text:
+        return None
+    return stage_rewrite(path, data, st, new_text, counts, root, dry_run)
+
+
+def _rewrite_batch(paths, rules, root, max_size, dry_run):
+    """Job executat in worker: un lot de fisiere"""
+    results = []
+    for path in paths:
+        result = rewrite_file(path, rules, root, max_size, dry_run)
+        if result is not None:
+            results.append(result)
+    return results
+
+
+class RewriteEngine:
+    """Rescrieri in masa: reguli multiple, pool de procese, dry-run si jurnal pentru undo.
+
+    Faza 1 (in workeri): fiecare fisier este citit o data, regulile aplicate
+    intr-o singura trecere, iar noul continut scris intr-un fisier temporar.
+    Faza 2 (aici): originalele sunt copiate in jurnal (.codemate/rewrites/<id>),
+    apoi fiecare temporar inlocuieste atomic fisierul (os.replace). Daca ceva
+    esueaza la mijloc, fisierele deja inlocuite sunt readuse din jurnal.
+    """
+
+    def __init__(self, workers=None, max_file_size=DEFAULT_MAX_FILE_SIZE, root=".", journal_dir=None):
+        self.workers = workers or os.cpu_count() or 1
+        self.max_file_size = max_file_size
+        self.root = root
+        self.journal_dir = journal_dir or os.path.join(root, STATE_DIR, "rewrites")
+        self._pool = None
+
+    def _get_pool(self):
+        if self._pool is None:
+            self._pool = ProcessPoolExecutor(max_workers=self.workers)
+        return self._pool
+
+    def close(self):
+        if self._pool is not None:
+            self._pool.shutdown(wait=False)
+            self._pool = None
+
+    def plan(self, paths, rules, dry_run=False):
+        """Ruleaza faza 1 pe toate fisierele; intoarce rezultatele sortate dupa cale"""
+        batches = [paths[start:start + BATCH_SIZE] for start in range(0, len(paths), BATCH_SIZE)]
+        if self.workers <= 1 or len(paths) <= INLINE_MAX_FILES:
+            results = [r for batch in batches
+                       for r in _rewrite_batch(batch, rules, self.root, self.max_file_size, dry_run)]
+        else:
+            pool = self._get_pool()
+            futures = [pool.submit(_rewrite_batch, batch, rules, self.root, self.max_file_size, dry_run)
+                       for batch in batches]
+            results = []
+            try:
+                for future in futures:
+                    results.extend(future.result())
+            except BaseException:
+                for future in futures:
+                    future.cancel()
+                wait(futures)
+                # Temporarele deja scrise de loturile terminate
+                for future in futures:
+                    if not future.cancelled() and future.exception() is None:
+                        self.discard(future.result())
+                raise
+        return sorted(results, key=lambda r: r["path"])
+
+    @staticmethod
+    def discard(results):
+        """Sterge fisierele temporare ale unui plan neaplicat"""
+        for result in results:
+            if result.get("tmp"):
+                try:
+                    os.remove(result["tmp"])
+                except OSError:
+                    pass
+
+    def _journal_path(self, journal_id, *parts):
+        return os.path.join(self.journal_dir, journal_id, *parts)
+
+    def _save_journal(self, journal):
+        path = self._journal_path(journal["id"], "journal.json")
+        with open(path + ".tmp", 'w', encoding='utf-8') as f:
+            json.dump(journal, f)
+        os.replace(path + ".tmp", path)
+
+    def commit(self, results, rules, description=""):
+        """Faza 2: inlocuieste fisierele si scrie jurnalul. Intoarce (jurnal, fisiere sarite).
+
+        Un fisier modificat intre faza 1 si commit (size/mtime diferite) este sarit.
+        """
+        journal_id = time.strftime("%Y%m%d_%H%M%S")
+        suffix = 1
+        while os.path.exists(self._journal_path(journal_id)):
+            suffix += 1
+            journal_id = time.strftime("%Y%m%d_%H%M%S") + f"_{suffix}"
+        os.makedirs(self._journal_path(journal_id, "orig"))
+        journal = {"id": journal_id, "created": time.time(), "description": description, "state": "pending",
+                   "rules": [list(r) for r in rules.rules], "files": []}
+
+        skipped, staged, applied = [], [], []
+        try:
+            for number, result in enumerate(results):
+                full = os.path.join(self.root, result["path"])
+                st = os.stat(full)
+                if (st.st_size, st.st_mtime_ns) != (result["size"], result["mtime"]):
+                    skipped.append(result["path"])
+                    os.remove(result["tmp"])
+                    continue
+                clone_file(full, self._journal_path(journal_id, "orig", str(number)))
+                entry = {"path": result["path"], "backup": str(number), "before": result["before"],
+                         "after": result["after"], "counts": result["counts"]}
+                journal["files"].append(entry)
+                staged.append((entry, result["tmp"]))
+            self._save_journal(journal)
+
+            for entry, tmp in staged:
+                os.replace(tmp, os.path.join(self.root, entry["path"]))
+                applied.append(entry)
+        except BaseException:
+            # Inapoi la starea initiala: originalele din jurnal, temporarele sterse
+            for entry in applied:
+                clone_file(self._journal_path(journal_id, "orig", entry["backup"]),
+                           os.path.join(self.root, entry["path"]))
+            self.discard(results)
+            journal["state"] = "rolled back"
+            self._save_journal(journal)
+            raise
+
+        journal["state"] = "committed"
+        self._save_journal(journal)
+        self._prune()
+        return journal, skipped
+
+    def journals(self):
+        """Id-urile jurnalelor, cel mai vechi primul"""
+        try:
+            return sorted(name for name in os.listdir(self.journal_dir)
+                          if os.path.isfile(self._journal_path(name, "journal.json")))
+        except OSError:
+            return []
+
+    def load(self, journal_id):
+        with open(self._journal_path(journal_id, "journal.json"), 'r', encoding='utf-8') as f:
+            return json.load(f)
+
+    def undo(self, journal_id=None):
+        """Anuleaza o rescriere (implicit ultima aplicata). Intoarce (jurnal, restaurate, conflicte).
+
+        Un fisier schimbat de atunci (hash diferit de cel scris) nu este atins.
+        """
+        candidates = [journal_id] if journal_id else [
+            j for j in reversed(self.journals()) if self.load(j)["state"] == "committed"][:1]
+        if not candidates:
+            raise KeyError("no batch rewrite to undo")
+        journal = self.load(candidates[0])
+        if journal["state"] != "committed":
+            raise KeyError(f"batch {journal['id']} is {journal['state']}")
+
+        restored, conflicts = [], []
+        for entry in journal["files"]:
+            full = os.path.join(self.root, entry["path"])
+            try:
+                with open(full, 'rb') as f:
+                    current = _sha1(f.read())
+            except OSError:
+                current = None
+            if current != entry["after"]:
+                conflicts.append(entry["path"])
+                continue
+            fd, tmp = tempfile.mkstemp(dir=os.path.dirname(full) or '.', prefix=TEMP_PREFIX)
+            os.close(fd)
+            clone_file(self._journal_path(journal["id"], "orig", entry["backup"]), tmp)
+            os.chmod(tmp, os.stat(full).st_mode & 0o7777)
+            os.replace(tmp, full)
+            restored.append(entry["path"])
+
+        journal["state"] = "undone"
+        self._save_journal(journal)
+        return journal, restored, conflicts
+
+    def _prune(self):
+        for journal_id in self.journals()[:-JOURNAL_KEEP]:
+            shutil.rmtree(self._journal_path(journal_id), ignore_errors=True)
@@ -0,0 +1,242 @@
+import os
+import sqlite3
+import fnmatch
+
+from workspace_index import STATE_DIR
+from grep_engine import Matcher, scan_file
+
+# Fisierele in care se cauta implicit (suprascris de SEARCH_INCLUDE/SEARCH_EXCLUDE)
+DEFAULT_INCLUDE = ('*.py', '*.js', '*.html', '*.css', '*.md', '*.txt', '*.json')
+DEFAULT_EXCLUDE = ()
+
+# Fisierele mai mari nu primesc trigrame si sunt verificate mereu direct
+MAX_INDEX_SIZE = 4 * 1024 * 1024
+
+_REGEX_SPECIAL = set('.^$*+?{}[]()|\\')
+
+
+class FileFilter:
+    """Set de glob-uri include/exclude aplicate pe calea relativa si pe numele fisierului"""
+
+    def __init__(self, include=DEFAULT_INCLUDE, exclude=DEFAULT_EXCLUDE):
+        self.include = tuple(include) or ('*',)
+        self.exclude = tuple(exclude)
+
+    @classmethod
+    def from_strings(cls, include=None, exclude=None):
+        """Construieste filtrul din liste separate prin virgula (ex: '*.py,*.js')"""
+        def split(value):
+            return tuple(p.strip() for p in value.split(',') if p.strip())
+        return cls(split(include) if include else DEFAULT_INCLUDE,
+                   split(exclude) if exclude else DEFAULT_EXCLUDE)
+
+    @staticmethod
+    def _match(path, patterns):
+        name = os.path.basename(path)
+        path = path.replace(os.sep, '/')
+        return any(fnmatch.fnmatch(name, p) or fnmatch.fnmatch(path, p) for p in patterns)
+
+    def matches(self, path):
+        return self._match(path, self.include) and not self._match(path, self.exclude)
+
+    def apply(self, paths):
+        return [p for p in paths if self.matches(p)]
+
+
+def required_literals(term, regex=False):
+    """Extrage fragmentele literale care trebuie sa apara in orice potrivire.
+
+    Pentru regex se pastreaza doar literalii de la nivelul 0 (fara grupuri);
+    daca exista o alternanta '|' la nivelul 0 nu se poate garanta nimic.
+    """
+    if not regex:
+        return [term]
+
+    literals, current = [], ""
+    depth, i = 0, 0
+    while i < len(term):
+        ch = term[i]
+        if ch == '\\' and i + 1 < len(term):
+            nxt = term[i + 1]
+            if depth == 0 and not nxt.isalnum():
+                current += nxt
+            else:
+                literals.append(current)
+                current = ""
+            i += 2
+            continue
+        if ch == '[':
+            # Sare peste clasa de caractere
+            literals.append(current)
+            current = ""
+            j = i + 1
+            if j < len(term) and term[j] == ']':
+                j += 1
+            while j < len(term) and term[j] != ']':
+                j += 2 if term[j] == '\\' else 1
+            i = j + 1
+            continue
+        if ch == '(':
+            depth += 1
+        elif ch == ')':
+            depth = max(0, depth - 1)
+        elif ch == '|' and depth == 0:
+            return []
+        elif ch in '*?{' and depth == 0:
+            # Ultimul caracter devine optional
+            current = current[:-1]
+            if ch == '{':
+                literals.append(current)
+                current = ""
+                i = term.find('}', i) + 1 or len(term)
+                continue
+        if ch in _REGEX_SPECIAL or depth > 0:
+            literals.append(current)
+            current = ""
+        else:
+            current += ch
+        i += 1
+    literals.append(current)
+    return [lit for lit in literals if lit]
+
+
+def trigrams(text):
+    """Setul de trigrame (lowercase) dintr-un text"""
+    text = text.lower()
+    return {text[i:i + 3] for i in range(len(text) - 2)}
+
+
+class TrigramIndex:
+    """Index invers de trigrame salvat in .codemate/trigrams.db.
+
+    Fisierele sunt reindexate doar cand hash-ul din WorkspaceIndex se schimba.
+    La cautare, trigramele literalilor obligatorii restrang lista de fisiere
+    candidate, care sunt apoi verificate cu pattern-ul complet.
+    """
+
+    def __init__(self, root=".", db_file=None):
+        self.root = root
+        self.db_file = db_file or os.path.join(root, STATE_DIR, "trigrams.db")
+        self._db = None
+
+    @classmethod
+    def exists(cls, root="."):
+        return os.path.exists(os.path.join(root, STATE_DIR, "trigrams.db"))
+
+    def _connect(self):
+        if self._db is None:
+            os.makedirs(os.path.dirname(self.db_file), exist_ok=True)
+            self._db = sqlite3.connect(self.db_file)
+            self._db.executescript("""
+                PRAGMA journal_mode=WAL;
+                PRAGMA synchronous=NORMAL;
+                CREATE TABLE IF NOT EXISTS files (
+                    id INTEGER PRIMARY KEY,
+                    path TEXT UNIQUE NOT NULL,
+                    hash TEXT,
+                    indexed INTEGER NOT NULL DEFAULT 1
+                );
+                CREATE TABLE IF NOT EXISTS postings (
+                    trigram TEXT NOT NULL,
+                    file_id INTEGER NOT NULL,
+                    PRIMARY KEY (trigram, file_id)
+                ) WITHOUT ROWID;
+                CREATE INDEX IF NOT EXISTS postings_file ON postings(file_id);
+            """)
+        return self._db
+
+    def close(self):
+        if self._db is not None:
+            self._db.close()
+            self._db = None
+
+    def update(self, workspace_index, file_filter=None):
+        """Sincronizeaza incremental indexul cu WorkspaceIndex; intoarce nr. de fisiere reindexate"""
+        db = self._connect()
+        known = {path: (file_id, file_hash) for file_id, path, file_hash
+                 in db.execute("SELECT id, path, hash FROM files")}
+        current = set((file_filter or FileFilter()).apply(workspace_index.paths()))
+        updated = 0
+
+        with db:
+            for path in set(known) - current:
+                file_id = known[path][0]
+                db.execute("DELETE FROM postings WHERE file_id = ?", (file_id,))
+                db.execute("DELETE FROM files WHERE id = ?", (file_id,))
+
+            for path in sorted(current):
+                entry = workspace_index.entry(path)
+                file_hash = workspace_index.get_hash(path)
+                old = known.get(path)
+                if old and old[1] == file_hash and file_hash is not None:
+                    continue
+
+                if old:
+                    file_id = old[0]
+                    db.execute("DELETE FROM postings WHERE file_id = ?", (file_id,))
+                    db.execute("UPDATE files SET hash = ?, indexed = 1 WHERE id = ?", (file_hash, file_id))
+                else:
+                    file_id = db.execute("INSERT INTO files (path, hash) VALUES (?, ?)",
+                                         (path, file_hash)).lastrowid
+
+                if entry['size'] > MAX_INDEX_SIZE:
+                    db.execute("UPDATE files SET indexed = 0 WHERE id = ?", (file_id,))
+                else:
+                    try:
+                        with open(os.path.join(self.root, path), 'r', encoding='utf-8') as f:
+                            grams = trigrams(f.read())
+                    except (OSError, UnicodeDecodeError):
+                        grams = set()
+                    db.executemany("INSERT INTO postings (trigram, file_id) VALUES (?, ?)",
+                                   ((gram, file_id) for gram in grams))
+                updated += 1
+
+        return updated
+
+    def candidates(self, literals):
+        """Fisierele care contin toate trigramele literalilor (None = toate fisierele)"""
+        grams = set()
+        for literal in literals:
+            grams |= trigrams(literal)
+        db = self._connect()
+        if not grams:
+            return None
+
+        # Intersecteaza incepand cu trigramele cele mai rare
+        postings = []
+        for gram in grams:
+            ids = {row[0] for row in db.execute("SELECT file_id FROM postings WHERE trigram = ?", (gram,))}
+            if not ids:
+                postings = [set()]
+                break
+            postings.append(ids)
+        postings.sort(key=len)
+
+        file_ids = postings[0]
+        for ids in postings[1:]:
+            file_ids &= ids
+            if not file_ids:
+                break
+
+        paths, file_ids = set(), sorted(file_ids)
+        for start in range(0, len(file_ids), 500):
+            chunk = file_ids[start:start + 500]
+            query = "SELECT path FROM files WHERE id IN ({})".format(",".join("?" * len(chunk)))
+            paths |= {row[0] for row in db.execute(query, chunk)}
+        paths |= {row[0] for row in db.execute("SELECT path FROM files WHERE indexed = 0")}
+        return sorted(paths)
+
+    def candidate_paths(self, term, regex=False):
+        """Fisierele care pot contine termenul, in ordine"""
+        paths = self.candidates(required_literals(term, regex))
+        if paths is None:
+            paths = [row[0] for row in self._connect().execute("SELECT path FROM files ORDER BY path")]
+        return paths
+
+    def search(self, term, case_sensitive=False, regex=False, whole_word=False):
+        """Cauta folosind indexul; intoarce lista de (filepath, linie, continut, nr_potriviri)"""
+        matcher = Matcher(term, case_sensitive, regex, whole_word)
+        results = []
+        for path in self.candidate_paths(term, regex):
+            results.extend(scan_file(path, matcher, root=self.root))
+        return results
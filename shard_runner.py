@@ -0,0 +1,449 @@
+import os
+import json
+import time
+import heapq
+import asyncio
+import hashlib
+import tempfile
+import subprocess
+
+from workspace_index import STATE_DIR
+from symbol_index import python_module
+from proc_stream import ProcessOutput, astream_process
+from worker_pool import python_executable
+
+# Liniile de iesire pastrate pentru fiecare proces de test (inceput + final)
+OUTPUT_HEAD_LINES = 20
+OUTPUT_TAIL_LINES = 100
+
+# Plugin-ul pytest scris in .codemate/pytest si incarcat cu -p in fiecare proces
+PLUGIN_NAME = "codemate_pytest_events"
+PLUGIN_SOURCE = '''"""Plugin pytest al CodeMate: evenimentele testelor ca JSON lines in $CODEMATE_TEST_EVENTS"""
+import os
+import json
+
+_out = None
+
+
+def _write(event):
+    global _out
+    if _out is None:
+        path = os.environ.get("CODEMATE_TEST_EVENTS")
+        if not path:
+            return
+        _out = open(path, "a", encoding="utf-8")
+    _out.write(json.dumps(event) + "\\n")
+    _out.flush()
+
+
+def pytest_collection_modifyitems(config, items):
+    path = os.environ.get("CODEMATE_TEST_SELECT")
+    if not path:
+        return
+    with open(path, encoding="utf-8") as f:
+        wanted = set(f.read().splitlines())
+    deselected = [item for item in items if item.nodeid not in wanted]
+    if deselected:
+        config.hook.pytest_deselected(items=deselected)
+        items[:] = [item for item in items if item.nodeid in wanted]
+
+
+def pytest_collectreport(report):
+    if report.failed:
+        _write({"event": "collect_error", "nodeid": report.nodeid, "message": str(report.longrepr)[-4000:]})
+
+
+def pytest_collection_finish(session):
+    _write({"event": "collected", "nodeids": [item.nodeid for item in session.items]})
+
+
+def pytest_runtest_logstart(nodeid, location):
+    _write({"event": "start", "nodeid": nodeid})
+
+
+def pytest_runtest_logreport(report):
+    event = {"event": "report", "nodeid": report.nodeid, "when": report.when,
+             "outcome": report.outcome, "duration": report.duration}
+    if report.failed:
+        event["message"] = report.longreprtext[-4000:]
+    _write(event)
+'''
+
+# Configuratia pytest din radacina; o schimbare invalideaza tot cache-ul
+PYTEST_CONFIG_FILES = ("pytest.ini", "pyproject.toml", "setup.cfg", "tox.ini")
+
+# Durata presupusa a unui test fara istoric (secunde)
+DEFAULT_DURATION = 0.2
+
+# Un shard nou se porneste doar pentru cel putin atata lucru estimat (pornirea pytest costa)
+MIN_SHARD_SECONDS = 1.0
+
+# Cat de des sunt citite evenimentele shard-urilor
+POLL_INTERVAL = 0.1
+
+PASSING = ('passed', 'skipped')
+
+
+def _combined(result):
+    return "\n".join(text for text in (result.stdout, result.stderr) if text)
+
+
+def test_file(nodeid):
+    """'tests/test_a.py::TestX::test_y[1]' -> 'tests/test_a.py'"""
+    return nodeid.split('::', 1)[0]
+
+
+def shard_tests(nodeids, durations, workers):
+    """Imparte testele in cel mult `workers` shard-uri cu durate estimate apropiate: [(nodeids, secunde)].
+
+    Greedy LPT: cel mai lung test merge in shard-ul cel mai putin incarcat.
+    Testele fara istoric primesc durata medie a celor cunoscute. In fiecare
+    shard testele pastreaza ordinea colectarii.
+    """
+    known = [durations[n] for n in nodeids if n in durations]
+    default = sum(known) / len(known) if known else DEFAULT_DURATION
+    estimate = {n: durations.get(n, default) for n in nodeids}
+    count = max(1, min(workers, len(nodeids), int(sum(estimate.values()) / MIN_SHARD_SECONDS) + 1))
+
+    heap = [(0.0, i) for i in range(count)]
+    shards = [[] for _ in range(count)]
+    for nodeid in sorted(nodeids, key=lambda n: -estimate[n]):
+        load, i = heapq.heappop(heap)
+        shards[i].append(nodeid)
+        heapq.heappush(heap, (load + estimate[nodeid], i))
+
+    order = {n: i for i, n in enumerate(nodeids)}
+    return [(sorted(s, key=order.__getitem__), sum(estimate[n] for n in s)) for s in shards if s]
+
+
+def conftest_files(path, known):
+    """conftest.py din directorul fisierului si din parinti, daca exista in `known`"""
+    found, directory = [], os.path.dirname(path)
+    while True:
+        candidate = os.path.join(directory, "conftest.py") if directory else "conftest.py"
+        if candidate in known:
+            found.append(candidate)
+        if not directory:
+            return found
+        directory = os.path.dirname(directory)
+
+
+def impacted_tests(test_files, changed, graph):
+    """Fisierele de test afectate de fisierele `changed`: cele care le importa (tranzitiv),
+    cele de sub un conftest.py afectat, sau toate daca s-a schimbat configuratia pytest."""
+    changed = {os.path.normpath(path) for path in changed}
+    if changed & set(PYTEST_CONFIG_FILES):
+        return list(test_files)
+    affected = graph.dependents(changed)
+    return [path for path in test_files
+            if path in affected or any(c in affected for c in conftest_files(path, graph.files))]
+
+
+def cache_keys(files, graph, workspace_index, python):
+    """Cheia de cache a fiecarui fisier de test: continutul lui, al importurilor lui
+    (tranzitiv), al conftest.py-urilor, configuratia pytest si interpretorul."""
+    config = [f"{name}:{workspace_index.get_hash(name)}" for name in PYTEST_CONFIG_FILES
+              if workspace_index.entry(name) is not None]
+    keys = {}
+    for path in files:
+        extra = conftest_files(path, graph.files)
+        text = '\n'.join([python] + config + [graph.closure_key(path, extra)])
+        keys[path] = hashlib.sha1(text.encode('utf-8')).hexdigest()
+    return keys
+
+
+class ResultCache:
+    """.codemate/tests.json: cheile fisierelor de test care au trecut si duratele testelor"""
+
+    def __init__(self, root=".", cache_file=None):
+        self.cache_file = cache_file or os.path.join(root, STATE_DIR, "tests.json")
+        try:
+            with open(self.cache_file, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            data = {}
+        self.files = data.get("files", {})
+        self.durations = data.get("durations", {})
+
+    def save(self):
+        os.makedirs(os.path.dirname(self.cache_file), exist_ok=True)
+        with open(self.cache_file + ".tmp", 'w', encoding='utf-8') as f:
+            json.dump({"files": self.files, "durations": self.durations}, f)
+        os.replace(self.cache_file + ".tmp", self.cache_file)
+
+    def fresh(self, keys):
+        """Fisierele a caror cheie nu s-a schimbat de la ultima trecere"""
+        return [path for path, key in keys.items() if self.files.get(path) == key]
+
+    def record(self, run, outcomes, keys):
+        for path, outcome in outcomes.items():
+            if outcome == 'passed':
+                self.files[path] = keys[path]
+            else:
+                self.files.pop(path, None)
+        # Testele sterse sau redenumite din fisierele rulate nu mai au durata
+        collected = set(run.collected)
+        for nodeid in [n for n in self.durations if test_file(n) in outcomes and n not in collected]:
+            del self.durations[nodeid]
+        for nodeid, test in run.tests.items():
+            if test["outcome"] is not None:
+                self.durations[nodeid] = round(test["duration"], 4)
+        self.save()
+
+
+class _EventReader:
+    """Citeste incremental liniile JSON scrise de plugin intr-un fisier"""
+
+    def __init__(self, path):
+        self.path = path
+        self.offset = 0
+        self.partial = b''
+
+    def read(self):
+        try:
+            with open(self.path, 'rb') as f:
+                f.seek(self.offset)
+                data = f.read()
+        except OSError:
+            return []
+        self.offset += len(data)
+        lines = (self.partial + data).split(b'\n')
+        self.partial = lines.pop()
+        events = []
+        for line in lines:
+            try:
+                events.append(json.loads(line))
+            except ValueError:
+                continue
+        return events
+
+
+class TestRun:
+    """Starea unei rulari: testele colectate, shard-urile si rezultatul fiecarui test"""
+
+    def __init__(self):
+        self.mode = "pytest"
+        self.started = time.perf_counter()
+        self.seconds = None
+        self.collected = []
+        self.collect_errors = {}   # nodeid -> mesaj
+        self.shards = []           # {index, tests, done, failed, current, estimate, seconds, returncode}
+        self.tests = {}            # nodeid -> {outcome, duration, shard, message}
+        self.output = []           # (titlu, iesire) pentru procese terminate fara rezultate
+
+    def apply(self, event, shard):
+        kind = event.get("event")
+        if kind == "collect_error":
+            self.collect_errors[event["nodeid"]] = event.get("message", "")
+        elif kind == "start":
+            shard["current"] = event["nodeid"]
+        elif kind == "report":
+            test = self.tests.setdefault(event["nodeid"], {"outcome": None, "duration": 0.0,
+                                                            "shard": shard["index"], "message": None})
+            test["duration"] += event.get("duration") or 0.0
+            when, outcome = event.get("when"), event.get("outcome")
+            if outcome == 'failed':
+                if test["outcome"] not in ('failed', 'error'):
+                    test["outcome"] = 'failed' if when == 'call' else 'error'
+                    test["message"] = event.get("message")
+            elif outcome == 'skipped' and test["outcome"] is None:
+                test["outcome"] = 'skipped'
+            elif outcome == 'passed' and when == 'call' and test["outcome"] is None:
+                test["outcome"] = 'passed'
+            if when == 'teardown':
+                shard["done"] += 1
+                shard["current"] = None
+                if test["outcome"] in ('failed', 'error'):
+                    shard["failed"] += 1
+
+    def counts(self):
+        counts = {}
+        for nodeid in self.collected:
+            outcome = self.tests.get(nodeid, {}).get("outcome") or 'missing'
+            counts[outcome] = counts.get(outcome, 0) + 1
+        if self.collect_errors:
+            counts['error'] = counts.get('error', 0) + len(self.collect_errors)
+        return counts
+
+    def file_outcomes(self, files):
+        """{fisier: 'passed' | 'failed'}; un fisier trece daca toate testele lui au trecut sau au fost sarite"""
+        outcomes = {path: 'passed' for path in files}
+        for nodeid in self.collected:
+            outcome = self.tests.get(nodeid, {}).get("outcome")
+            if outcome not in PASSING:
+                outcomes[test_file(nodeid)] = 'failed'
+        for nodeid in self.collect_errors:
+            path = test_file(nodeid)
+            for other in (outcomes if path in ('', '.') else [path]):
+                outcomes[other] = 'failed'
+        if self.output and not self.collected:
+            outcomes = {path: 'failed' for path in files}
+        return outcomes
+
+    def slowest(self, count):
+        tests = [(test["duration"], nodeid) for nodeid, test in self.tests.items() if test["outcome"] is not None]
+        return sorted(tests, reverse=True)[:count]
+
+
+class ShardRunner:
+    """Ruleaza fisiere de teste pytest in paralel, in `workers` procese.
+
+    O singura colectare (pytest --collect-only) da lista testelor, care sunt
+    apoi impartite in shard-uri echilibrate dupa duratele din rularile
+    anterioare. Fiecare shard este un proces pytest care primeste doar
+    testele lui; un plugin mic raporteaza fiecare test intr-un fisier de
+    evenimente, citit in timp ce shard-urile ruleaza. Fara pytest, fisierele
+    ruleaza cu `python -m unittest`, cate unul pe proces. Cu un WorkerPool,
+    procesele pornesc din interpretorul cald al acestuia. Din iesirea unui
+    proces se pastreaza doar inceputul si finalul; un proces care depaseste
+    `timeout` secunde este omorat.
+    """
+
+    def __init__(self, root=".", workers=None, python=None, pool=None, timeout=None):
+        self.root = root
+        self.timeout = timeout or None
+        self.workers = max(1, workers or min(8, os.cpu_count() or 1))
+        self.pool = pool
+        self.python = python or (pool.python if pool is not None else python_executable())
+        self.plugin_dir = os.path.join(root, STATE_DIR, "pytest")
+
+    def _install_plugin(self):
+        path = os.path.join(self.plugin_dir, PLUGIN_NAME + ".py")
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                if f.read() == PLUGIN_SOURCE:
+                    return
+        except OSError:
+            pass
+        os.makedirs(self.plugin_dir, exist_ok=True)
+        with open(path + ".tmp", 'w', encoding='utf-8') as f:
+            f.write(PLUGIN_SOURCE)
+        os.replace(path + ".tmp", path)
+
+    def _env(self, events, select=None, shard=None):
+        env = dict(os.environ)
+        # La sfarsitul PYTHONPATH: modulele proiectului nu pot fi umbrite
+        env["PYTHONPATH"] = os.pathsep.join(p for p in (env.get("PYTHONPATH"), os.path.abspath(self.plugin_dir)) if p)
+        env["CODEMATE_TEST_EVENTS"] = events
+        if select:
+            env["CODEMATE_TEST_SELECT"] = select
+        if shard is not None:
+            env["CODEMATE_TEST_SHARD"] = str(shard)  # testele care folosesc porturi/fisiere fixe se pot separa
+        return env
+
+    async def _exec(self, argv, env=None):
+        """Ruleaza `python <argv>` (prin pool, daca exista); la timeout intoarce returncode None"""
+        output = ProcessOutput(head=OUTPUT_HEAD_LINES, tail=OUTPUT_TAIL_LINES)
+        try:
+            if self.pool is not None:
+                return await self.pool.run(argv, cwd=self.root, env=env, timeout=self.timeout, output=output)
+            return await astream_process([self.python] + argv, output, cwd=self.root, timeout=self.timeout, env=env)
+        except asyncio.TimeoutError:
+            output.close()
+            stderr = f"{output.stderr}\nKilled after {self.timeout:g}s (TEST_TIMEOUT)".lstrip()
+            return subprocess.CompletedProcess([self.python] + argv, None, output.stdout, stderr)
+
+    def _pytest(self, *args):
+        return ['-m', 'pytest', '-p', PLUGIN_NAME, '-p', 'no:cacheprovider', '--rootdir=.'] + list(args)
+
+    async def run(self, files, durations=None, on_update=None):
+        """Ruleaza testele din `files`; on_update(run) este apelat la fiecare progres. Intoarce TestRun."""
+        run = TestRun()
+        self._install_plugin()
+        with tempfile.TemporaryDirectory(prefix="codemate-tests-") as workdir:
+            if await self._collect(files, run, workdir):
+                if run.collected:
+                    await self._run_shards(run, durations or {}, workdir, on_update)
+            else:
+                run.mode = "unittest"
+                await self._run_unittest(files, run, on_update)
+        run.seconds = time.perf_counter() - run.started
+        return run
+
+    async def _collect(self, files, run, workdir):
+        """Colectarea pytest; intoarce False daca pytest nu este instalat"""
+        events = os.path.join(workdir, "collect.jsonl")
+        result = await self._exec(self._pytest('--collect-only', '-q', *files), self._env(events))
+        collected = False
+        for event in _EventReader(events).read():
+            if event.get("event") == "collected":
+                run.collected, collected = event["nodeids"], True
+            elif event.get("event") == "collect_error":
+                run.collect_errors[event["nodeid"]] = event.get("message", "")
+        if not collected:
+            output = _combined(result)
+            if "No module named pytest" in output:
+                return False
+            run.output.append(("collection", output[-4000:]))
+        return True
+
+    async def _run_shards(self, run, durations, workdir, on_update):
+        readers, tasks = [], []
+        for index, (nodeids, estimate) in enumerate(shard_tests(run.collected, durations, self.workers), 1):
+            shard = {"index": index, "tests": len(nodeids), "done": 0, "failed": 0, "current": None,
+                     "estimate": estimate, "seconds": None, "returncode": None, "output": ""}
+            run.shards.append(shard)
+            select = os.path.join(workdir, f"shard{index}.txt")
+            with open(select, 'w', encoding='utf-8') as f:
+                f.write('\n'.join(nodeids))
+            events = os.path.join(workdir, f"shard{index}.jsonl")
+            files = list(dict.fromkeys(test_file(n) for n in nodeids))
+            args = self._pytest('-q', '--continue-on-collection-errors', *files)
+            readers.append((shard, _EventReader(events)))
+            tasks.append(asyncio.ensure_future(self._run_shard(shard, args, self._env(events, select, index))))
+
+        try:
+            pending = set(tasks)
+            while pending:
+                _, pending = await asyncio.wait(pending, timeout=POLL_INTERVAL)
+                for shard, reader in readers:
+                    for event in reader.read():
+                        if event.get("event") != "collected":
+                            run.apply(event, shard)
+                if on_update is not None:
+                    on_update(run)
+            for task in tasks:
+                task.result()
+        finally:
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+
+        for shard in run.shards:
+            # Proces oprit inainte de ultimul test (crash, os._exit, eroare interna pytest)
+            if shard["done"] < shard["tests"] and shard["output"]:
+                status = "timed out" if shard["returncode"] is None else f"exit {shard['returncode']}"
+                run.output.append((f"shard {shard['index']} ({status})", shard["output"]))
+
+    async def _run_shard(self, shard, args, env):
+        start = time.perf_counter()
+        result = await self._exec(args, env)
+        shard["seconds"] = time.perf_counter() - start
+        shard["returncode"] = result.returncode
+        shard["output"] = _combined(result)[-4000:]
+
+    async def _run_unittest(self, files, run, on_update):
+        shard = {"index": 1, "tests": len(files), "done": 0, "failed": 0, "current": None,
+                 "estimate": None, "seconds": None, "returncode": None, "output": ""}
+        run.shards.append(shard)
+        run.collected = list(files)
+        semaphore = asyncio.Semaphore(self.workers)
+
+        async def run_file(path):
+            async with semaphore:
+                shard["current"] = path
+                start = time.perf_counter()
+                result = await self._exec(['-m', 'unittest', python_module(path)])
+                # 5: niciun test gasit (Python 3.12+)
+                outcome = 'passed' if result.returncode == 0 else ('skipped' if result.returncode == 5 else 'failed')
+                run.tests[path] = {"outcome": outcome, "duration": time.perf_counter() - start, "shard": 1,
+                                   "message": _combined(result)[-4000:] if outcome == 'failed' else None}
+                shard["done"] += 1
+                shard["failed"] += outcome == 'failed'
+                if on_update is not None:
+                    on_update(run)
+
+        start = time.perf_counter()
+        await asyncio.gather(*(run_file(path) for path in files))
+        shard["seconds"] = time.perf_counter() - start
+        shard["current"] = None
@@ -0,0 +1,277 @@
+import os
+import json
+import time
+import shutil
+import tempfile
+from datetime import datetime
+from concurrent.futures import ThreadPoolExecutor
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+
+from workspace_index import STATE_DIR, file_hash, diff_snapshots
+
+# ioctl Linux pentru reflink (copy-on-write) pe Btrfs/XFS/OCFS2
+FICLONE = 0x40049409
+
+
+def clone_file(src, dst):
+    """Copiaza src in dst: reflink daca sistemul de fisiere il suporta, altfel copie normala.
+
+    Hardlink-urile nu sunt folosite: un editor care scrie fisierul pe loc
+    ar modifica si blob-ul din store.
+    """
+    if fcntl is not None:
+        try:
+            with open(src, 'rb') as fsrc, open(dst, 'wb') as fdst:
+                fcntl.ioctl(fdst.fileno(), FICLONE, fsrc.fileno())
+            return "reflink"
+        except OSError:
+            pass
+    shutil.copyfile(src, dst)
+    return "copy"
+
+
+def _atomic_clone(src, dst, mode=None):
+    """Scrie dst printr-un fisier temporar in acelasi director, apoi os.replace"""
+    directory = os.path.dirname(dst) or '.'
+    os.makedirs(directory, exist_ok=True)
+    fd, tmp = tempfile.mkstemp(dir=directory, prefix='.tmp-')
+    os.close(fd)
+    try:
+        method = clone_file(src, tmp)
+        if mode is not None:
+            os.chmod(tmp, mode)
+        os.replace(tmp, dst)
+    except BaseException:
+        try:
+            os.remove(tmp)
+        except OSError:
+            pass
+        raise
+    return method
+
+
+class SnapshotStore:
+    """Backup-uri incrementale adresate prin continut, in .codemate/snapshots.
+
+    Fiecare fisier este salvat o singura data ca blob (objects/ab/cdef...,
+    dupa hash-ul sha1 din WorkspaceIndex); un snapshot este doar un manifest
+    JSON {path: [hash, size, mode]}. Un backup fara schimbari nu copiaza
+    nimic, iar restaurarea rescrie doar fisierele care difera.
+    """
+
+    def __init__(self, root=".", store_dir=None, workers=8):
+        self.root = root
+        self.store_dir = store_dir or os.path.join(root, STATE_DIR, "snapshots")
+        self.objects_dir = os.path.join(self.store_dir, "objects")
+        self.manifests_dir = os.path.join(self.store_dir, "manifests")
+        self.workers = workers
+
+    def _object_path(self, digest):
+        return os.path.join(self.objects_dir, digest[:2], digest[2:])
+
+    def _manifest_path(self, snapshot_id):
+        return os.path.join(self.manifests_dir, snapshot_id + ".json")
+
+    def _store_blob(self, rel_path, entry, digest):
+        """Copiaza fisierul in store daca blob-ul lipseste; intoarce (hash, bytes noi, metoda)"""
+        target = self._object_path(digest)
+        if os.path.exists(target):
+            return digest, 0, None
+        source = os.path.join(self.root, rel_path)
+        method = _atomic_clone(source, target, 0o444)
+        # Fisierul s-a schimbat intre refresh si copiere: blob-ul primeste hash-ul real
+        st = os.stat(source)
+        if (st.st_size, st.st_mtime_ns) != (entry["size"], entry["mtime"]):
+            actual = file_hash(target)
+            if actual != digest:
+                final = self._object_path(actual)
+                if os.path.exists(final):
+                    os.remove(target)
+                else:
+                    os.makedirs(os.path.dirname(final), exist_ok=True)
+                    os.replace(target, final)
+                return actual, os.path.getsize(final), method
+        return digest, entry["size"], method
+
+    def create(self, workspace_index, label=None):
+        """Salveaza un snapshot al fisierelor din index; intoarce manifestul (cu statistici)"""
+        start = time.perf_counter()
+        workspace_index.refresh()
+        files, pending = {}, []
+        for path in workspace_index.paths():
+            entry = workspace_index.entry(path)
+            digest = workspace_index.get_hash(path)
+            if digest is None:
+                continue
+            try:
+                mode = os.stat(os.path.join(self.root, path)).st_mode & 0o777
+            except OSError:
+                continue
+            files[path] = [digest, entry["size"], mode]
+            if not os.path.exists(self._object_path(digest)):
+                pending.append((path, entry, digest))
+
+        def store(item):
+            try:
+                return (item[0],) + self._store_blob(*item)
+            except OSError:
+                return item[0], None, 0, None  # sters intre timp
+
+        stored, methods = 0, {}
+        if pending:
+            with ThreadPoolExecutor(max_workers=self.workers) as pool:
+                for path, digest, added, method in pool.map(store, pending):
+                    if digest is None:
+                        del files[path]
+                        continue
+                    files[path][0] = digest
+                    stored += added
+                    if method:
+                        methods[method] = methods.get(method, 0) + 1
+        workspace_index.save()
+
+        snapshot_id = datetime.now().strftime("%Y%m%d_%H%M%S")
+        suffix = 1
+        while os.path.exists(self._manifest_path(snapshot_id)):
+            suffix += 1
+            snapshot_id = datetime.now().strftime("%Y%m%d_%H%M%S") + f"_{suffix}"
+        manifest = {
+            "id": snapshot_id, "created": time.time(), "label": label, "files": files,
+            "stats": {"files": len(files), "new_blobs": sum(methods.values()), "new_bytes": stored,
+                      "total_bytes": sum(f[1] for f in files.values()), "methods": methods,
+                      "seconds": round(time.perf_counter() - start, 3)},
+        }
+        os.makedirs(self.manifests_dir, exist_ok=True)
+        tmp = self._manifest_path(snapshot_id) + ".tmp"
+        with open(tmp, 'w', encoding='utf-8') as f:
+            json.dump(manifest, f)
+        os.replace(tmp, self._manifest_path(snapshot_id))
+        return manifest
+
+    def ids(self):
+        """Id-urile snapshot-urilor, cel mai vechi primul"""
+        try:
+            names = os.listdir(self.manifests_dir)
+        except OSError:
+            return []
+        return sorted(n[:-5] for n in names if n.endswith(".json"))
+
+    def resolve(self, ref):
+        """Id complet pentru un prefix, 'latest' sau '~N' (al N-lea dinaintea ultimului)"""
+        ids = self.ids()
+        if not ids:
+            raise KeyError("no snapshots yet")
+        if ref in ids:
+            return ref
+        if ref in ('latest', 'last', '~0'):
+            return ids[-1]
+        if ref.startswith('~') and ref[1:].isdigit():
+            n = int(ref[1:])
+            if n >= len(ids):
+                raise KeyError(f"only {len(ids)} snapshots")
+            return ids[-1 - n]
+        matches = [i for i in ids if i.startswith(ref)]
+        if len(matches) != 1:
+            raise KeyError(f"{'ambiguous' if matches else 'unknown'} snapshot '{ref}'")
+        return matches[0]
+
+    def load(self, ref):
+        with open(self._manifest_path(self.resolve(ref)), 'r', encoding='utf-8') as f:
+            return json.load(f)
+
+    def list(self):
+        """Manifestele (fara lista de fisiere), cel mai vechi primul"""
+        result = []
+        for snapshot_id in self.ids():
+            try:
+                manifest = self.load(snapshot_id)
+            except (OSError, ValueError, KeyError):
+                continue
+            manifest.pop("files", None)
+            result.append(manifest)
+        return result
+
+    @staticmethod
+    def diff(old_files, new_files):
+        """{added, removed, modified} intre doua liste de fisiere {path: [hash, ...]}"""
+        return diff_snapshots({p: v[0] for p, v in old_files.items()}, {p: v[0] for p, v in new_files.items()})
+
+    def current_files(self, workspace_index):
+        """Starea curenta a workspace-ului in formatul manifestelor (pentru diff cu un snapshot)"""
+        workspace_index.refresh()
+        files = {}
+        for path in workspace_index.paths():
+            digest = workspace_index.get_hash(path)
+            if digest is not None:
+                files[path] = [digest, workspace_index.entry(path)["size"], None]
+        return files
+
+    def read_blob(self, digest):
+        with open(self._object_path(digest), 'rb') as f:
+            return f.read()
+
+    def restore(self, ref, workspace_index, paths=None):
+        """Rescrie fisierele care difera de snapshot (toate sau doar `paths`).
+
+        Fisierele aparute dupa snapshot nu sunt sterse; sunt intoarse in "extra".
+        """
+        manifest = self.load(ref)
+        current = self.current_files(workspace_index)
+        wanted = manifest["files"]
+        if paths:
+            wanted = {p: v for p, v in wanted.items() if p in paths or any(p.startswith(d.rstrip('/') + '/') for d in paths)}
+
+        restored, missing_blobs = [], []
+        for path, (digest, size, mode) in sorted(wanted.items()):
+            if path in current and current[path][0] == digest:
+                continue
+            blob = self._object_path(digest)
+            if not os.path.exists(blob):
+                missing_blobs.append(path)
+                continue
+            _atomic_clone(blob, os.path.join(self.root, path), mode or 0o644)
+            workspace_index.touch(path)
+            restored.append(path)
+        extra = [] if paths else sorted(set(current) - set(manifest["files"]))
+        return {"id": manifest["id"], "restored": restored, "unchanged": len(wanted) - len(restored) - len(missing_blobs),
+                "missing": missing_blobs, "extra": extra}
+
+    def delete(self, ref):
+        snapshot_id = self.resolve(ref)
+        os.remove(self._manifest_path(snapshot_id))
+        return snapshot_id
+
+    def prune(self, keep):
+        """Sterge manifestele mai vechi decat ultimele `keep` (0 = pastreaza tot)"""
+        ids = self.ids()
+        removed = ids[:-keep] if keep and len(ids) > keep else []
+        for snapshot_id in removed:
+            os.remove(self._manifest_path(snapshot_id))
+        return removed
+
+    def gc(self):
+        """Sterge blob-urile nereferite de niciun manifest; intoarce (blob-uri sterse, bytes eliberati)"""
+        referenced = set()
+        for snapshot_id in self.ids():
+            with open(self._manifest_path(snapshot_id), 'r', encoding='utf-8') as f:
+                referenced.update(v[0] for v in json.load(f)["files"].values())
+
+        removed = freed = 0
+        if not os.path.isdir(self.objects_dir):
+            return removed, freed
+        for prefix in os.listdir(self.objects_dir):
+            directory = os.path.join(self.objects_dir, prefix)
+            for name in os.listdir(directory):
+                if prefix + name in referenced:
+                    continue
+                path = os.path.join(directory, name)
+                freed += os.path.getsize(path)
+                os.remove(path)
+                removed += 1
+            if not os.listdir(directory):
+                os.rmdir(directory)
+        return removed, freed
@@ -0,0 +1,75 @@
+import time
+
+from rich.markdown import Markdown
+
+
+class StreamingMarkdown:
+    """Randare incrementala a unui raspuns Markdown in streaming.
+
+    Blocurile terminate (paragrafe urmate de o linie goala, blocuri de cod
+    inchise) sunt randate o singura data si afisate deasupra zonei Live;
+    in Live ramane doar blocul deschis de la final. Chunk-urile sunt
+    grupate, astfel incat blocul deschis este re-parsat cel mult o data
+    per interval de refresh.
+    """
+
+    def __init__(self, live, refresh_per_second=10, code_theme="monokai"):
+        self.live = live
+        self.interval = 1.0 / refresh_per_second
+        self.code_theme = code_theme
+        self.text = ""
+        self._scanned = 0
+        self._block_start = 0
+        self._in_fence = False
+        self._fence = ""
+        self._last_render = 0.0
+
+    def feed(self, chunk):
+        self.text += chunk
+        now = time.monotonic()
+        if now - self._last_render >= self.interval:
+            self._last_render = now
+            self._render()
+
+    def close(self):
+        """Afiseaza tot ce a ramas la sfarsitul stream-ului"""
+        self._render(final=True)
+
+    def _scan(self):
+        """Gaseste sfarsitul ultimului bloc complet; proceseaza doar liniile noi"""
+        frozen_until = None
+        while True:
+            line_end = self.text.find("\n", self._scanned)
+            if line_end == -1:
+                break
+            line = self.text[self._scanned:line_end]
+            stripped = line.strip()
+            self._scanned = line_end + 1
+
+            if self._in_fence:
+                # Se inchide doar cu acelasi caracter, de cel putin atatea ori (CommonMark)
+                if len(stripped) >= len(self._fence) and not stripped.strip(self._fence[0]):
+                    self._in_fence = False
+                    frozen_until = self._scanned
+            elif stripped.startswith("```") or stripped.startswith("~~~"):
+                self._in_fence = True
+                self._fence = stripped[:len(stripped) - len(stripped.lstrip(stripped[0]))]
+            elif not stripped:
+                frozen_until = self._scanned
+        return frozen_until
+
+    def _render(self, final=False):
+        frozen_until = self._scan()
+        if final:
+            frozen_until = len(self.text)
+
+        if frozen_until is not None and frozen_until > self._block_start:
+            block = self.text[self._block_start:frozen_until]
+            self._block_start = frozen_until
+            if block.strip():
+                self.live.console.print(Markdown(block.strip("\n"), code_theme=self.code_theme))
+                if not final:
+                    self.live.console.print()
+
+        tail = self.text[self._block_start:]
+        self.live.update(Markdown(tail, code_theme=self.code_theme) if tail.strip() else "", refresh=final)
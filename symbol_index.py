@@ -0,0 +1,1394 @@
+import os
+import re
+import ast
+import sqlite3
+import keyword
+from bisect import bisect_right
+from collections import namedtuple
+from concurrent.futures import ProcessPoolExecutor
+
+from workspace_index import STATE_DIR
+from search_index import FileFilter
+from chunker import JS_EXTENSIONS
+from grep_engine import INLINE_MAX_FILES, BATCH_SIZE
+
+PY_EXTENSIONS = ('.py', '.pyi')
+
+# Fisierele mai mari nu sunt analizate (de obicei generate/minificate)
+MAX_SYMBOL_FILE_SIZE = 1024 * 1024
+
+# Tipurile de aparitii care definesc un simbol (restul sunt referinte)
+DEFINITION_KINDS = ('def', 'assign')
+
+# Modulul simbolurilor nerezolvate: nume globale necunoscute (builtins, import *)
+# si atribute pe obiecte al caror tip nu se cunoaste ("?:*.attr")
+UNKNOWN = '?'
+
+# O aparitie a unui identificator: linie 1-based, coloana in caractere (0-based)
+Occurrence = namedtuple("Occurrence", "name symbol kind line col")
+
+_NEWLINE = re.compile(r'\r\n|\r|\n')
+
+
+def split_lines(text):
+    """Liniile textului, impartite ca de ast/tokenize (\\n, \\r\\n si \\r)"""
+    return _NEWLINE.split(text)
+
+
+def _join(symbol, name):
+    """'mod:' + 'x' -> 'mod:x'; 'mod:C' + 'x' -> 'mod:C.x'"""
+    return symbol + name if symbol.endswith(':') else f"{symbol}.{name}"
+
+
+def python_module(path):
+    """'pkg/sub/mod.py' -> 'pkg.sub.mod'; 'pkg/__init__.py' -> 'pkg'"""
+    parts = [p for p in os.path.splitext(path)[0].replace('\\', '/').split('/') if p not in ('', '.')]
+    if parts and parts[-1] == '__init__':
+        parts.pop()
+    return '.'.join(parts)
+
+
+def js_module(path):
+    """'src/utils.js' -> 'src/utils' (importurile relative sunt rezolvate la aceeasi forma)"""
+    return os.path.splitext(os.path.normpath(path))[0].replace('\\', '/')
+
+
+# --- Python ------------------------------------------------------------------
+
+_COMPREHENSIONS = (ast.ListComp, ast.SetComp, ast.DictComp, ast.GeneratorExp)
+
+
+def _target_names(node, names):
+    """Numele legate de o tinta de atribuire (a, (a, b), [*a], ...)"""
+    if isinstance(node, ast.Name):
+        names.add(node.id)
+    elif isinstance(node, (ast.Tuple, ast.List)):
+        for element in node.elts:
+            _target_names(element, names)
+    elif isinstance(node, ast.Starred):
+        _target_names(node.value, names)
+
+
+def _local_names(nodes, full=False):
+    """(nume legate, declaratii global/nonlocal) in scope-ul format de `nodes`, fara scope-urile imbricate.
+
+    Se parcurg doar instructiunile si tintele lor; expresiile sunt vizitate
+    complet doar cu `full` (fisiere cu := , care poate lega nume oriunde).
+    """
+    names, declared = set(), {}
+    stack = list(nodes)
+    while stack:
+        node = stack.pop()
+        if isinstance(node, (ast.FunctionDef, ast.AsyncFunctionDef, ast.ClassDef)):
+            names.add(node.name)
+            continue
+        if isinstance(node, (ast.Lambda,) + _COMPREHENSIONS):
+            continue
+        if isinstance(node, ast.Name) and not isinstance(node.ctx, ast.Load):
+            names.add(node.id)
+        elif isinstance(node, ast.Import):
+            names.update((a.asname or a.name.split('.')[0]) for a in node.names)
+        elif isinstance(node, ast.ImportFrom):
+            names.update((a.asname or a.name) for a in node.names if a.name != '*')
+        elif isinstance(node, ast.Global):
+            declared.update((n, 'global') for n in node.names)
+        elif isinstance(node, ast.Nonlocal):
+            declared.update((n, 'nonlocal') for n in node.names)
+        elif isinstance(node, ast.ExceptHandler) and node.name:
+            names.add(node.name)
+        elif type(node).__name__ in ('MatchAs', 'MatchStar', 'MatchMapping'):
+            name = getattr(node, 'name', None) or getattr(node, 'rest', None)
+            if name:
+                names.add(name)
+        if full or not isinstance(node, ast.stmt):
+            stack.extend(ast.iter_child_nodes(node))
+            continue
+        # Instructiune: tintele si corpurile imbricate (if/for/with/try/match), fara expresii
+        if isinstance(node, ast.Assign):
+            for target in node.targets:
+                _target_names(target, names)
+        elif isinstance(node, (ast.AugAssign, ast.AnnAssign, ast.For, ast.AsyncFor)):
+            _target_names(node.target, names)
+        elif isinstance(node, ast.Delete):
+            for target in node.targets:
+                _target_names(target, names)
+        elif isinstance(node, (ast.With, ast.AsyncWith)):
+            for item in node.items:
+                if item.optional_vars is not None:
+                    _target_names(item.optional_vars, names)
+        for field in ('body', 'orelse', 'finalbody', 'handlers', 'cases'):
+            stack.extend(getattr(node, field, None) or ())
+    return names - set(declared), declared
+
+
+def _arguments(args):
+    """Toti parametrii (ast.arg), in ordine"""
+    result = list(getattr(args, 'posonlyargs', [])) + list(args.args)
+    if args.vararg:
+        result.append(args.vararg)
+    result.extend(args.kwonlyargs)
+    if args.kwarg:
+        result.append(args.kwarg)
+    return result
+
+
+class _Scope:
+    __slots__ = ("kind", "prefix", "names", "declared", "owner", "self_name")
+
+    def __init__(self, kind, prefix, names, declared=None, owner=None, self_name=None):
+        self.kind = kind
+        self.prefix = prefix
+        self.names = names
+        self.declared = declared or {}
+        self.owner = owner
+        self.self_name = self_name
+
+
+def _is_word_char(char):
+    return char.isalnum() or char == '_'
+
+
+def find_word(text, word, start=0):
+    """Indexul primei aparitii a lui `word` de la `start` care nu este parte dintr-un identificator mai lung, sau -1.
+
+    Fara regex: numele cautate sunt mii si diferite, compilarea ar costa mai mult decat cautarea.
+    """
+    check_before, check_after = _is_word_char(word[0]), _is_word_char(word[-1])
+    index = text.find(word, start)
+    while index >= 0:
+        end = index + len(word)
+        if not (check_before and index and _is_word_char(text[index - 1])) and \
+                not (check_after and end < len(text) and _is_word_char(text[end])):
+            return index
+        index = text.find(word, index + 1)
+    return -1
+
+
+# tip nod ast -> metoda PythonAnalyzer care il viziteaza
+_VISITORS = {}
+
+
+class PythonAnalyzer:
+    """Definitiile si referintele dintr-un fisier Python, cu scope-urile rezolvate.
+
+    Simbolurile sunt calificate: 'pkg.mod:f', 'pkg.mod:C.method',
+    'pkg.mod:f.<locals>.x'. Atributele pe self/cls devin membri ai clasei,
+    cele pe un modul/clasa importata pastreaza calea (rezolvata ulterior prin
+    alias-uri), iar cele pe obiecte necunoscute raman '?:*.attr'.
+    """
+
+    def __init__(self, source, module, is_package=False):
+        self.source = source
+        self.lines = split_lines(source)
+        self.module = module
+        self.is_package = is_package
+        self.scopes = []
+        self.occurrences = []
+        self.aliases = []
+        self.bases = []
+        self.class_bases = {}
+        # := poate lega nume in orice expresie; altfel ajung doar instructiunile
+        self.full_walk = ':=' in source
+
+    def analyze(self):
+        tree = ast.parse(self.source)
+        names, declared = _local_names(tree.body, self.full_walk)
+        self.scopes.append(_Scope('module', self.module + ':', names, declared))
+        for node in tree.body:
+            self.visit(node)
+        return self.occurrences, self.aliases, self.bases
+
+    # pozitii
+
+    def _col(self, line, byte_col):
+        """ast da coloanele in bytes UTF-8"""
+        text = self.lines[line - 1] if line <= len(self.lines) else ''
+        if text.isascii():
+            return byte_col
+        return len(text.encode('utf-8')[:byte_col].decode('utf-8', 'ignore'))
+
+    def _find(self, name, line, col, after=None, max_lines=50):
+        """Prima aparitie a identificatorului `name` de la (line, col), optional dupa cuvantul `after`"""
+        for number in range(line, min(line + max_lines, len(self.lines) + 1)):
+            text = self.lines[number - 1]
+            start = col if number == line else 0
+            if after is not None:
+                index = find_word(text, after, start)
+                if index < 0:
+                    continue
+                start, after = index + len(after), None
+            index = find_word(text, name, start)
+            if index >= 0:
+                return number, index
+        return None
+
+    def emit(self, name, symbol, kind, position):
+        if position is None:
+            return
+        line, col = position
+        text = self.lines[line - 1] if line <= len(self.lines) else ''
+        if text[col:col + len(name)] != name:
+            # coloane relative in f-string-uri (Python < 3.8): primul cuvant potrivit de pe linie
+            position = self._find(name, line, min(col, len(text)), max_lines=1) or self._find(name, line, 0, max_lines=1)
+            if position is None:
+                return
+            line, col = position
+        self.occurrences.append(Occurrence(name, symbol, kind, line, col))
+
+    # scope-uri
+
+    @property
+    def scope(self):
+        return self.scopes[-1]
+
+    def _binding(self, name):
+        """Simbolul unei atribuiri la `name` in scope-ul curent"""
+        scope = self.scope
+        declared = scope.declared.get(name)
+        if declared == 'global':
+            return self.scopes[0].prefix + name
+        if declared == 'nonlocal':
+            return self._resolve(name, skip_current=True)
+        return scope.prefix + name
+
+    def _binding_scope(self, name, skip_current=False):
+        current = self.scope
+        if current.declared.get(name) == 'global':
+            return self.scopes[0]
+        for scope in reversed(self.scopes):
+            if scope is current and skip_current:
+                continue
+            if scope.kind == 'class' and scope is not current:
+                continue
+            if name in scope.names:
+                return scope
+        return None
+
+    def _resolve(self, name, skip_current=False):
+        """Simbolul la care se refera o citire a lui `name`"""
+        scope = self._binding_scope(name, skip_current)
+        return scope.prefix + name if scope is not None else f"{UNKNOWN}:{name}"
+
+    def _owner(self, node):
+        """Simbolul obiectului din stanga unui atribut, daca se poate determina"""
+        if isinstance(node, ast.Name):
+            scope = self._binding_scope(node.id)
+            if scope is None:
+                return None
+            if scope.self_name == node.id and scope.owner:
+                return scope.owner
+            return scope.prefix + node.id
+        if isinstance(node, ast.Attribute):
+            owner = self._owner(node.value)
+            return _join(owner, node.attr) if owner else None
+        if isinstance(node, ast.Call) and isinstance(node.func, ast.Name) and node.func.id == 'super':
+            # super().x -> membrul primei clase de baza
+            owner = next((s.owner for s in reversed(self.scopes) if s.kind == 'function' and s.owner), None)
+            bases = self.class_bases.get(owner)
+            return bases[0] if bases else None
+        if isinstance(node, ast.Call):
+            # Clasa().x; pentru o functie obisnuita simbolul nu va avea definitie (raportat ca nerezolvat)
+            return self._owner(node.func)
+        return None
+
+    def _store_kind(self, symbol):
+        scope = self.scope
+        return 'local' if scope.kind == 'function' and symbol.startswith(scope.prefix) else 'assign'
+
+    def _absolute(self, module, level):
+        if not level:
+            return module or ''
+        parts = self.module.split('.') if self.module else []
+        if not self.is_package:
+            parts = parts[:-1]
+        if level > 1:
+            parts = parts[:max(0, len(parts) - (level - 1))]
+        return '.'.join(parts + ([module] if module else []))
+
+    # vizitare
+
+    def visit(self, node):
+        kind = type(node)
+        method = _VISITORS.get(kind)
+        if method is None:
+            method = _VISITORS[kind] = getattr(PythonAnalyzer, 'visit_' + kind.__name__, PythonAnalyzer.generic_visit)
+        method(self, node)
+
+    def generic_visit(self, node):
+        for child in ast.iter_child_nodes(node):
+            self.visit(child)
+
+    def _visit_all(self, nodes):
+        for node in nodes:
+            if node is not None:
+                self.visit(node)
+
+    def _visit_signature(self, args):
+        """Valorile implicite si adnotarile se evalueaza in scope-ul exterior"""
+        self._visit_all(args.defaults)
+        self._visit_all(args.kw_defaults)
+        self._visit_all(arg.annotation for arg in _arguments(args))
+
+    def visit_FunctionDef(self, node):
+        self._visit_all(node.decorator_list)
+        self._visit_signature(node.args)
+        if node.returns is not None:
+            self.visit(node.returns)
+        parent = self.scope
+        symbol = self._binding(node.name)
+        self.emit(node.name, symbol, 'def', self._find(node.name, node.lineno, 0, after='def'))
+
+        params = _arguments(node.args)
+        static = any(isinstance(d, ast.Name) and d.id == 'staticmethod' for d in node.decorator_list)
+        self_name = params[0].arg if parent.kind == 'class' and params and not static else None
+        names, declared = _local_names(node.body, self.full_walk)
+        self.scopes.append(_Scope('function', symbol + '.<locals>.', names | {a.arg for a in params}, declared,
+                                  owner=parent.owner if self_name else None, self_name=self_name))
+        for arg in params:
+            self.emit(arg.arg, self.scope.prefix + arg.arg, 'param',
+                      (arg.lineno, self._col(arg.lineno, arg.col_offset)))
+        self._visit_all(node.body)
+        self.scopes.pop()
+
+    visit_AsyncFunctionDef = visit_FunctionDef
+
+    def visit_Lambda(self, node):
+        self._visit_signature(node.args)
+        params = _arguments(node.args)
+        self.scopes.append(_Scope('function', f"{self.scope.prefix}<lambda@{node.lineno}:{node.col_offset}>.",
+                                  {a.arg for a in params}))
+        self.visit(node.body)
+        self.scopes.pop()
+
+    def visit_ClassDef(self, node):
+        self._visit_all(node.decorator_list)
+        self._visit_all(node.bases)
+        self._visit_all(k.value for k in node.keywords)
+        symbol = self._binding(node.name)
+        self.emit(node.name, symbol, 'def', self._find(node.name, node.lineno, 0, after='class'))
+        for base in node.bases:
+            owner = self._owner(base)
+            if owner:
+                self.bases.append((symbol, owner))
+                self.class_bases.setdefault(symbol, []).append(owner)
+        names, declared = _local_names(node.body, self.full_walk)
+        self.scopes.append(_Scope('class', symbol + '.', names, declared, owner=symbol))
+        self._visit_all(node.body)
+        self.scopes.pop()
+
+    def _comprehension(self, node, elements):
+        generators = node.generators
+        self.visit(generators[0].iter)
+        names = set()
+        for generator in generators:
+            names.update(n.id for n in ast.walk(generator.target) if isinstance(n, ast.Name))
+        self.scopes.append(_Scope('function', f"{self.scope.prefix}<comp@{node.lineno}:{node.col_offset}>.", names))
+        for i, generator in enumerate(generators):
+            self.visit(generator.target)
+            if i:
+                self.visit(generator.iter)
+            self._visit_all(generator.ifs)
+        self._visit_all(elements)
+        self.scopes.pop()
+
+    def visit_ListComp(self, node):
+        self._comprehension(node, [node.elt])
+
+    visit_SetComp = visit_GeneratorExp = visit_ListComp
+
+    def visit_DictComp(self, node):
+        self._comprehension(node, [node.key, node.value])
+
+    def visit_Name(self, node):
+        position = (node.lineno, self._col(node.lineno, node.col_offset))
+        if isinstance(node.ctx, ast.Load):
+            self.emit(node.id, self._resolve(node.id), 'ref', position)
+        else:
+            symbol = self._binding(node.id)
+            self.emit(node.id, symbol, self._store_kind(symbol), position)
+
+    def visit_Attribute(self, node):
+        self.visit(node.value)
+        owner = self._owner(node.value)
+        on_self = isinstance(node.value, ast.Name) and owner is not None and \
+            getattr(self._binding_scope(node.value.id), 'self_name', None) == node.value.id
+        end_line, end_col = getattr(node, 'end_lineno', None), getattr(node, 'end_col_offset', None)
+        if end_line is not None:
+            position = (end_line, self._col(end_line, end_col) - len(node.attr))
+        else:  # Python 3.7: fara end_col_offset
+            position = self._find(node.attr, node.lineno, self._col(node.lineno, node.col_offset), after='.')
+        if owner:
+            # self.x = ... defineste atributul clasei
+            kind = 'assign' if on_self and not isinstance(node.ctx, ast.Load) else 'attr'
+            self.emit(node.attr, _join(owner, node.attr), kind, position)
+        else:
+            self.emit(node.attr, f"{UNKNOWN}:*.{node.attr}", 'attr', position)
+
+    def visit_Import(self, node):
+        for alias in node.names:
+            if alias.asname:
+                self.aliases.append((self._binding(alias.asname), alias.name + ':'))
+            else:
+                top = alias.name.split('.')[0]
+                self.aliases.append((self._binding(top), top + ':'))
+
+    def visit_ImportFrom(self, node):
+        module = self._absolute(node.module, node.level)
+        cursor = self._find('import', node.lineno, self._col(node.lineno, node.col_offset))
+        if cursor is not None:
+            cursor = (cursor[0], cursor[1] + len('import'))
+        for alias in node.names:
+            if alias.name == '*' or cursor is None:
+                continue
+            target = f"{module}:{alias.name}"
+            position = self._find(alias.name, cursor[0], cursor[1])
+            self.emit(alias.name, target, 'import', position)
+            binding = self._binding(alias.asname or alias.name)
+            if binding != target:
+                self.aliases.append((binding, target))
+            if position is not None:
+                cursor = (position[0], position[1] + len(alias.name))
+            if alias.asname and position is not None:
+                as_position = self._find(alias.asname, cursor[0], cursor[1], after='as')
+                self.emit(alias.asname, binding, 'import', as_position)
+                if as_position is not None:
+                    cursor = (as_position[0], as_position[1] + len(alias.asname))
+
+    def _declaration(self, node, word, resolve):
+        line, col = node.lineno, self._col(node.lineno, node.col_offset)
+        position = (line, col)
+        for i, name in enumerate(node.names):
+            position = self._find(name, position[0], position[1], after=word if i == 0 else None)
+            if position is None:
+                return
+            self.emit(name, resolve(name), 'ref', position)
+            position = (position[0], position[1] + len(name))
+
+    def visit_Global(self, node):
+        self._declaration(node, 'global', lambda name: self.scopes[0].prefix + name)
+
+    def visit_Nonlocal(self, node):
+        self._declaration(node, 'nonlocal', lambda name: self._resolve(name, skip_current=True))
+
+    def visit_ExceptHandler(self, node):
+        if node.type is not None:
+            self.visit(node.type)
+        if node.name:
+            symbol = self._binding(node.name)
+            self.emit(node.name, symbol, self._store_kind(symbol),
+                      self._find(node.name, node.lineno, self._col(node.lineno, node.col_offset), after='as'))
+        self._visit_all(node.body)
+
+
+def analyze_python(source, path):
+    module = python_module(path)
+    analyzer = PythonAnalyzer(source, module, os.path.basename(path).startswith('__init__.'))
+    occurrences, aliases, bases = analyzer.analyze()
+    return module, occurrences, aliases, bases
+
+
+# --- JavaScript / TypeScript -------------------------------------------------
+
+_JS_TOKEN = re.compile(r"""
+    (?P<space>\s+)
+  | (?P<comment>//[^\n]*|/\*[\s\S]*?(?:\*/|$))
+  | (?P<string>"(?:[^"\\\n]|\\[\s\S])*"?|'(?:[^'\\\n]|\\[\s\S])*'?)
+  | (?P<name>[A-Za-z_$À-￿][\w$À-￿]*)
+  | (?P<number>\.?\d[\w.]*)
+  | (?P<punct>=>|\.\.\.|\?\.|[{}()\[\];,.:=<>!?+\-*/%&|^~@\#`\\])
+""", re.X)
+
+JS_KEYWORDS = frozenset("""
+break case catch class const continue debugger default delete do else export extends finally for function
+if import in instanceof new return super switch this throw try typeof var void while with yield let static
+enum await implements package protected interface private public null true false undefined async of get set
+as from type declare abstract readonly namespace module keyof infer is asserts override satisfies
+""".split())
+
+# Dupa aceste token-uri un '/' incepe un regex, nu o impartire
+_REGEX_AFTER = frozenset("( , = : [ ! & | ? { } ; + - * % < > ~ ^ => return typeof instanceof in of new "
+                         "delete void throw case do else yield await".split())
+
+_MEMBER_MODIFIERS = frozenset("static async get set public private protected readonly abstract override "
+                              "declare accessor".split())
+
+Token = namedtuple("Token", "kind value start line col")
+
+
+def js_tokens(text):
+    """Token-urile unui fisier JS/TS, fara spatii, comentarii si continutul string-urilor.
+
+    Template literal-urile sunt sarite, dar expresiile ${...} din ele sunt
+    tokenizate; '/' dupa un operator sau cuvant cheie incepe un regex literal.
+    """
+    line_starts = [0] + [m.end() for m in _NEWLINE.finditer(text)]
+    tokens, braces = [], []
+    pos, length = 0, len(text)
+
+    def add(kind, value, start):
+        line = bisect_right(line_starts, start)
+        tokens.append(Token(kind, value, start, line, start - line_starts[line - 1]))
+
+    def skip_template(i):
+        """De la i (in interiorul unui template) pana dupa '`' sau dupa '${'"""
+        while i < length:
+            ch = text[i]
+            if ch == '\\':
+                i += 2
+                continue
+            if ch == '`':
+                return i + 1
+            if ch == '$' and text.startswith('{', i + 1):
+                braces.append('template')
+                return i + 2
+            i += 1
+        return length
+
+    while pos < length:
+        match = _JS_TOKEN.match(text, pos)
+        if match is None:
+            pos += 1
+            continue
+        kind, value, start = match.lastgroup, match.group(), pos
+        pos = match.end()
+        if kind in ('space', 'comment'):
+            continue
+        if kind == 'punct':
+            if value == '`':
+                add('string', '`', start)
+                pos = skip_template(pos)
+                continue
+            if value == '{':
+                braces.append('{')
+            elif value == '}':
+                if braces and braces.pop() == 'template':
+                    pos = skip_template(pos)
+                    continue
+            elif value == '/':
+                previous = tokens[-1] if tokens else None
+                if previous is None or (previous.kind == 'punct' and previous.value in _REGEX_AFTER) or \
+                        (previous.kind == 'name' and previous.value in _REGEX_AFTER):
+                    i, in_class = pos, False
+                    while i < length and text[i] != '\n':
+                        ch = text[i]
+                        if ch == '\\':
+                            i += 2
+                            continue
+                        if ch == '[':
+                            in_class = True
+                        elif ch == ']':
+                            in_class = False
+                        elif ch == '/' and not in_class:
+                            i += 1
+                            break
+                        i += 1
+                    while i < length and text[i].isalpha():
+                        i += 1
+                    add('regex', text[start:i], start)
+                    pos = i
+                    continue
+        add(kind, value, start)
+    return tokens
+
+
+def _matching(tokens):
+    """Indexul parantezei/acoladei pereche pentru fiecare ( [ {"""
+    pairs, stack = {}, []
+    closing = {')': '(', ']': '[', '}': '{'}
+    for i, token in enumerate(tokens):
+        if token.kind != 'punct':
+            continue
+        if token.value in '([{':
+            stack.append(i)
+        elif token.value in closing:
+            while stack and tokens[stack[-1]].value != closing[token.value]:
+                stack.pop()
+            if stack:
+                pairs[stack.pop()] = i
+    return pairs
+
+
+class _JsScope:
+    __slots__ = ("id", "parent", "kind", "prefix", "names", "owner")
+
+    def __init__(self, scope_id, parent, kind, prefix, owner=None):
+        self.id = scope_id
+        self.parent = parent
+        self.kind = kind
+        self.prefix = prefix
+        self.names = {}
+        self.owner = owner
+
+
+class JsAnalyzer:
+    """Definitiile si referintele dintr-un fisier JS/TS, prin tokenizare.
+
+    Scope-urile sunt blocurile { }: declaratiile (function, class, const/let,
+    var la nivelul functiei, parametri, importuri) sunt gasite intr-o prima
+    trecere, apoi fiecare identificator este rezolvat la cel mai apropiat
+    scope care il declara. Membrii claselor devin 'mod:Clasa.membru', iar
+    'this.x' dintr-o metoda se refera la ei.
+    """
+
+    def __init__(self, source, path):
+        self.path = path
+        self.module = js_module(path)
+        self.tokens = js_tokens(source)
+        self.pairs = _matching(self.tokens)
+        self.openers = {close: open_ for open_, close in self.pairs.items()}
+        self.scopes = []
+        self.token_scope = []
+        self.declared = {}     # index token -> (simbol, tip)
+        self.handled = set()   # token-uri deja emise (importuri, exporturi)
+        self.namespaces = {}   # simbolul legarii -> modul (import * as ns, require)
+        self.occurrences = []
+        self.aliases = []
+        self.bases = []
+
+    # utilitare
+
+    def _value(self, i):
+        return self.tokens[i].value if 0 <= i < len(self.tokens) else None
+
+    def _is(self, i, *values):
+        return 0 <= i < len(self.tokens) and self.tokens[i].kind in ('punct', 'name') and self.tokens[i].value in values
+
+    def _is_name(self, i):
+        token = self.tokens[i] if 0 <= i < len(self.tokens) else None
+        return token is not None and token.kind == 'name' and token.value not in JS_KEYWORDS
+
+    def _new_scope(self, parent, kind, prefix, owner=None):
+        scope = _JsScope(len(self.scopes), parent, kind, prefix, owner)
+        self.scopes.append(scope)
+        return scope
+
+    def _declare(self, scope, i, kind='assign'):
+        name = self.tokens[i].value
+        if kind == 'var':
+            while scope.kind not in ('function', 'module'):
+                scope = self.scopes[scope.parent]
+            kind = 'assign'
+        symbol = scope.prefix + name
+        scope.names.setdefault(name, symbol)
+        self.declared[i] = (scope.names[name], kind)
+        return scope.names[name]
+
+    def _resolve_spec(self, spec):
+        spec = spec[1:-1] if spec[:1] in '"\'' else spec
+        if spec.startswith('.'):
+            joined = os.path.normpath(os.path.join(os.path.dirname(self.path), spec)).replace('\\', '/')
+            base, ext = os.path.splitext(joined)
+            return base if ext in JS_EXTENSIONS else joined
+        return spec
+
+    def _pattern_names(self, start, end):
+        """Numele legate de un pattern (parametri, destructurare) intre token-urile [start, end)"""
+        names, stack = [], []
+        skipping = None
+        for i in range(start, end):
+            token = self.tokens[i]
+            if token.kind == 'punct' and token.value in '([{':
+                stack.append(token.value)
+                continue
+            if token.kind == 'punct' and token.value in ')]}':
+                if stack:
+                    stack.pop()
+                if skipping is not None and len(stack) < skipping:
+                    skipping = None
+                continue
+            if skipping is not None:
+                if token.value == ',' and len(stack) == skipping:
+                    skipping = None
+                continue
+            if token.value == '=' or (token.value == ':' and (not stack or stack[-1] == '(')):
+                # valoare implicita sau adnotare de tip: pana la urmatoarea virgula de pe acelasi nivel
+                skipping = len(stack)
+                continue
+            if self._is_name(i) and self._value(i) not in _MEMBER_MODIFIERS:
+                if stack and stack[-1] == '{' and self._is(i + 1, ':'):
+                    continue  # { cheie: legare }
+                names.append(i)
+        return names
+
+    def _expression_end(self, i):
+        """Sfarsitul unei expresii (corpul unei arrow functions fara acolade)"""
+        depth = 0
+        while i < len(self.tokens):
+            value = self.tokens[i].value if self.tokens[i].kind == 'punct' else None
+            if value in ('(', '[', '{'):
+                depth += 1
+            elif value in (')', ']', '}'):
+                if depth == 0:
+                    return i
+                depth -= 1
+            elif value in (',', ';') and depth == 0:
+                return i
+            i += 1
+        return i
+
+    # prima trecere: scope-uri si declaratii
+
+    def _scan(self):
+        module = self._new_scope(None, 'module', self.module + ':')
+        stack = [module]
+        pending = []             # (index, scope): scope-ul primei '{' de dupa index (functie, clasa, catch)
+        ends = []                # (index final, scope) pentru corpurile arrow fara acolade
+        declaring = None         # (cuvant, adancime) in timpul unui const/let/var
+        depth = 0
+        tokens = self.tokens
+        self.token_scope = [0] * len(tokens)
+
+        i = 0
+        while i < len(tokens):
+            while ends and ends[-1][0] <= i:
+                ends.pop()
+                stack.pop()
+            token = tokens[i]
+            scope = stack[-1]
+            self.token_scope[i] = scope.id
+            value = token.value if token.kind in ('punct', 'name') else None
+
+            if value in ('(', '['):
+                depth += 1
+            elif value in (')', ']'):
+                depth -= 1
+                if declaring and depth < declaring[1]:
+                    declaring = None
+            elif value == '{':
+                depth += 1
+                if pending and pending[-1][0] < i:
+                    scope = pending.pop()[1]
+                else:
+                    scope = self._new_scope(scope.id, 'block', f"{scope.prefix}<{len(self.scopes)}>.",
+                                            scope.owner if scope.kind == 'class' else None)
+                stack.append(scope)
+            elif value == '}':
+                depth -= 1
+                if len(stack) > 1:
+                    stack.pop()
+                if declaring and depth < declaring[1]:
+                    declaring = None
+            elif value == ';':
+                # declaratii fara corp (overload-uri TS, metode abstracte)
+                while pending and pending[-1][0] < i:
+                    pending.pop()
+                if declaring and depth == declaring[1]:
+                    declaring = None
+
+            if declaring and value == ',' and depth == declaring[1]:
+                i = self._declarator(i + 1, declaring[0], scope)
+                continue
+            if token.kind != 'name':
+                if value == '=>':
+                    body = self._arrow(i, scope, stack, ends)
+                    if body is not None:
+                        pending.append((i, body))
+                i += 1
+                continue
+
+            if value == 'import' and not self._is(i + 1, '(', '.'):
+                i = self._import(i, scope)
+                continue
+            if value == 'export' and self._is(i + 1, '{', '*'):
+                i = self._export(i)
+                continue
+            if value in ('const', 'let', 'var') and (self._is_name(i + 1) or self._is(i + 1, '{', '[')):
+                declaring = (value, depth)
+                i = self._declarator(i + 1, value, scope)
+                continue
+            if value == 'function':
+                j = i + 1
+                if self._is(j, '*'):
+                    j += 1
+                name = self._declare(scope, j, 'def') if self._is_name(j) else None
+                if name is not None:
+                    j += 1
+                pending.append(self._function_scope(scope, name or f"{scope.prefix}<function@{token.line}>", j))
+                i = j
+                continue
+            if value == 'class':
+                j = i + 1
+                if self._is_name(j):
+                    symbol = self._declare(scope, j, 'def')
+                    j += 1
+                else:
+                    symbol = f"{scope.prefix}<class@{token.line}>"
+                pending.append((j - 1, self._new_scope(scope.id, 'class', symbol + '.', owner=symbol)))
+                if self._is(j, 'extends'):
+                    base = j + 1
+                    # ultimul nume din lantul a.b.C
+                    while self._is(base + 1, '.') and self._is_name(base + 2):
+                        base += 2
+                    if self._is_name(base):
+                        self.bases.append((symbol, base))
+                i = j
+                continue
+            if value in ('interface', 'enum') and self._is_name(i + 1):
+                symbol = self._declare(scope, i + 1, 'def')
+                pending.append((i + 1, self._new_scope(scope.id, 'type', symbol + '.', owner=symbol)))
+                i += 2
+                continue
+            if value == 'type' and self._is_name(i + 1) and (self._is(i + 2, '=') or self._is(i + 2, '<')):
+                self._declare(scope, i + 1, 'def')
+                i += 2
+                continue
+            if value == 'catch' and self._is(i + 1, '('):
+                close = self.pairs.get(i + 1, i + 1)
+                body = self._new_scope(scope.id, 'block', f"{scope.prefix}<{len(self.scopes)}>.")
+                for j in self._pattern_names(i + 2, close):
+                    self._declare(body, j, 'local')
+                pending.append((close, body))
+                i += 1
+                continue
+
+            # Membri de clasa / metode de obiect: nume ( ... ) {  sau  nume = / nume;
+            if self._is_name(i) and scope.kind in ('class', 'type') and self._member_start(i):
+                symbol = _join(scope.owner, value)
+                self.declared[i] = (symbol, 'def')
+                if self._is(i + 1, '('):
+                    pending.append(self._function_scope(scope, symbol, i + 1))
+                i += 1
+                continue
+            if self._is_name(i) and self._is(i + 1, '(') and self._method_body(i + 1):
+                # metoda scurta intr-un obiect literal: { nume() { ... } }
+                self.declared[i] = (f"{UNKNOWN}:*.{value}", 'attr')
+                pending.append(self._function_scope(scope, f"{scope.prefix}<method@{token.line}>", i + 1))
+            i += 1
+
+    def _member_start(self, i):
+        """Numele unui membru in corpul unei clase/interfete (nu o expresie dintr-un initializator)"""
+        j = i - 1
+        while j >= 0 and (self._value(j) in _MEMBER_MODIFIERS or self._value(j) == '*'):
+            j -= 1
+        if j >= 0 and not self._is(j, '{', '}', ';'):
+            previous = self.tokens[j]
+            # membri separati doar prin linie noua (fara ';'), inclusiv dupa un decorator @x()
+            if previous.line == self.tokens[i].line or (previous.kind == 'punct' and previous.value not in (')', ']')):
+                return False
+        return self._is(i + 1, '(', '=', ';', ':', '?', '!', '<') or self.tokens[i + 1:i + 2] == [] or \
+            self.tokens[i + 1].line > self.tokens[i].line
+
+    def _method_body(self, open_paren):
+        close = self.pairs.get(open_paren)
+        if close is None:
+            return False
+        j = close + 1
+        if self._is(j, ':'):  # tipul returnat (TS)
+            while j < len(self.tokens) and not self._is(j, '{', ';', ','):
+                j = self.pairs.get(j, j) + 1 if self._is(j, '(', '[', '<') else j + 1
+        return self._is(j, '{')
+
+    def _function_scope(self, scope, symbol, open_paren):
+        """(index, scope) pentru corpul unei functii, cu parametrii deja declarati"""
+        body = self._new_scope(scope.id, 'function', symbol + '.<locals>.')
+        close = self.pairs.get(open_paren, open_paren)
+        if self._is(open_paren, '('):
+            for j in self._pattern_names(open_paren + 1, close):
+                self._declare(body, j, 'param')
+        return close, body
+
+    def _arrow(self, i, scope, stack, ends):
+        body = self._new_scope(scope.id, 'function', f"{scope.prefix}<arrow@{self.tokens[i].line}>.<locals>.")
+        if self._is(i - 1, ')'):
+            opening = self.openers.get(i - 1)
+            if opening is not None:
+                for j in self._pattern_names(opening + 1, i - 1):
+                    self._declare(body, j, 'param')
+        elif self._is_name(i - 1):
+            self._declare(body, i - 1, 'param')
+        if self._is(i + 1, '{'):
+            return body
+        # corp fara acolade: scope-ul tine pana la sfarsitul expresiei
+        stack.append(body)
+        ends.append((self._expression_end(i + 1), body))
+        return None
+
+    def _declarator(self, i, word, scope):
+        """Un declarator dupa const/let/var (sau dupa virgula); intoarce indexul de continuare"""
+        kind = 'var' if word == 'var' else ('assign' if scope.kind == 'module' else 'local')
+        if self._is_name(i):
+            end = i + 1
+        elif self._is(i, '{', '['):
+            end = self.pairs.get(i, i) + 1
+        else:
+            return i
+        for k in range(i, end):
+            self.token_scope[k] = scope.id
+        names = [i] if end == i + 1 else self._pattern_names(i, end)
+        symbols = [self._declare(scope, j, kind) for j in names]
+        # const x = require('./m')  /  const { a, b: c } = require('./m')
+        j = end
+        if self._is(j, ':'):
+            while j < len(self.tokens) and not self._is(j, '=', ',', ';'):
+                j += 1
+        if self._is(j, '=') and self._value(j + 1) == 'require' and self._is(j + 2, '(') \
+                and j + 3 < len(self.tokens) and self.tokens[j + 3].kind == 'string':
+            module = self._resolve_spec(self.tokens[j + 3].value)
+            if end == i + 1:
+                self.aliases.append((symbols[0], module + ':'))
+                self.namespaces[symbols[0]] = module
+            else:
+                for k in range(i, end):
+                    if self._is_name(k) and self._is(k + 1, ':') and self._is(k - 1, '{', ','):
+                        self.occurrences.append(Occurrence(self.tokens[k].value, f"{module}:{self.tokens[k].value}",
+                                                           'import', self.tokens[k].line, self.tokens[k].col))
+                        self.handled.add(k)
+                        binding = self.declared.get(k + 2)
+                        if binding:
+                            self.aliases.append((binding[0], f"{module}:{self.tokens[k].value}"))
+                for k, symbol in zip(names, symbols):
+                    if not self._is(k - 1, ':'):
+                        self.aliases.append((symbol, f"{module}:{self.tokens[k].value}"))
+        return end
+
+    def _import(self, i, scope):
+        """import X, { a as b } from 'm'  /  import * as ns from 'm'  /  import 'm'"""
+        j = i + 1
+        end = j
+        while end < len(self.tokens) and self.tokens[end].kind != 'string' and not self._is(end, ';'):
+            end += 1
+        if end >= len(self.tokens) or self.tokens[end].kind != 'string':
+            return i + 1
+        module = self._resolve_spec(self.tokens[end].value)
+        in_braces = False
+        while j < end:
+            value = self._value(j)
+            if value == '{':
+                in_braces = True
+            elif value == '}':
+                in_braces = False
+            elif value == '*' and self._is(j + 1, 'as') and self._is_name(j + 2):
+                symbol = self._declare(scope, j + 2, 'import')
+                self.aliases.append((symbol, module + ':'))
+                self.namespaces[symbol] = module
+                j += 3
+                continue
+            elif self._is_name(j) and in_braces:
+                token = self.tokens[j]
+                target = f"{module}:{token.value}"
+                self.occurrences.append(Occurrence(token.value, target, 'import', token.line, token.col))
+                self.handled.add(j)
+                local = j + 2 if self._is(j + 1, 'as') and self._is_name(j + 2) else j
+                symbol = scope.prefix + self.tokens[local].value
+                scope.names.setdefault(self.tokens[local].value, symbol)
+                if local != j:
+                    self.declared[local] = (symbol, 'import')
+                    self.handled.discard(local)
+                self.aliases.append((symbol, target))
+                j = local + 1
+                continue
+            elif self._is_name(j) and not in_braces:
+                symbol = self._declare(scope, j, 'import')
+                self.aliases.append((symbol, f"{module}:default"))
+            j += 1
+        return end + 1
+
+    def _export(self, i):
+        """export { a, b as c } [from 'm']  /  export * from 'm'"""
+        if self._is(i + 1, '*'):
+            return i + 2
+        close = self.pairs.get(i + 1)
+        if close is None:
+            return i + 1
+        source = None
+        if self._is(close + 1, 'from') and close + 2 < len(self.tokens) and self.tokens[close + 2].kind == 'string':
+            source = self._resolve_spec(self.tokens[close + 2].value)
+        j = i + 2
+        while j < close:
+            if not self._is_name(j) and self._value(j) != 'default':
+                j += 1
+                continue
+            token = self.tokens[j]
+            exported = j + 2 if self._is(j + 1, 'as') else j
+            if source is not None:
+                target = f"{source}:{token.value}"
+                self.occurrences.append(Occurrence(token.value, target, 'import', token.line, token.col))
+                self.handled.add(j)
+            else:
+                target = f"{self.module}:{token.value}"  # referinta locala, rezolvata in a doua trecere
+            if exported != j:
+                name = self.tokens[exported]
+                symbol = f"{self.module}:{name.value}"
+                self.declared[exported] = (symbol, 'def')
+                self.aliases.append((symbol, target))
+            elif source is not None:
+                self.aliases.append((f"{self.module}:{token.value}", target))
+            j = exported + 1
+        return close + 1
+
+    # a doua trecere: rezolvarea referintelor
+
+    def _resolve(self, name, scope_id):
+        scope = self.scopes[scope_id]
+        while scope is not None:
+            if scope.kind not in ('class', 'type') and name in scope.names:
+                return scope.names[name]
+            scope = self.scopes[scope.parent] if scope.parent is not None else None
+        return None
+
+    def _class_owner(self, scope_id):
+        scope = self.scopes[scope_id]
+        while scope is not None:
+            if scope.kind == 'class':
+                return scope.owner
+            scope = self.scopes[scope.parent] if scope.parent is not None else None
+        return None
+
+    def _owner(self, j):
+        """Simbolul expresiei care se termina la token-ul j (stanga unui '.')"""
+        if self._value(j) == 'this':
+            return self._class_owner(self.token_scope[j])
+        if self._is(j, ')') and self._is(self.openers.get(j, 0) - 2, 'new'):
+            # new Clasa(...).x
+            return self._owner(self.openers[j] - 1)
+        if not self._is_name(j):
+            return None
+        if self._is(j - 1, '.', '?.'):
+            owner = self._owner(j - 2)
+            return _join(owner, self.tokens[j].value) if owner else None
+        if j in self.declared:
+            return self.declared[j][0]
+        return self._resolve(self.tokens[j].value, self.token_scope[j])
+
+    def analyze(self):
+        self._scan()
+        for i, token in enumerate(self.tokens):
+            if token.kind != 'name' or i in self.handled:
+                continue
+            if i in self.declared:
+                symbol, kind = self.declared[i]
+                self.occurrences.append(Occurrence(token.value, symbol, kind, token.line, token.col))
+                continue
+            if token.value in JS_KEYWORDS:
+                continue
+            if self._is(i - 1, '.', '?.'):
+                owner = self._owner(i - 2)
+                symbol = _join(owner, token.value) if owner else f"{UNKNOWN}:*.{token.value}"
+                self.occurrences.append(Occurrence(token.value, symbol, 'attr', token.line, token.col))
+            elif self._is(i + 1, ':') and self._is(i - 1, '{', ','):
+                # cheie intr-un obiect literal
+                self.occurrences.append(Occurrence(token.value, f"{UNKNOWN}:*.{token.value}", 'attr',
+                                                   token.line, token.col))
+            else:
+                symbol = self._resolve(token.value, self.token_scope[i]) or f"{UNKNOWN}:{token.value}"
+                self.occurrences.append(Occurrence(token.value, symbol, 'ref', token.line, token.col))
+        bases = []
+        for symbol, j in self.bases:
+            owner = self._owner(j)
+            if owner:
+                bases.append((symbol, owner))
+        return self.occurrences, self.aliases, bases
+
+
+def analyze_js(source, path):
+    analyzer = JsAnalyzer(source, path)
+    occurrences, aliases, bases = analyzer.analyze()
+    return analyzer.module, occurrences, aliases, bases
+
+
+def analyze_file(path, root="."):
+    """(modul, aparitii, alias-uri, baze, eroare) pentru un fisier Python sau JS/TS"""
+    ext = os.path.splitext(path)[1].lower()
+    try:
+        with open(os.path.join(root, path), 'r', encoding='utf-8') as f:
+            source = f.read()
+        if ext in PY_EXTENSIONS:
+            return analyze_python(source, path) + (None,)
+        return analyze_js(source, path) + (None,)
+    except (SyntaxError, ValueError, UnicodeDecodeError, RecursionError, OSError) as e:
+        module = python_module(path) if ext in PY_EXTENSIONS else js_module(path)
+        return module, [], [], [], f"{type(e).__name__}: {e}"
+
+
+def _analyze_batch(paths, root):
+    """Job executat in worker"""
+    return [(path,) + analyze_file(path, root) for path in paths]
+
+
+def is_identifier(name):
+    return name.isidentifier() and not keyword.iskeyword(name) and name not in JS_KEYWORDS
+
+
+class SymbolIndex:
+    """Index persistent de simboluri (definitii si referinte) pentru Python si JS/TS.
+
+    Salvat in .codemate/symbols.db si sincronizat incremental cu
+    WorkspaceIndex: un fisier este re-analizat doar cand hash-ul lui se
+    schimba (in paralel, pe procese, cand sunt multe). Aparitiile sunt
+    indexate dupa nume, deci o redenumire citeste doar randurile numelui
+    respectiv si atinge doar fisierele care il contin.
+    """
+
+    def __init__(self, root=".", db_file=None, workers=None):
+        self.root = root
+        self.db_file = db_file or os.path.join(root, STATE_DIR, "symbols.db")
+        self.workers = workers or os.cpu_count() or 1
+        self._db = None
+
+    def _connect(self):
+        if self._db is None:
+            os.makedirs(os.path.dirname(self.db_file), exist_ok=True)
+            self._db = sqlite3.connect(self.db_file)
+            self._db.executescript("""
+                PRAGMA journal_mode=WAL;
+                PRAGMA synchronous=NORMAL;
+                CREATE TABLE IF NOT EXISTS files (
+                    id INTEGER PRIMARY KEY,
+                    path TEXT UNIQUE NOT NULL,
+                    hash TEXT,
+                    module TEXT NOT NULL,
+                    error TEXT
+                );
+                CREATE TABLE IF NOT EXISTS occurrences (
+                    name TEXT NOT NULL,
+                    symbol TEXT NOT NULL,
+                    kind TEXT NOT NULL,
+                    file_id INTEGER NOT NULL,
+                    line INTEGER NOT NULL,
+                    col INTEGER NOT NULL
+                );
+                CREATE INDEX IF NOT EXISTS occurrences_name ON occurrences(name);
+                CREATE INDEX IF NOT EXISTS occurrences_file ON occurrences(file_id);
+                CREATE TABLE IF NOT EXISTS aliases (
+                    symbol TEXT NOT NULL,
+                    target TEXT NOT NULL,
+                    file_id INTEGER NOT NULL
+                );
+                CREATE INDEX IF NOT EXISTS aliases_file ON aliases(file_id);
+                CREATE TABLE IF NOT EXISTS bases (
+                    symbol TEXT NOT NULL,
+                    base TEXT NOT NULL,
+                    file_id INTEGER NOT NULL
+                );
+                CREATE INDEX IF NOT EXISTS bases_file ON bases(file_id);
+            """)
+        return self._db
+
+    def close(self):
+        if self._db is not None:
+            self._db.close()
+            self._db = None
+
+    def _analyze(self, paths):
+        batches = [paths[start:start + BATCH_SIZE] for start in range(0, len(paths), BATCH_SIZE)]
+        if self.workers <= 1 or len(paths) <= INLINE_MAX_FILES:
+            for batch in batches:
+                yield from _analyze_batch(batch, self.root)
+            return
+        with ProcessPoolExecutor(max_workers=self.workers) as pool:
+            for results in pool.map(_analyze_batch, batches, [self.root] * len(batches)):
+                yield from results
+
+    def update(self, workspace_index, file_filter=None):
+        """Sincronizeaza incremental indexul cu WorkspaceIndex; intoarce nr. de fisiere re-analizate"""
+        db = self._connect()
+        known = {path: (file_id, file_hash) for file_id, path, file_hash in db.execute("SELECT id, path, hash FROM files")}
+        current = {path for path in (file_filter or FileFilter()).apply(workspace_index.paths(PY_EXTENSIONS + JS_EXTENSIONS))
+                   if workspace_index.entry(path)['size'] <= MAX_SYMBOL_FILE_SIZE}
+        stale = []
+        for path in sorted(current):
+            file_hash = workspace_index.get_hash(path)
+            old = known.get(path)
+            if not old or old[1] != file_hash or file_hash is None:
+                stale.append((path, file_hash))
+
+        with db:
+            for path in set(known) - current:
+                self._delete(db, known[path][0])
+                db.execute("DELETE FROM files WHERE id = ?", (known[path][0],))
+            hashes = dict(stale)
+            for path, module, occurrences, aliases, bases, error in self._analyze([p for p, _ in stale]):
+                old = known.get(path)
+                if old:
+                    file_id = old[0]
+                    self._delete(db, file_id)
+                    db.execute("UPDATE files SET hash = ?, module = ?, error = ? WHERE id = ?",
+                               (hashes[path], module, error, file_id))
+                else:
+                    file_id = db.execute("INSERT INTO files (path, hash, module, error) VALUES (?, ?, ?, ?)",
+                                         (path, hashes[path], module, error)).lastrowid
+                db.executemany("INSERT INTO occurrences (name, symbol, kind, file_id, line, col) VALUES (?, ?, ?, ?, ?, ?)",
+                               ((o.name, o.symbol, o.kind, file_id, o.line, o.col) for o in occurrences))
+                db.executemany("INSERT INTO aliases (symbol, target, file_id) VALUES (?, ?, ?)",
+                               ((symbol, target, file_id) for symbol, target in aliases))
+                db.executemany("INSERT INTO bases (symbol, base, file_id) VALUES (?, ?, ?)",
+                               ((symbol, base, file_id) for symbol, base in bases))
+        return len(stale)
+
+    @staticmethod
+    def _delete(db, file_id):
+        for table in ("occurrences", "aliases", "bases"):
+            db.execute(f"DELETE FROM {table} WHERE file_id = ?", (file_id,))
+
+    def errors(self):
+        """{path: eroare} pentru fisierele care nu au putut fi analizate"""
+        return dict(self._connect().execute("SELECT path, error FROM files WHERE error IS NOT NULL"))
+
+    # rezolvare
+
+    def _resolver(self):
+        """Functie simbol -> forma canonica (modulul real, prin alias-uri de import)"""
+        db = self._connect()
+        modules = {m for (m,) in db.execute("SELECT DISTINCT module FROM files")}
+        suffixes = {}
+        for module in modules:
+            if '/' in module:
+                continue
+            parts = module.split('.')
+            for k in range(1, len(parts)):
+                suffixes.setdefault('.'.join(parts[k:]), set()).add(module)
+        aliases = {}
+        for symbol, target in db.execute("SELECT symbol, target FROM aliases"):
+            if symbol != target:
+                aliases.setdefault(symbol, target)
+
+        def module_of(module):
+            if module in modules:
+                return module
+            if module + '/index' in modules:
+                return module + '/index'
+            candidates = suffixes.get(module, ())
+            # layout src/: 'pkg.mod' importat este 'src.pkg.mod' in workspace
+            return next(iter(candidates)) if len(candidates) == 1 else module
+
+        cache = {}
+
+        def canonical(symbol):
+            if symbol in cache:
+                return cache[symbol]
+            result, seen = symbol, set()
+            while result not in seen:
+                seen.add(result)
+                module, _, qual = result.partition(':')
+                module = module_of(module)
+                parts = qual.split('.') if qual else []
+                # 'a:b.f' unde a.b este un modul -> 'a.b:f'
+                while parts and '/' not in module and module_of(f"{module}.{parts[0]}" if module else parts[0]) in modules:
+                    module = module_of(f"{module}.{parts[0]}" if module else parts[0])
+                    parts.pop(0)
+                result = f"{module}:{'.'.join(parts)}"
+                for k in range(len(parts), 0, -1):
+                    prefix = f"{module}:{'.'.join(parts[:k])}"
+                    if prefix in aliases:
+                        rest = parts[k:]
+                        result = aliases[prefix]
+                        for part in rest:
+                            result = _join(result, part)
+                        break
+                else:
+                    break
+            cache[symbol] = result
+            return result
+
+        return canonical
+
+    def definitions(self, name):
+        """Simbolurile definite cu numele dat: [{symbol, kind, path, line}], cele de nivel inalt primele.
+
+        `name` poate fi calificat: 'Clasa.metoda' sau 'modul:Clasa.metoda'.
+        """
+        db = self._connect()
+        short = re.split(r'[.:]', name)[-1]
+        canonical = self._resolver()
+        rows = db.execute("SELECT o.symbol, o.kind, f.path, o.line FROM occurrences o JOIN files f ON f.id = o.file_id "
+                          "WHERE o.name = ? AND o.kind IN ({}) ORDER BY f.path, o.line".format(
+                              ",".join("?" * len(DEFINITION_KINDS))), (short,) + DEFINITION_KINDS).fetchall()
+        found = {}
+        for symbol, kind, path, line in rows:
+            symbol = canonical(symbol)
+            if symbol.startswith(UNKNOWN + ':'):
+                continue
+            if name != short and not (symbol == name or symbol.endswith('.' + name) or symbol.endswith(':' + name)):
+                continue
+            entry = found.setdefault(symbol, {"symbol": symbol, "kind": kind, "path": path, "line": line})
+            if kind == 'def' and entry["kind"] != 'def':
+                entry.update(kind=kind, path=path, line=line)
+        ordered = sorted(found.values(), key=lambda d: ('<' in d["symbol"], d["kind"] != 'def', d["symbol"]))
+        # variabilele locale doar daca nu exista altceva (sau sunt cerute explicit)
+        public = [d for d in ordered if '<' not in d["symbol"]]
+        return public or ordered
+
+    def rename_plan(self, symbol, new_name):
+        """Aparitiile de redenumit pentru `symbol` (forma canonica, din definitions()).
+
+        Intoarce {"symbol", "name", "files": {path: [(line, col)]}, "unresolved": [(path, line)],
+        "conflicts": [(path, line, simbol)], "skipped": [fisiere neparsabile care contin numele]}. Metodele suprascrise in subclase sunt incluse;
+        atributele pe obiecte de tip necunoscut sunt doar raportate ("unresolved").
+        """
+        db = self._connect()
+        name = re.split(r'[.:]', symbol)[-1]
+        canonical = self._resolver()
+        targets = {symbol}
+        owner = symbol.rsplit('.', 1)[0] if '.' in symbol.partition(':')[2] else None
+        if owner:
+            children = {}
+            for sym, base in db.execute("SELECT symbol, base FROM bases"):
+                children.setdefault(canonical(base), set()).add(canonical(sym))
+            stack, seen = [owner], {owner}
+            while stack:
+                for child in children.get(stack.pop(), ()):
+                    if child not in seen:
+                        seen.add(child)
+                        stack.append(child)
+                        targets.add(_join(child, name))
+
+        files, attributes = {}, []
+        defined = set()
+        for sym, kind, path, line, col in db.execute(
+                "SELECT o.symbol, o.kind, f.path, o.line, o.col FROM occurrences o JOIN files f ON f.id = o.file_id "
+                "WHERE o.name = ?", (name,)):
+            sym = canonical(sym)
+            if sym in targets:
+                files.setdefault(path, set()).add((line, col))
+            elif kind == 'attr':
+                attributes.append((path, line, sym))
+            if kind in DEFINITION_KINDS:
+                defined.add(sym)
+        # Atributele care nu duc la nicio definitie cunoscuta (obiecte de tip necunoscut), in acelasi limbaj
+        python = any(p.endswith(PY_EXTENSIONS) for p in files)
+        unresolved = [(path, line) for path, line, sym in attributes
+                      if sym not in defined and path.endswith(PY_EXTENSIONS) == python]
+
+        renamed = {t[:len(t) - len(name)] + new_name for t in targets}
+        conflicts = [(path, line, canonical(sym)) for sym, path, line in db.execute(
+            "SELECT o.symbol, f.path, o.line FROM occurrences o JOIN files f ON f.id = o.file_id "
+            "WHERE o.name = ? AND o.kind IN ('def', 'assign', 'import', 'param', 'local')", (new_name,))
+            if canonical(sym) in renamed]
+        # Fisierele care nu au putut fi parsate, dar contin numele
+        skipped = []
+        for (path,) in db.execute("SELECT path FROM files WHERE error IS NOT NULL"):
+            try:
+                with open(os.path.join(self.root, path), 'r', encoding='utf-8', errors='replace') as f:
+                    if name in f.read():
+                        skipped.append(path)
+            except OSError:
+                pass
+        return {"symbol": symbol, "name": name, "files": {p: sorted(v) for p, v in sorted(files.items())},
+                "unresolved": sorted(set(unresolved)), "conflicts": conflicts, "skipped": skipped}
+
+
+def apply_renames(text, positions, old_name, new_name):
+    """Inlocuieste `old_name` cu `new_name` la pozitiile (linie, coloana) date.
+
+    ValueError daca la o pozitie nu se afla `old_name` (fisierul s-a schimbat de la indexare).
+    """
+    parts = _NEWLINE.split(text)
+    separators = _NEWLINE.findall(text)
+    by_line = {}
+    for line, col in positions:
+        by_line.setdefault(line, []).append(col)
+    for line, cols in by_line.items():
+        if line > len(parts):
+            raise ValueError(f"line {line} is past the end of the file")
+        current = parts[line - 1]
+        for col in sorted(cols, reverse=True):
+            if current[col:col + len(old_name)] != old_name:
+                raise ValueError(f"'{old_name}' not found at {line}:{col + 1}")
+            current = current[:col] + new_name + current[col + len(old_name):]
+        parts[line - 1] = current
+    out = []
+    for i, part in enumerate(parts):
+        out.append(part)
+        if i < len(separators):
+            out.append(separators[i])
+    return ''.join(out)
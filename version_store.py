@@ -0,0 +1,250 @@
+import os
+import json
+import time
+import zlib
+import struct
+import hashlib
+
+from workspace_index import STATE_DIR
+
+# Blocurile comparate dintr-o data la cautarea prefixului/sufixului comun
+_BLOCK = 64 * 1024
+
+# Liniile mai scurte nu pornesc o copiere noua (linii goale, acolade) - raman literale
+_MIN_COPY_LINE = 8
+
+_COPY = struct.Struct('>cQQ')
+_INSERT = struct.Struct('>cQ')
+
+
+def _common_prefix(a, b):
+    """Lungimea prefixului comun; compara blocuri mari, apoi cauta binar in primul bloc diferit"""
+    limit = min(len(a), len(b))
+    i = 0
+    while i < limit and a[i:i + _BLOCK] == b[i:i + _BLOCK]:
+        i += _BLOCK
+    if i >= limit:
+        return limit
+    lo, hi = i, min(i + _BLOCK, limit)
+    while lo < hi:
+        mid = (lo + hi + 1) // 2
+        if a[i:mid] == b[i:mid]:
+            lo = mid
+        else:
+            hi = mid - 1
+    return lo
+
+
+def _common_suffix(a, b, limit):
+    """Lungimea sufixului comun, fara sa depaseasca `limit`"""
+    i = 0
+    while i < limit:
+        size = min(_BLOCK, limit - i)
+        if a[len(a) - i - size:len(a) - i] != b[len(b) - i - size:len(b) - i]:
+            break
+        i += size
+    if i >= limit:
+        return limit
+    lo, hi = i, min(i + _BLOCK, limit)
+    while lo < hi:
+        mid = (lo + hi + 1) // 2
+        if a[len(a) - mid:len(a) - i] == b[len(b) - mid:len(b) - i]:
+            lo = mid
+        else:
+            hi = mid - 1
+    return lo
+
+
+def make_delta(base, target):
+    """Instructiuni (comprimate) care reconstruiesc `target` din `base`.
+
+    Prefixul si sufixul comun devin copieri directe; la mijloc liniile din
+    target sunt cautate intr-un dictionar al liniilor din base, iar liniile
+    consecutive gasite devin o singura copiere. Totul este O(n).
+    """
+    prefix = _common_prefix(base, target)
+    suffix = _common_suffix(base, target, min(len(base), len(target)) - prefix)
+    ops = []
+
+    def copy(start, length):
+        if ops and ops[-1][0] == 'C' and ops[-1][1] + ops[-1][2] == start:
+            ops[-1][2] += length
+        else:
+            ops.append(['C', start, length])
+
+    def insert(data):
+        if ops and ops[-1][0] == 'I':
+            ops[-1][1].append(data)
+        else:
+            ops.append(['I', [data]])
+
+    if prefix:
+        copy(0, prefix)
+
+    base_end, target_end = len(base) - suffix, len(target) - suffix
+    if target_end > prefix:
+        positions, offset = {}, prefix
+        for line in base[prefix:base_end].splitlines(True):
+            positions.setdefault(line, offset)
+            offset += len(line)
+        run_end = None
+        for line in target[prefix:target_end].splitlines(True):
+            if run_end is not None and base[run_end:run_end + len(line)] == line:
+                copy(run_end, len(line))
+                run_end += len(line)
+                continue
+            start = positions.get(line) if len(line) >= _MIN_COPY_LINE else None
+            if start is None:
+                insert(line)
+                run_end = None
+            else:
+                copy(start, len(line))
+                run_end = start + len(line)
+
+    if suffix:
+        copy(base_end, suffix)
+
+    out = []
+    for op in ops:
+        if op[0] == 'C':
+            out.append(_COPY.pack(b'C', op[1], op[2]))
+        else:
+            data = b''.join(op[1])
+            out.append(_INSERT.pack(b'I', len(data)))
+            out.append(data)
+    return zlib.compress(b''.join(out), 6)
+
+
+def apply_delta(base, delta):
+    """Inversul lui make_delta"""
+    data = zlib.decompress(delta)
+    parts, i = [], 0
+    while i < len(data):
+        if data[i:i + 1] == b'C':
+            _, start, length = _COPY.unpack_from(data, i)
+            parts.append(base[start:start + length])
+            i += _COPY.size
+        else:
+            _, length = _INSERT.unpack_from(data, i)
+            i += _INSERT.size
+            parts.append(data[i:i + length])
+            i += length
+    return b''.join(parts)
+
+
+def _write_atomic(path, data):
+    tmp = path + ".tmp"
+    with open(tmp, 'wb') as f:
+        f.write(data)
+    os.replace(tmp, path)
+
+
+class VersionStore:
+    """Istoric persistent al versiunilor fisierelor, in .codemate/history.
+
+    Pentru fiecare fisier: ultima versiune salvata este pastrata complet
+    (head), iar cele mai vechi ca delta-uri inverse comprimate (versiunea N
+    reconstruita din N+1). Ultima versiune se citeste direct; o versiune mai
+    veche aplica delta-urile dinspre head, fiecare in timp liniar.
+    Retentia: cel mult `keep` versiuni per fisier si nimic mai vechi de
+    `max_age` secunde (0 = fara limita).
+    """
+
+    def __init__(self, root=".", store_dir=None, keep=20, max_age=0):
+        self.root = root
+        self.store_dir = store_dir or os.path.join(root, STATE_DIR, "history")
+        self.keep = keep
+        self.max_age = max_age
+
+    def _dir(self, rel_path):
+        key = hashlib.sha1(os.path.relpath(rel_path).encode('utf-8')).hexdigest()[:20]
+        return os.path.join(self.store_dir, key)
+
+    def _load_log(self, rel_path):
+        try:
+            with open(os.path.join(self._dir(rel_path), "log.json"), 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {"path": os.path.relpath(rel_path), "next_id": 1, "versions": []}
+
+    def _save_log(self, rel_path, log):
+        _write_atomic(os.path.join(self._dir(rel_path), "log.json"), json.dumps(log).encode('utf-8'))
+
+    def versions(self, rel_path):
+        """Versiunile salvate, cea mai veche prima: [{id, time, size, sha1, stored}]"""
+        return self._load_log(rel_path)["versions"]
+
+    def record(self, rel_path, content):
+        """Salveaza `content` (bytes) ca cea mai noua versiune; ignorat daca este identic cu ultima"""
+        directory = self._dir(rel_path)
+        log = self._load_log(rel_path)
+        versions = log["versions"]
+        digest = hashlib.sha1(content).hexdigest()
+        if versions and versions[-1]["sha1"] == digest:
+            return versions[-1]
+
+        os.makedirs(directory, exist_ok=True)
+        head_path = os.path.join(directory, "head")
+        if versions:
+            # Vechiul head devine un delta invers fata de noul continut
+            with open(head_path, 'rb') as f:
+                previous = f.read()
+            delta = make_delta(content, previous)
+            _write_atomic(os.path.join(directory, f"{versions[-1]['id']}.delta"), delta)
+            versions[-1]["stored"] = len(delta)
+
+        _write_atomic(head_path, content)
+        version = {"id": log["next_id"], "time": time.time(), "size": len(content),
+                   "sha1": digest, "stored": len(content)}
+        log["next_id"] += 1
+        versions.append(version)
+        self._apply_retention(directory, versions)
+        self._save_log(rel_path, log)
+        return version
+
+    def _apply_retention(self, directory, versions):
+        now = time.time()
+        while len(versions) > 1 and (
+                (self.keep and len(versions) > self.keep)
+                or (self.max_age and now - versions[0]["time"] > self.max_age)):
+            oldest = versions.pop(0)
+            try:
+                os.remove(os.path.join(directory, f"{oldest['id']}.delta"))
+            except OSError:
+                pass
+
+    def read(self, rel_path, index):
+        """Continutul versiunii `index` (1 = cea mai veche pastrata)"""
+        versions = self.versions(rel_path)
+        if not 1 <= index <= len(versions):
+            raise IndexError(f"version {index} not in 1-{len(versions)}")
+        directory = self._dir(rel_path)
+        with open(os.path.join(directory, "head"), 'rb') as f:
+            content = f.read()
+        for version in reversed(versions[index - 1:-1]):
+            with open(os.path.join(directory, f"{version['id']}.delta"), 'rb') as f:
+                content = apply_delta(content, f.read())
+        if hashlib.sha1(content).hexdigest() != versions[index - 1]["sha1"]:
+            raise ValueError(f"history for {rel_path} is corrupted (version {index})")
+        return content
+
+    def pop(self, rel_path):
+        """Scoate ultima versiune si o intoarce; versiunea dinainte devine head"""
+        log = self._load_log(rel_path)
+        versions = log["versions"]
+        if not versions:
+            return None
+        directory = self._dir(rel_path)
+        content = self.read(rel_path, len(versions))
+        last = versions.pop()
+        if versions:
+            previous = versions[-1]
+            delta_path = os.path.join(directory, f"{previous['id']}.delta")
+            with open(delta_path, 'rb') as f:
+                _write_atomic(os.path.join(directory, "head"), apply_delta(content, f.read()))
+            os.remove(delta_path)
+            previous["stored"] = previous["size"]
+        else:
+            os.remove(os.path.join(directory, "head"))
+        self._save_log(rel_path, log)
+        return last, content
@@ -0,0 +1,480 @@
+import os
+import sys
+import json
+import atexit
+import shutil
+import signal
+import asyncio
+import tempfile
+import threading
+import subprocess
+from concurrent.futures import Future
+
+from async_core import arun_process
+from proc_stream import READ_CHUNK, astream_process
+
+# Procesul zygote: importa modulele cerute o singura data, apoi face fork
+# pentru fiecare job. Ruleaza cu `python -c`, deci nu trage dupa el modulele
+# CodeMate; nu executa niciodata cod din joburi.
+ZYGOTE_SOURCE = r'''
+import os
+import sys
+import json
+import types
+import runpy
+import signal
+import select
+import traceback
+
+if sys.path and sys.path[0] in ("", os.getcwd()):
+    sys.path.pop(0)  # directorul curent adaugat de -c
+_ENV_PATH = [p for p in os.environ.get("PYTHONPATH", "").split(os.pathsep) if p]
+BASE_PATH = [p for p in sys.path if p not in _ENV_PATH]
+
+# Canalul de control ramane pe alte fd-uri; 0/1 devin /dev/null ca importurile sa nu-l strice
+CONTROL_IN, CONTROL_OUT = os.dup(0), os.dup(1)
+_null = os.open(os.devnull, os.O_RDWR)
+os.dup2(_null, 0)
+os.dup2(_null, 1)
+os.close(_null)
+
+
+def send(message):
+    os.write(CONTROL_OUT, (json.dumps(message) + "\n").encode("utf-8"))
+
+
+def preload(names):
+    loaded, failed = {}, {}
+    for name in names:
+        try:
+            __import__(name)
+            loaded[name] = getattr(sys.modules[name], "__file__", None)
+        except BaseException as e:
+            failed[name] = repr(e)
+    return loaded, failed
+
+
+def exit_code(status):
+    if os.WIFSIGNALED(status):
+        return -os.WTERMSIG(status)
+    return os.WEXITSTATUS(status)
+
+
+def run_job(job, wake_fds):
+    """In copil: mediul, directorul, fd-urile si sys.path ca la o pornire noua, apoi jobul"""
+    code = 0
+    try:
+        os.setsid()
+        signal.set_wakeup_fd(-1)
+        signal.signal(signal.SIGCHLD, signal.SIG_DFL)
+        signal.signal(signal.SIGINT, signal.default_int_handler)
+        for fd in (CONTROL_IN, CONTROL_OUT) + wake_fds:
+            os.close(fd)
+        os.chdir(job["cwd"])
+        stdin = os.open(os.devnull, os.O_RDONLY)
+        os.dup2(stdin, 0)
+        os.close(stdin)
+        for fd, path in ((1, job["stdout"]), (2, job["stderr"])):
+            out = os.open(path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+            os.dup2(out, fd)
+            os.close(out)
+        os.environ.clear()
+        os.environ.update(job["env"])
+        encoding = (os.environ.get("PYTHONIOENCODING") or "utf-8").split(":")[0]
+        sys.stdin = sys.__stdin__ = open(0, "r", closefd=False)
+        # PYTHONUNBUFFERED (ecou live): fara buffer de bloc, ca la pornirea cu `python -u`
+        buffering = 1 if os.environ.get("PYTHONUNBUFFERED") else -1
+        sys.stdout = sys.__stdout__ = open(1, "w", buffering=buffering, encoding=encoding, closefd=False)
+        sys.stderr = sys.__stderr__ = open(2, "w", buffering=1, encoding=encoding,
+                                           errors="backslashreplace", closefd=False)
+
+        argv = job["argv"]
+        extra = [p for p in os.environ.get("PYTHONPATH", "").split(os.pathsep) if p]
+        if argv[0] == "-m":
+            first = os.getcwd()
+        elif argv[0] == "-c":
+            first = ""
+        else:
+            first = os.path.dirname(os.path.abspath(argv[0]))
+        sys.path[:] = [first] + extra + BASE_PATH
+
+        if argv[0] == "-m":
+            sys.argv = argv[1:]
+            runpy.run_module(argv[1], run_name="__main__", alter_sys=True)
+        elif argv[0] == "-c":
+            sys.argv = ["-c"] + argv[2:]
+            main = types.ModuleType("__main__")
+            sys.modules["__main__"] = main
+            exec(compile(argv[1], "<string>", "exec"), main.__dict__)
+        else:
+            sys.argv = list(argv)
+            runpy.run_path(argv[0], run_name="__main__")
+    except SystemExit as e:
+        if e.code is None:
+            code = 0
+        elif isinstance(e.code, int):
+            code = e.code
+        else:
+            print(e.code, file=sys.stderr)
+            code = 1
+    except BaseException:
+        traceback.print_exc()
+        code = 1
+    finally:
+        try:
+            import threading
+            for thread in threading.enumerate():
+                if thread is not threading.current_thread() and not thread.daemon:
+                    thread.join()
+            import atexit
+            atexit._run_exitfuncs()
+            sys.stdout.flush()
+            sys.stderr.flush()
+        except BaseException:
+            pass
+        os._exit(code & 0xff)
+
+
+def serve():
+    loaded, failed = preload(sys.argv[1:])
+    wake_r, wake_w = os.pipe()
+    os.set_blocking(wake_w, False)
+    signal.set_wakeup_fd(wake_w)
+    signal.signal(signal.SIGCHLD, lambda *args: None)
+    send({"ready": True, "pid": os.getpid(), "loaded": loaded, "failed": failed})
+
+    children, buffer = {}, b""
+    while True:
+        ready, _, _ = select.select([CONTROL_IN, wake_r], [], [])
+        if wake_r in ready:
+            os.read(wake_r, 4096)
+        while children:
+            try:
+                pid, status = os.waitpid(-1, os.WNOHANG)
+            except ChildProcessError:
+                break
+            if not pid:
+                break
+            send({"id": children.pop(pid), "returncode": exit_code(status)})
+        if CONTROL_IN not in ready:
+            continue
+        data = os.read(CONTROL_IN, 65536)
+        if not data:
+            # CodeMate s-a inchis: joburile ramase sunt oprite
+            for pid in children:
+                try:
+                    os.killpg(pid, signal.SIGKILL)
+                except OSError:
+                    pass
+            os._exit(0)
+        buffer += data
+        while b"\n" in buffer:
+            line, buffer = buffer.split(b"\n", 1)
+            job = json.loads(line)
+            pid = os.fork()
+            if pid == 0:
+                run_job(job, (wake_r, wake_w))
+            children[pid] = job["id"]
+            send({"id": job["id"], "pid": pid})
+
+
+serve()
+'''
+
+# Cat asteapta un job dupa ce procesul lui a fost omorat (timeout/anulare)
+KILL_GRACE = 5.0
+# Cat de des sunt citite fisierele de iesire ale unui job urmarit live
+FOLLOW_INTERVAL = 0.05
+
+
+def python_executable():
+    return shutil.which('python') or sys.executable
+
+
+def _kill_group(pid):
+    try:
+        os.killpg(pid, signal.SIGKILL)
+    except OSError:
+        pass
+
+
+def _remove(*paths):
+    for path in paths:
+        try:
+            os.remove(path)
+        except OSError:
+            pass
+
+
+def _resolve(future, result=None, error=None):
+    """Seteaza rezultatul unui Future din thread-ul cititor (ignorat daca este deja terminat)"""
+    if future.done():
+        return
+    try:
+        if error is not None:
+            future.set_exception(error)
+        else:
+            future.set_result(result)
+    except Exception:  # terminat intre timp
+        pass
+
+
+class WorkerPool:
+    """Interpretor Python "cald" pentru /run, /profile si /test, in stil forkserver.
+
+    Un proces zygote porneste o singura data, importa modulele din `preload`
+    si asteapta joburi. Fiecare job ruleaza intr-un fork nou al zygote-ului,
+    intr-o sesiune proprie, cu mediul, directorul, sys.argv si sys.path
+    refacute ca la o pornire `python ...` obisnuita. Un job nu vede starea
+    altui job, iar zygote-ul nu ruleaza cod din joburi. stdout/stderr merg in
+    fisiere temporare, citite la final sau, cu un ProcessOutput, urmarite
+    cat timp jobul ruleaza.
+
+    Joburile ruleaza ca subprocese reci (arun_process) cand fork nu exista
+    (Windows), zygote-ul nu e gata sau a murit, un fisier din proiect ar umbri
+    un modul preincarcat, ori scriptul citeste de la stdin. Zygote-ul este
+    repornit daca un modul preincarcat s-a schimbat pe disc. Primul job
+    porneste zygote-ul (ruleaza el insusi rece); la iesirea din proces
+    zygote-ul este oprit si directorul temporar sters (atexit).
+    """
+
+    def __init__(self, python=None, preload=(), root="."):
+        self.python = python or python_executable()
+        self.preload = [name for name in preload if name]
+        self.root = root
+        self.process = None
+        self.ready = False
+        self.loaded = {}
+        self.failed = {}
+        self.stats = {"warm": 0, "cold": 0}
+        self._mtimes = {}
+        self._jobs = {}
+        self._next_id = 0
+        self._lock = threading.Lock()
+        self._temp_dir = None
+        self._atexit = False
+
+    @staticmethod
+    def supported():
+        return os.name == 'posix' and hasattr(os, 'fork')
+
+    def start(self):
+        """Porneste zygote-ul in fundal, daca nu ruleaza deja (nu asteapta importurile)"""
+        if not self.supported():
+            return
+        with self._lock:
+            if self.process is not None and self.process.poll() is None:
+                return
+            if self._temp_dir is None:
+                self._temp_dir = tempfile.mkdtemp(prefix="codemate-workers-")
+            if not self._atexit:
+                atexit.register(self.close)
+                self._atexit = True
+            self.ready = False
+            try:
+                self.process = subprocess.Popen([self.python, '-c', ZYGOTE_SOURCE] + self.preload,
+                                                stdin=subprocess.PIPE, stdout=subprocess.PIPE,
+                                                stderr=subprocess.DEVNULL, cwd=self.root, start_new_session=True)
+            except OSError:
+                self.process = None
+                return
+            threading.Thread(target=self._read, args=(self.process,), daemon=True).start()
+
+    def close(self):
+        with self._lock:
+            process, self.process, self.ready = self.process, None, False
+            self.loaded, self.failed = {}, {}
+        if process is not None and process.poll() is None:
+            process.stdin.close()  # zygote-ul isi opreste joburile si iese
+            try:
+                process.wait(2)
+            except subprocess.TimeoutExpired:
+                process.kill()
+        if self._temp_dir is not None:
+            shutil.rmtree(self._temp_dir, ignore_errors=True)
+            self._temp_dir = None
+
+    def restart(self):
+        self.close()
+        self.start()
+
+    def _read(self, process):
+        """Thread: mesajele zygote-ului -> futures ale joburilor"""
+        for line in process.stdout:
+            try:
+                message = json.loads(line)
+            except ValueError:
+                continue
+            if message.get("ready"):
+                self.loaded, self.failed = message["loaded"], message["failed"]
+                self._mtimes = {path: self._mtime(path) for path in self.loaded.values() if path}
+                self.ready = True
+                continue
+            job = self._jobs.get(message.get("id"))
+            if job is None:
+                continue
+            if "pid" in message:
+                _resolve(job["pid"], message["pid"])
+            elif "returncode" in message:
+                self._jobs.pop(message["id"], None)
+                _resolve(job["done"], message["returncode"])
+        # Zygote mort: joburile in curs nu mai primesc rezultat
+        self.ready = False
+        for job_id in list(self._jobs):
+            job = self._jobs.pop(job_id)
+            for future in (job["pid"], job["done"]):
+                _resolve(future, error=RuntimeError("worker pool process exited"))
+
+    @staticmethod
+    def _mtime(path):
+        try:
+            return os.stat(path).st_mtime_ns
+        except OSError:
+            return None
+
+    def _stale(self):
+        return any(self._mtime(path) != mtime for path, mtime in self._mtimes.items())
+
+    def usable(self, argv, cwd='.', env=None):
+        """Poate jobul rula intr-un worker cald fara sa se comporte altfel decat la pornire rece?"""
+        if not self.ready or self.process is None or self.process.poll() is not None:
+            return False
+        if self._stale():
+            self.restart()
+            return False
+        script = None if argv[0] in ('-m', '-c') else os.path.join(cwd, argv[0])
+        if script is not None:
+            try:
+                with open(script, 'r', encoding='utf-8', errors='replace') as f:
+                    source = f.read()
+            except OSError:
+                return False
+            if 'input(' in source or 'stdin' in source:
+                return False
+        # Un modul din proiect cu acelasi nume ca unul preincarcat l-ar umbri la pornire rece
+        directories = [os.path.dirname(script) if script else cwd]
+        directories += [p for p in (env or os.environ).get("PYTHONPATH", "").split(os.pathsep) if p]
+        for name in {name.split('.')[0] for name in self.loaded}:
+            for directory in directories:
+                base = os.path.join(directory, name)
+                if os.path.isdir(base) or os.path.exists(base + ".py"):
+                    return False
+        return True
+
+    async def run(self, argv, cwd='.', env=None, timeout=None, output=None):
+        """Ca arun_process([python] + argv): subprocess.CompletedProcess cu text si atributul `warm`.
+
+        Cu `output` (ProcessOutput), iesirea curge in el pe masura ce apare,
+        ca la astream_process, iar textul intors este cel pastrat de buffere.
+        """
+        if not self.usable(argv, cwd, env):
+            self.start()  # pentru joburile urmatoare
+            if output is not None:
+                result = await astream_process([self.python] + list(argv), output, cwd=cwd, timeout=timeout, env=env)
+            else:
+                result = await arun_process([self.python] + list(argv), cwd=cwd, timeout=timeout, env=env)
+            result.warm = False
+            self.stats["cold"] += 1
+            return result
+
+        with self._lock:
+            self._next_id += 1
+            job_id = self._next_id
+            job = {"pid": Future(), "done": Future()}
+            self._jobs[job_id] = job
+            out_path = os.path.join(self._temp_dir, f"{job_id}.out")
+            err_path = os.path.join(self._temp_dir, f"{job_id}.err")
+            if output is not None:
+                # Create acum ca urmarirea sa le poata deschide; copilul le trunchiaza (acelasi inod)
+                for path in (out_path, err_path):
+                    open(path, 'wb').close()
+            request = {"id": job_id, "argv": list(argv), "cwd": os.path.abspath(cwd),
+                       "env": dict(env if env is not None else os.environ),
+                       "stdout": out_path, "stderr": err_path}
+            try:
+                self.process.stdin.write((json.dumps(request) + "\n").encode('utf-8'))
+                self.process.stdin.flush()
+            except (OSError, ValueError):
+                self._jobs.pop(job_id, None)
+                job = None
+        if job is None:
+            self.ready = False
+            _remove(out_path, err_path)
+            return await self.run(argv, cwd, env, timeout, output)
+
+        stop = asyncio.Event()
+        follow = asyncio.ensure_future(self._follow((out_path, err_path), output, stop)) if output is not None else None
+        # shield: anularea asteptarii nu trebuie sa anuleze future-ul partajat cu thread-ul cititor
+        done = asyncio.wrap_future(job["done"])
+        try:
+            returncode = await asyncio.wait_for(asyncio.shield(done), timeout)
+        except BaseException:
+            # Timeout sau anulare: procesul (si ce a pornit el) este omorat
+            job["pid"].add_done_callback(lambda f: f.exception() is None and _kill_group(f.result()))
+            try:
+                await asyncio.wait_for(done, KILL_GRACE)
+            except BaseException:
+                pass
+            if follow is not None:
+                await self._stop_follow(follow, stop, output)
+            _remove(out_path, err_path)
+            raise
+        if follow is not None:
+            await self._stop_follow(follow, stop, output)
+            _remove(out_path, err_path)
+            stdout, stderr = output.stdout, output.stderr
+        else:
+            stdout, stderr = self._collect_output(out_path, err_path)
+        self.stats["warm"] += 1
+        result = subprocess.CompletedProcess([self.python] + list(argv), returncode, stdout, stderr)
+        result.warm = True
+        return result
+
+    @staticmethod
+    async def _follow(paths, output, stop):
+        """Trimite in `output` ce scrie jobul in fisierele lui; dupa `stop`, citeste restul si iese"""
+        files = [("stdout", open(paths[0], 'rb')), ("stderr", open(paths[1], 'rb'))]
+        try:
+            while True:
+                stopping = stop.is_set()
+                idle = True
+                for name, f in files:
+                    data = f.read(READ_CHUNK)
+                    if data:
+                        output.feed(name, data)
+                        idle = False
+                if not idle:
+                    await asyncio.sleep(0)
+                elif stopping:
+                    return
+                else:
+                    try:
+                        await asyncio.wait_for(stop.wait(), FOLLOW_INTERVAL)
+                    except asyncio.TimeoutError:
+                        pass
+        finally:
+            for _, f in files:
+                f.close()
+
+    @staticmethod
+    async def _stop_follow(follow, stop, output):
+        stop.set()
+        try:
+            await asyncio.shield(follow)
+        except asyncio.CancelledError:
+            follow.cancel()
+            raise
+        finally:
+            output.close()
+
+    @staticmethod
+    def _collect_output(*paths):
+        outputs = []
+        for path in paths:
+            try:
+                with open(path, 'rb') as f:
+                    outputs.append(f.read().decode('utf-8', errors='replace'))
+                os.remove(path)
+            except OSError:
+                outputs.append("")
+        return outputs
@@ -0,0 +1,335 @@
+import os
+import json
+import time
+import hashlib
+
+from ignore_rules import IgnoreRules, IGNORE_FILES, read_rules, git_ls_files
+
+# Directorul unde CodeMate isi pastreaza starea in workspace
+STATE_DIR = ".codemate"
+
+# Directoare care nu sunt niciodata indexate
+SKIP_DIRS = {".git", "__pycache__", STATE_DIR}
+
+# Fisierele mai mari de atat nu sunt hash-uite la refresh
+MAX_HASH_SIZE = 8 * 1024 * 1024
+
+# O listare Git nu este refolosita daca ceva urmarit s-a schimbat chiar in timpul ei
+# (marja acopera rezolutia grosiera a mtime-ului pe unele sisteme de fisiere)
+LISTING_MTIME_SLACK_NS = 2 * 10 ** 9
+
+
+def file_hash(path):
+    """Calculeaza hash-ul continutului unui fisier"""
+    h = hashlib.sha1()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1024 * 1024), b""):
+            h.update(block)
+    return h.hexdigest()
+
+
+def diff_snapshots(old, new):
+    """Diferenta dintre doua snapshot-uri ale indexului: {added, removed, modified}"""
+    return {
+        "added": sorted(set(new) - set(old)),
+        "removed": sorted(set(old) - set(new)),
+        "modified": sorted(p for p in set(old) & set(new) if old[p] != new[p]),
+    }
+
+
+class WorkspaceIndex:
+    """Index persistent al workspace-ului (path, size, mtime, hash).
+
+    Indexul este salvat in .codemate/index.json. Intr-un repo Git lista de
+    fisiere vine din `git ls-files` (fisierele ignorate de Git nu apar);
+    in rest, un walker care respecta .gitignore/.codemateignore si nu
+    coboara in directoarele ignorate. Walker-ul relisteaza doar directoarele
+    al caror mtime (sau fisier de reguli) s-a schimbat; listarea Git este
+    refolosita cat timp .git/index, fisierele de reguli si directoarele din
+    ea nu s-au schimbat. Pentru fiecare fisier se face un stat(); hash-ul se
+    recalculeaza numai cand size/mtime difera.
+    """
+
+    VERSION = 2
+
+    def __init__(self, root=".", index_file=None, use_git=True):
+        self.root = root
+        self.index_file = index_file or os.path.join(root, STATE_DIR, "index.json")
+        self.use_git = use_git
+        self.mode = None
+        self.files = {}
+        self.dirs = {}
+        self.generation = 0
+        self.last_changes = {"added": [], "removed": [], "modified": []}
+        self._dirty = False
+        self._rules_cache = {}
+        self._root_rules = IgnoreRules.defaults()
+        self._git_listing = None   # (stat-urile urmarite, fisierele listate)
+        self._sorted = None        # (generatie, {extensii: lista sortata})
+        self._load()
+
+    def _load(self):
+        """Incarca indexul salvat (daca exista si are versiunea corecta)"""
+        try:
+            with open(self.index_file, "r", encoding="utf-8") as f:
+                data = json.load(f)
+            if data.get("version") == self.VERSION:
+                self.files = data.get("files", {})
+                self.dirs = data.get("dirs", {})
+                self.generation = data.get("generation", 0)
+        except (OSError, ValueError):
+            pass
+
+    def save(self):
+        """Salveaza indexul atomic (temp + rename)"""
+        if not self._dirty:
+            return
+        os.makedirs(os.path.dirname(self.index_file), exist_ok=True)
+        tmp_file = self.index_file + ".tmp"
+        with open(tmp_file, "w", encoding="utf-8") as f:
+            json.dump({
+                "version": self.VERSION,
+                "generation": self.generation,
+                "files": self.files,
+                "dirs": self.dirs,
+            }, f)
+        os.replace(tmp_file, self.index_file)
+        self._dirty = False
+
+    def _abs(self, rel_path):
+        return os.path.join(self.root, rel_path)
+
+    def _ignore_stamp(self, rel_dir):
+        """mtime-urile fisierelor de reguli dintr-un director (0 = lipsa)"""
+        stamp = []
+        for name in IGNORE_FILES:
+            try:
+                stamp.append(os.stat(os.path.join(self._abs(rel_dir), name)).st_mtime_ns)
+            except OSError:
+                stamp.append(0)
+        return stamp
+
+    def _dir_rules(self, rel_dir, stamp):
+        """Regulile unui director, recitite doar cand fisierele de reguli se schimba"""
+        cached = self._rules_cache.get(rel_dir)
+        if cached and cached[0] == stamp:
+            return cached[1]
+        rules = read_rules(self.root, rel_dir) if any(stamp) else []
+        self._rules_cache[rel_dir] = (stamp, rules)
+        return rules
+
+    def _scan_dir(self, rel_dir, mtime_ns, rules, stamp):
+        """Relisteaza un singur director, fara intrarile ignorate"""
+        files, subdirs = [], []
+        with os.scandir(self._abs(rel_dir)) as it:
+            for entry in it:
+                rel_path = entry.name if rel_dir == "." else os.path.join(rel_dir, entry.name)
+                try:
+                    if entry.is_dir(follow_symlinks=False):
+                        if entry.name not in SKIP_DIRS and not rules.ignored(rel_path, is_dir=True):
+                            subdirs.append(entry.name)
+                    elif entry.is_file() and not rules.ignored(rel_path):
+                        files.append(entry.name)
+                except OSError:
+                    continue
+        return {"mtime": mtime_ns, "ignore": stamp, "files": sorted(files), "dirs": sorted(subdirs)}
+
+    def _walk(self):
+        """Walker cu pruning: intoarce fisierele neignorate, refolosind listarile nemodificate"""
+        seen_dirs, seen_files = set(), []
+        stack = [(".", IgnoreRules.defaults(), False)]
+
+        while stack:
+            rel_dir, rules, parent_changed = stack.pop()
+            try:
+                mtime_ns = os.stat(self._abs(rel_dir)).st_mtime_ns
+            except OSError:
+                continue
+            seen_dirs.add(rel_dir)
+
+            stamp = self._ignore_stamp(rel_dir)
+            rules = rules.extend(self._dir_rules(rel_dir, stamp))
+            if rel_dir == ".":
+                self._root_rules = rules
+
+            entry = self.dirs.get(rel_dir)
+            # Daca regulile s-au schimbat aici sau mai sus, tot subarborele este relistat
+            rules_changed = parent_changed or entry is None or entry.get("ignore") != stamp
+            if rules_changed or entry["mtime"] != mtime_ns:
+                try:
+                    entry = self._scan_dir(rel_dir, mtime_ns, rules, stamp)
+                except OSError:
+                    continue
+                self.dirs[rel_dir] = entry
+                self._dirty = True
+
+            for name in entry["files"]:
+                seen_files.append(name if rel_dir == "." else os.path.join(rel_dir, name))
+            for name in entry["dirs"]:
+                stack.append((name if rel_dir == "." else os.path.join(rel_dir, name), rules, rules_changed))
+
+        for rel_dir in [d for d in self.dirs if d not in seen_dirs]:
+            del self.dirs[rel_dir]
+            self._dirty = True
+        return seen_files
+
+    def _git_files(self, paths):
+        """Fisierele din `git ls-files`, filtrate cu .codemateignore (.gitignore l-a aplicat Git)"""
+        rules = IgnoreRules()
+        for path in sorted((p for p in paths if os.path.basename(p) == ".codemateignore"),
+                           key=lambda p: p.count(os.sep)):
+            rules = rules.extend(read_rules(self.root, os.path.dirname(path) or ".", (".codemateignore",)))
+        self._root_rules = rules
+
+        cache = {}
+        return [p for p in paths
+                if not SKIP_DIRS.intersection(p.split(os.sep)) and not rules.excludes(p, cache)]
+
+    def _git_watched(self, paths):
+        """Ce poate schimba rezultatul `git ls-files`: .git/index, excluderile, fisierele de reguli si directoarele"""
+        watched = {os.path.join(".git", "index"), os.path.join(".git", "info", "exclude"), "."}
+        for path in paths:
+            if os.path.basename(path) in IGNORE_FILES:
+                watched.add(path)
+            # Un fisier nou neurmarit schimba mtime-ul directorului in care apare
+            directory = os.path.dirname(path)
+            while directory and directory not in watched:
+                watched.add(directory)
+                directory = os.path.dirname(directory)
+        return {path: self._stat_key(path) for path in watched}
+
+    def _stat_key(self, rel_path):
+        try:
+            st = os.stat(self._abs(rel_path))
+        except OSError:
+            return None
+        return (st.st_size, st.st_mtime_ns)
+
+    def _git_listing_fresh(self):
+        if self._git_listing is None:
+            return False
+        return all(self._stat_key(path) == key for path, key in self._git_listing[0].items())
+
+    def _refresh_file(self, rel_path):
+        """Actualizeaza intrarea unui fisier; intoarce 'added', 'modified', 'missing' sau None"""
+        try:
+            st = os.stat(self._abs(rel_path))
+        except OSError:
+            return "missing"
+
+        old = self.files.get(rel_path)
+        if old and old["size"] == st.st_size and old["mtime"] == st.st_mtime_ns:
+            return None
+
+        content_hash = None
+        if st.st_size <= MAX_HASH_SIZE:
+            try:
+                content_hash = file_hash(self._abs(rel_path))
+            except OSError:
+                pass
+
+        self.files[rel_path] = {"size": st.st_size, "mtime": st.st_mtime_ns, "hash": content_hash}
+        self._dirty = True
+
+        if old is None:
+            return "added"
+        return "modified" if old.get("hash") != content_hash or content_hash is None else None
+
+    def refresh(self):
+        """Actualizeaza incremental indexul si intoarce schimbarile"""
+        changes = {"added": [], "removed": [], "modified": []}
+        if self.use_git and self.mode == "git" and self._git_listing_fresh():
+            paths = listed = self._git_listing[1]
+        else:
+            self._git_listing = None
+            started = time.time_ns()
+            paths = git_ls_files(self.root) if self.use_git else None
+            if paths is not None:
+                listed = self._git_files(paths)
+                if os.path.isdir(self._abs(".git")):
+                    watched = self._git_watched(paths)
+                    if all(key is None or key[1] < started - LISTING_MTIME_SLACK_NS for key in watched.values()):
+                        self._git_listing = (watched, listed)
+        if paths is not None:
+            self.mode = "git"
+            if self.dirs:
+                self.dirs = {}
+                self._dirty = True
+        else:
+            self.mode = "walk"
+            listed = self._walk()
+
+        seen_files = set()
+        for rel_path in listed:
+            change = self._refresh_file(rel_path)
+            if change == "missing":
+                continue  # sters intre listare si stat (sau doar din working tree, nu si din Git)
+            seen_files.add(rel_path)
+            if change:
+                changes[change].append(rel_path)
+        for rel_path in [p for p in self.files if p not in seen_files]:
+            del self.files[rel_path]
+            changes["removed"].append(rel_path)
+            self._dirty = True
+
+        if any(changes.values()):
+            self.generation += 1
+        self.last_changes = changes
+
+        try:
+            self.save()
+        except OSError:
+            pass
+        return changes
+
+    def touch(self, rel_path):
+        """Actualizeaza imediat un fisier scris de CodeMate"""
+        rel_path = os.path.relpath(rel_path)
+        if os.path.isfile(self._abs(rel_path)):
+            if self._root_rules.excludes(rel_path):
+                return
+            if self._refresh_file(rel_path) in ("added", "modified"):
+                self.generation += 1
+        elif self.files.pop(rel_path, None) is not None:
+            self.generation += 1
+            self._dirty = True
+
+    def paths(self, extensions=None):
+        """Lista sortata de fisiere, optional filtrata dupa extensie"""
+        # Sortarea este refolosita pana cand un refresh/touch schimba indexul
+        key = (self.generation, len(self.files))
+        if self._sorted is None or self._sorted[0] != key:
+            self._sorted = (key, {None: sorted(self.files)})
+        cache = self._sorted[1]
+        extensions = tuple(extensions) if extensions else None
+        if extensions not in cache:
+            cache[extensions] = [p for p in cache[None] if p.endswith(extensions)]
+        return list(cache[extensions])
+
+    def entry(self, rel_path):
+        return self.files.get(os.path.relpath(rel_path))
+
+    def get_hash(self, rel_path):
+        """Hash-ul unui fisier din index (calculat la cerere pentru fisiere mari)"""
+        entry = self.entry(rel_path)
+        if entry is None:
+            return None
+        if entry["hash"] is None:
+            try:
+                entry["hash"] = file_hash(self._abs(rel_path))
+                self._dirty = True
+            except OSError:
+                return None
+        return entry["hash"]
+
+    def directories(self):
+        """Directoarele care contin fisiere indexate, sortate, cu fisierele fiecaruia"""
+        groups = {}
+        for path in self.files:
+            directory, name = os.path.split(path)
+            groups.setdefault(directory or ".", []).append(name)
+        return [(d, sorted(groups[d])) for d in sorted(groups)]
+
+    def snapshot(self):
+        """Starea curenta {path: (size, mtime)}, pentru comparatii ulterioare"""
+        return {path: (entry["size"], entry["mtime"]) for path, entry in self.files.items()}